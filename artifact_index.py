@@ -0,0 +1,341 @@
+import argparse
+import contextlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from build_manifest import MANIFEST_FILENAME
+from env_config import env_float, env_int
+from model_client import MODEL_NAME
+from task_dedup import normalize, task_guards
+
+DEFAULT_INDEX_PATH = Path(os.getenv("ARTIFACT_INDEX_PATH", ".cache/artifacts.sqlite3"))
+ARTIFACT_INDEX_ENABLED = os.getenv("ARTIFACT_INDEX", "1") != "0"
+# At or above this similarity an earlier artifact is reused as it is, without a model call.
+DEFAULT_REUSE_THRESHOLD = env_float("ARTIFACT_REUSE_THRESHOLD", 0.9)
+# At or above this similarity the closest artifact is sent along with the prompt as a reference.
+DEFAULT_REFERENCE_THRESHOLD = env_float("ARTIFACT_REFERENCE_THRESHOLD", 0.5)
+# Larger artifacts are not sent as references; they would cost more prompt tokens than they save.
+REFERENCE_MAX_CHARS = env_int("ARTIFACT_REFERENCE_MAX_CHARS", 6000)
+
+# The answer an agent gives when the reference it was sent already does the task.
+REUSE_SCHEMA = {"reuse_reference": bool}
+
+# Identifiers carry less weight than the words of the task itself.
+_IDENTIFIER_WEIGHT = 0.5
+_CODE_KEYS = {"frontend": ("tsx_code", "css_code"), "backend": ("python_code",)}
+_TSX_IDENTIFIER = re.compile(r"\b(?:function|const|interface|type|class)\s+([A-Z]\w*)")
+_PYTHON_IDENTIFIER = re.compile(r"^(?:async\s+)?(?:def|class)\s+([A-Za-z]\w*)", re.M)
+
+
+class Artifact(NamedTuple):
+    """An earlier task's validated code, as found by `ArtifactIndex.lookup`."""
+
+    kind: str
+    task: str
+    # The same fields the agent answers with, e.g. `component_name`, `tsx_code` and `css_code`.
+    code: dict
+    similarity: float
+    # Whether it is close enough to be used as it is.
+    reusable: bool
+
+    @property
+    def reference(self) -> Optional[dict]:
+        """The artifact as a prompt reference, or None if it is too large to send."""
+        if sum(len(self.code[key]) for key in _CODE_KEYS[self.kind]) > REFERENCE_MAX_CHARS:
+            return None
+        return {"task": self.task, "code": self.code}
+
+
+def identifiers(kind: str, code: dict) -> list:
+    """Returns the names a piece of generated code defines: its component, functions, classes and types."""
+    if kind == "frontend":
+        names = [code["component_name"]] + _TSX_IDENTIFIER.findall(code["tsx_code"])
+    else:
+        names = [Path(code["filename"]).stem] + _PYTHON_IDENTIFIER.findall(code["python_code"])
+    return list(dict.fromkeys(names))
+
+
+def _terms(task: str) -> dict:
+    methods, paths, *_ = task_guards(task)
+    weights = {}
+    # `normalize` leaves out HTTP methods and URL paths, but they say a lot about what a task does.
+    for token in normalize(task) + sorted(methods) + sorted(paths):
+        weights[token] = weights.get(token, 0.0) + 1.0
+    return weights
+
+
+def _with_identifiers(terms: dict, kind: str, code: dict) -> dict:
+    weights = dict(terms)
+    for token in set(normalize(" ".join(identifiers(kind, code)))):
+        weights[token] = weights.get(token, 0.0) + _IDENTIFIER_WEIGHT
+    return weights
+
+
+class ArtifactIndex:
+    """
+    A persistent lexical index of earlier tasks and the code that was generated for them.
+
+    Every indexed task is stored with its validated code in a SQLite database,
+    so the index grows incrementally across runs and projects. Each task is
+    indexed by its normalized words (see `task_dedup.normalize`), and once
+    more with the identifiers its code defines added at half weight. A new
+    task's similarity is the better TF-IDF cosine similarity of the two,
+    found through an in-memory inverted index.
+
+    A task is only matched against tasks of the same kind, backend profile and
+    model (e.g. "gemini:models/gemini-pro-latest"), so code from an offline
+    stub run is never reused in a real one.
+    An artifact is reused as it is only above `reuse_threshold`, and only if
+    the two tasks name the same HTTP methods, URL paths and numbers. Above
+    `reference_threshold`, it is offered to the agent as a reference instead.
+    With `rebuild`, nothing is reused as it is, and a task's own earlier code
+    is never offered, so every task is generated afresh.
+    """
+
+    def __init__(self, path: Path = DEFAULT_INDEX_PATH, enabled: bool = ARTIFACT_INDEX_ENABLED,
+                 reuse_threshold: float = DEFAULT_REUSE_THRESHOLD,
+                 reference_threshold: float = DEFAULT_REFERENCE_THRESHOLD, rebuild: bool = False):
+        self.path = Path(path)
+        self.enabled = enabled
+        self.rebuild = rebuild
+        self.reuse_threshold = reuse_threshold
+        self.reference_threshold = reference_threshold
+        self._lock = threading.Lock()
+        self._documents = None
+        self._postings = {}
+        if self.enabled:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with contextlib.closing(self._connect()) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(artifacts)")}
+                if columns and "model" not in columns:
+                    # Indexes from before artifacts were scoped by model cannot tell stub code from real code.
+                    print("⚠️ Dropping the artifact index: its entries do not record which model generated them.")
+                    conn.execute("DROP TABLE artifacts")
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS artifacts (
+                        kind TEXT NOT NULL,
+                        model TEXT NOT NULL,
+                        profile TEXT NOT NULL,
+                        task TEXT NOT NULL,
+                        code TEXT NOT NULL,
+                        created REAL NOT NULL,
+                        PRIMARY KEY (kind, model, profile, task)
+                    )
+                    """
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _load(self) -> dict:
+        # Called with the lock held; the documents are read once, on first use.
+        if self._documents is None:
+            self._documents = {}
+            with contextlib.closing(self._connect()) as conn:
+                rows = conn.execute("SELECT kind, model, profile, task, code FROM artifacts").fetchall()
+            for kind, model, profile, task, code in rows:
+                self._insert((kind, model, profile, task), json.loads(code))
+        return self._documents
+
+    def _insert(self, key: tuple, code: dict) -> None:
+        old = self._documents.get(key)
+        if old is not None:
+            for term in old[1]:
+                self._postings[term].discard(key)
+        terms = _terms(key[3])
+        vectors = (terms, _with_identifiers(terms, key[0], code))
+        self._documents[key] = (*vectors, code)
+        for term in vectors[1]:
+            self._postings.setdefault(term, set()).add(key)
+
+    def __len__(self) -> int:
+        if not self.enabled:
+            return 0
+        with self._lock:
+            return len(self._load())
+
+    def add(self, kind: str, task: str, code: dict, profile: str = "", model: str = "") -> None:
+        """Indexes (or re-indexes) the code `model` generated for `task`."""
+        if not self.enabled:
+            return
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (kind, model, profile, task, code, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, model, profile, task, json.dumps(code), time.time()),
+            )
+        with self._lock:
+            self._load()
+            self._insert((kind, model, profile, task), code)
+
+    def lookup(self, kind: str, task: str, profile: str = "", model: str = "") -> Optional[Artifact]:
+        """
+        Returns the artifact of `model` most similar to `task`, or None if none is close enough to help.
+        """
+        if not self.enabled:
+            return None
+        query = _terms(task)
+        with self._lock:
+            documents = self._load()
+            total = len(documents)
+
+            def idf(term: str) -> float:
+                # Smoothed, so words no earlier task used still count against the match.
+                return math.log(1 + (total + 1) / (len(self._postings.get(term, ())) + 1))
+
+            candidates = {key for term in query for key in self._postings.get(term, ())
+                          if key[:3] == (kind, model, profile) and not (self.rebuild and key[3] == task)}
+
+            def cosine(terms: dict) -> float:
+                dot = sum(weight * terms[term] * idf(term) ** 2 for term, weight in query.items() if term in terms)
+                norm = math.sqrt(sum((weight * idf(term)) ** 2 for term, weight in terms.items()))
+                return dot / (query_norm * norm) if query_norm and norm else 0.0
+
+            query_norm = math.sqrt(sum((weight * idf(term)) ** 2 for term, weight in query.items()))
+            best = None
+            for key in candidates:
+                task_terms, all_terms, code = documents[key]
+                similarity = max(cosine(task_terms), cosine(all_terms))
+                if best is None or similarity > best[0] or (similarity == best[0] and key[3] < best[1][3]):
+                    best = (similarity, key, code)
+        if best is None or best[0] < self.reference_threshold:
+            return None
+        similarity, (*_, other_task), code = best
+        reusable = (not self.rebuild and similarity >= self.reuse_threshold
+                    and task_guards(task) == task_guards(other_task))
+        return Artifact(kind, other_task, dict(code), similarity, reusable)
+
+
+def read_artifact(kind: str, files: list, output_root: Path) -> Optional[dict]:
+    """
+    Rebuilds an agent's answer from the files a task wrote, or returns None if they are missing.
+    """
+    files = [Path(path) for path in files]
+    try:
+        if kind == "frontend":
+            tsx = next(path for path in files if path.name.endswith(".tsx"))
+            css = next(path for path in files if path.name.endswith(".css"))
+            return {"component_name": tsx.stem, "tsx_code": tsx.read_text(encoding="utf-8"),
+                    "css_code": css.read_text(encoding="utf-8")}
+        python = next(path for path in files if path.suffix == ".py")
+        return {"filename": python.relative_to(output_root / "backend").as_posix(),
+                "python_code": python.read_text(encoding="utf-8")}
+    except (StopIteration, OSError, ValueError):
+        return None
+
+
+class _ReuseStats:
+    """Thread-safe counts of the tasks the artifact index answered or helped with."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.lookups = 0
+        self.reused = 0
+        self.referenced = 0
+        self.references_accepted = 0
+
+    def record(self, outcome: str) -> None:
+        """Records "lookup", "reused", "referenced" or "references_accepted"."""
+        attribute = {"lookup": "lookups"}.get(outcome, outcome)
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "reused": self.reused,
+                "referenced": self.referenced,
+                "references_accepted": self.references_accepted,
+            }
+
+
+reuse_stats = _ReuseStats()
+
+
+def reuse_report() -> str:
+    stats = reuse_stats.as_dict()
+    return (
+        f"Artifact index: {stats['reused']} of {stats['lookups']} looked-up task(s) reused without a model call, "
+        f"{stats['referenced']} sent with a reference ({stats['references_accepted']} answered by reusing it)."
+    )
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def configure_artifact_index(**kwargs) -> ArtifactIndex:
+    """Replaces the process-wide artifact index, e.g. to apply command-line options."""
+    global _index
+    with _index_lock:
+        _index = ArtifactIndex(**kwargs)
+    return _index
+
+
+def get_artifact_index() -> ArtifactIndex:
+    """Returns the process-wide artifact index, opening it from the environment on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ArtifactIndex()
+        return _index
+
+
+def index_outputs(output_root: Path, index: ArtifactIndex, backend_profile: str = "default",
+                  model: str = f"gemini:{MODEL_NAME}") -> int:
+    """
+    Indexes every task recorded in the build manifests under `output_root`, as generated by `model`.
+
+    Returns:
+        The number of tasks indexed.
+    """
+    count = 0
+    for manifest_path in sorted(Path(output_root).rglob(MANIFEST_FILENAME)):
+        root = manifest_path.parent
+        try:
+            entries = json.loads(manifest_path.read_text(encoding="utf-8")).get("tasks", {})
+        except (OSError, json.JSONDecodeError, AttributeError):
+            print(f"⚠️ Skipping unreadable build manifest {manifest_path}.")
+            continue
+        for entry in entries.values():
+            code = read_artifact(entry["kind"], [root / name for name in entry["files"]], root)
+            if code is not None:
+                index.add(entry["kind"], entry["task"], code, backend_profile if entry["kind"] == "backend" else "",
+                          model)
+                count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index previously generated projects for reuse by later runs.")
+    parser.add_argument("output_dirs", nargs="*", type=Path, default=[Path("output")],
+                        help="Directories holding generated projects (searched for build manifests; default: output).")
+    parser.add_argument("--backend-profile", default="default",
+                        help="The backend profile the indexed projects were generated with (default: default).")
+    parser.add_argument("--model", default=f"gemini:{MODEL_NAME}",
+                        help="The provider and model the indexed projects were generated with, as "
+                             f"'provider:model' (default: gemini:{MODEL_NAME}).")
+    parser.add_argument("--index", type=Path, default=DEFAULT_INDEX_PATH,
+                        help=f"The index database (default: {DEFAULT_INDEX_PATH}).")
+    args = parser.parse_args(argv)
+
+    index = ArtifactIndex(args.index, enabled=True)
+    for output_dir in args.output_dirs:
+        print(f"📚 Indexed {index_outputs(output_dir, index, args.backend_profile, args.model)} task(s) from {output_dir}.")
+    print(f"The index at {index.path} holds {len(index)} artifact(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,51 @@
-import os
-import json 
+import json
 from pathlib import Path
-import google.generativeai as genai
-from dotenv import load_dotenv
+from typing import Iterator, Optional
 
-def initialize_gemini():
-    """Loads API key and configures the Gemini client."""
-    load_dotenv()
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY not found. Please check your .env file.")
-    genai.configure(api_key=api_key)
-    print("Gemini API initialized successfully for Backend Agent.")
+from env_config import env_choice
+from json_extract import JSONExtractionError, extract_json
+from model_client import generate_content, initialize_gemini, stream_content
 
-def backend_agent(task_description: str) -> str:
-    """
-    Generates backend code based on a task description.
-    
-    Args:
-        task_description: A string describing a specific backend task.
-        
-    Returns:
-        A string containing the AI's response in JSON format.
-    """
-    print(f"Generating backend code for: '{task_description}'")
-
-    # --- PROMPT ENGINEERING FOR FASTAPI/PYTHON ---
-    prompt = f"""
-    You are an expert Senior Backend Developer specializing in Python with the FastAPI framework.
-    Your task is to generate the Python code for a single API endpoint based on the task description below.
+# The keys and types every response from this agent must contain.
+RESPONSE_SCHEMA = {"filename": str, "python_code": str}
 
+# Coding rules shared by the single-task and batched prompts.
+RULES = """\
     Follow these rules strictly:
     1.  Use FastAPI for all routing and API operations.
     2.  Use Pydantic models for data validation and serialization. Name the schemas clearly (e.g., TaskCreate, TaskRead).
     3.  Include Python type hints and clear docstrings for all functions and models.
     4.  For database operations, assume a SQLAlchemy session is available via FastAPI's dependency injection (`db: Session = Depends(get_db)`).
-    5.  Assume necessary models and schemas are defined in `database.py`, `models.py`, and `schemas.py`. You only need to write the router/endpoint logic.
+    5.  Assume necessary models and schemas are defined in `database.py`, `models.py`, and `schemas.py`. You only need to write the router/endpoint logic."""
 
-    Task Description:
-    ---
-    {task_description}
-    ---
+# Coding rules of the "performance" profile, for backends that must hold up under load.
+PERFORMANCE_RULES = """\
+    Follow these rules strictly; the code must sustain high request rates:
+    1.  Use FastAPI for all routing and API operations, and make every endpoint `async def`. Never do blocking I/O in an endpoint.
+    2.  Use async SQLAlchemy 2.0. Import the shared declarative base and session dependency with `from database import Base, get_session` and take the session as `session: AsyncSession = Depends(get_session)`. `database.py` provides one pooled async engine for the whole application; never create an engine, session factory or connection yourself.
+    3.  Define the SQLAlchemy models (subclasses of `Base` using `Mapped` and `mapped_column`) and the Pydantic schemas your router needs in the same file. Name the schemas clearly (e.g., TaskCreate, TaskRead) and give read schemas `model_config = ConfigDict(from_attributes=True)`.
+    4.  Index every column used for filtering, ordering, lookups or joins (`index=True`, or a composite `Index` in `__table_args__`), including foreign keys.
+    5.  Paginate every list endpoint: take `limit: int = Query(50, ge=1, le=500)` and `offset: int = Query(0, ge=0)`, apply them in SQL with a deterministic `order_by`, and never load a whole table.
+    6.  For every resource that can be created, also add a bulk-insert endpoint (e.g., `POST /api/tasks/bulk`) that takes a list of items and inserts them with a single `insert()` statement and one commit.
+    7.  Select only the rows you return, avoid N+1 queries (use `selectinload` for relationships) and commit at most once per request.
+    8.  Include Python type hints and clear docstrings for all functions and models."""
+
+EXAMPLE_CODE = "from fastapi import APIRouter, Depends\\n\\nrouter = APIRouter()\\n\\n@router.post('/login')\\ndef login():\\n    return {'message': 'Login successful'}"
+PERFORMANCE_EXAMPLE_CODE = "from fastapi import APIRouter\\n\\nrouter = APIRouter()\\n\\n@router.post('/login')\\nasync def login() -> dict:\\n    return {'message': 'Login successful'}"
+
+
+def _prompt_prefix(rules: str, example_code: str) -> str:
+    """
+    Builds the static instructions every single-task prompt starts with.
+
+    Only the task description that follows them varies, so providers can cache
+    this prefix once per run instead of processing it with every request.
+    """
+    return f"""
+    You are an expert Senior Backend Developer specializing in Python with the FastAPI framework.
+    Your task is to generate the Python code for a single API endpoint based on the task description at the end of this prompt.
+
+{rules}
 
     IMPORTANT: Your final output must be ONLY a valid JSON object. Do not include any other text, explanations, or markdown fences.
     The JSON object must have two keys:
@@ -50,15 +55,207 @@ def backend_agent(task_description: str) -> str:
     Example JSON structure:
     {{
       "filename": "auth_routes.py",
-      "python_code": "from fastapi import APIRouter, Depends\\n\\nrouter = APIRouter()\\n\\n@router.post('/login')\\ndef login():\\n    return {{'message': 'Login successful'}}"
+      "python_code": "{example_code}"
     }}
+"""
+
+
+def _batch_prompt_prefix(rules: str, example_code: str) -> str:
+    """Builds the static instructions of the batched prompt."""
+    return f"""
+    You are an expert Senior Backend Developer specializing in Python with the FastAPI framework.
+    Your task is to generate the Python code for several API endpoints, one file for each task description at the end of this prompt.
+
+{rules}
+
+    IMPORTANT: Your final output must be ONLY a valid JSON array with one object per task, in the same order as the task descriptions. Do not include any other text, explanations, or markdown fences.
+    Each object must have two keys:
+    1.  `filename`: A suitable filename for the code, following Python conventions (e.g., "task_routes.py"). Use a different filename for every task.
+    2.  `python_code`: A string containing the full, clean Python code for the specified task.
+
+    Example JSON structure:
+    [
+      {{
+        "filename": "auth_routes.py",
+        "python_code": "{example_code}"
+      }}
+    ]
+"""
+
+
+# Prompt profiles: the static prompt prefixes (single-task, batched) for each kind of backend.
+PROFILES = {
+    "default": (_prompt_prefix(RULES, EXAMPLE_CODE), _batch_prompt_prefix(RULES, EXAMPLE_CODE)),
+    "performance": (
+        _prompt_prefix(PERFORMANCE_RULES, PERFORMANCE_EXAMPLE_CODE),
+        _batch_prompt_prefix(PERFORMANCE_RULES, PERFORMANCE_EXAMPLE_CODE),
+    ),
+}
+PROMPT_PREFIX, BATCH_PROMPT_PREFIX = PROFILES["default"]
+DEFAULT_PROFILE = env_choice("BACKEND_PROFILE", "default", PROFILES)
+
+_profile = DEFAULT_PROFILE
+
+
+def configure_profile(name: str) -> str:
+    """Selects the prompt profile used for every following backend request."""
+    global _profile
+    if name not in PROFILES:
+        raise ValueError(f"Unknown backend profile '{name}'. Expected one of: {', '.join(PROFILES)}.")
+    _profile = name
+    return name
+
+
+def get_profile() -> str:
+    """Returns the selected prompt profile (BACKEND_PROFILE, or "default", unless configured)."""
+    return _profile
+
+
+def prompt_prefix() -> str:
+    """Returns the single-task prompt prefix of the selected profile."""
+    return PROFILES[_profile][0]
+
+
+def batch_prompt_prefix() -> str:
+    """Returns the batched prompt prefix of the selected profile."""
+    return PROFILES[_profile][1]
+
+def build_task_prompt(task_description: str, feedback: Optional[str] = None,
+                      reference: Optional[dict] = None, upstream: Optional[str] = None) -> str:
+    """
+    Builds the per-task part of the prompt, which follows `prompt_prefix()`.
+
+    Args:
+        task_description: A string describing a specific backend task.
+        feedback: Optional validation errors in the previous answer for this task.
+        reference: Optional earlier task and its answer (see `artifact_index`), to reuse or adapt.
+        upstream: Optional code of the tasks this task depends on (see `task_graph`).
+
+    Returns:
+        The prompt suffix for this task.
+    """
+    prompt = f"""
+    Task Description:
+    ---
+    {task_description}
+    ---
     """
+    if upstream:
+        prompt += f"""
+    This task builds on code that was already generated for the tasks it depends on.
+    Use the same module names, routes, fields and types:
+    {upstream}
+    """
+    if feedback:
+        prompt += f"""
+    Your previous answer for this task failed validation with these errors:
+    {feedback}
+    Fix every error and answer again with the complete JSON object.
+    """
+    if reference:
+        prompt += f"""
+    A similar task was implemented earlier. Its description and answer were:
+    Task: {reference["task"]}
+    Answer: {json.dumps(reference["code"])}
+    If that answer already does everything this task asks, reply with exactly {{"reuse_reference": true}} instead of repeating it.
+    Otherwise answer with the complete JSON object for this task, reusing as much of the earlier answer as fits.
+    """
+    return prompt
+
+def build_prompt(task_description: str) -> str:
+    """
+    Builds the backend agent's full prompt for a single task.
+
+    Args:
+        task_description: A string describing a specific backend task.
+
+    Returns:
+        The full prompt to send to the model.
+    """
+    # --- PROMPT ENGINEERING FOR FASTAPI/PYTHON ---
+    return prompt_prefix() + build_task_prompt(task_description)
+
+def build_batch_task_prompt(task_descriptions: list) -> str:
+    """
+    Builds the per-batch part of the batched prompt, which follows `batch_prompt_prefix()`.
+
+    Args:
+        task_descriptions: The backend task descriptions to generate code for.
+
+    Returns:
+        The prompt suffix for this batch.
+    """
+    return f"""
+    Task Descriptions (JSON array; answer with exactly {len(task_descriptions)} objects):
+    ---
+    {json.dumps(task_descriptions, indent=2)}
+    ---
+    """
+
+def build_batch_prompt(task_descriptions: list) -> str:
+    """
+    Builds a prompt asking for the code of several backend tasks in a single request.
+
+    Args:
+        task_descriptions: The backend task descriptions to generate code for.
+
+    Returns:
+        The full prompt to send to the model.
+    """
+    return batch_prompt_prefix() + build_batch_task_prompt(task_descriptions)
+
+def backend_agent(task_description: str, feedback: Optional[str] = None,
+                  reference: Optional[dict] = None, upstream: Optional[str] = None) -> str:
+    """
+    Generates backend code based on a task description.
     
+    Args:
+        task_description: A string describing a specific backend task.
+        feedback: Optional validation errors in a previous answer, to have them fixed.
+        reference: Optional earlier task and its answer to reuse or adapt.
+        upstream: Optional code of the tasks this task depends on.
+        
+    Returns:
+        A string containing the AI's response in JSON format.
+    """
+    if feedback:
+        print(f"Regenerating backend code for: '{task_description}' to fix validation errors")
+    elif reference:
+        print(f"Generating backend code for: '{task_description}' with a reference to '{reference['task']}'")
+    else:
+        print(f"Generating backend code for: '{task_description}'")
+
     # --- API CALL ---
-    model = genai.GenerativeModel('models/gemini-pro-latest')
-    response = model.generate_content(prompt)
-    
-    return response.text
+    return generate_content(build_task_prompt(task_description, feedback, reference, upstream),
+                            prefix=prompt_prefix(), hedge="backend")
+
+def backend_agent_stream(task_description: str, upstream: Optional[str] = None) -> Iterator[str]:
+    """
+    Like `backend_agent`, but yields the AI's JSON response in chunks as it is generated.
+
+    Args:
+        task_description: A string describing a specific backend task.
+        upstream: Optional code of the tasks this task depends on.
+
+    Returns:
+        An iterator over pieces of the AI's response.
+    """
+    print(f"Streaming backend code for: '{task_description}'")
+    return stream_content(build_task_prompt(task_description, upstream=upstream), prefix=prompt_prefix(), hedge="backend")
+
+def backend_agent_batch(task_descriptions: list) -> str:
+    """
+    Generates backend code for several tasks with a single request.
+
+    Args:
+        task_descriptions: The backend task descriptions to generate code for.
+
+    Returns:
+        A string containing the AI's response, a JSON array with one object per task.
+    """
+    print(f"Generating backend code for a batch of {len(task_descriptions)} tasks.")
+    return generate_content(build_batch_task_prompt(task_descriptions), prefix=batch_prompt_prefix(),
+                            hedge="backend_batch")
 
 # This block allows us to test the script directly
 if __name__ == "__main__":
@@ -75,12 +272,9 @@ if __name__ == "__main__":
         # --- PARSE AND SAVE THE OUTPUT ---
         print("\n--- Parsing and Saving Code ---")
         
-        # Clean the string by removing markdown fences
-        cleaned_json_str = raw_output.strip().replace("```json", "").replace("```", "").strip()
-        
         try:
-            # Convert the cleaned string into a Python dictionary
-            code_data = json.loads(cleaned_json_str)
+            # Extract, repair and validate the JSON object in the AI's response
+            code_data = extract_json(raw_output, RESPONSE_SCHEMA)
             
             # Extract the code parts
             filename = code_data["filename"]
@@ -102,7 +296,7 @@ if __name__ == "__main__":
             
             print(f"✅ Successfully saved code to: {file_path}")
 
-        except (json.JSONDecodeError, KeyError) as e:
+        except JSONExtractionError as e:
             print(f"Error: Failed to parse JSON or find expected keys. {e}")
             print("Raw response was:")
             print(raw_output)
@@ -0,0 +1,126 @@
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+from env_config import env_int
+from telemetry import span, traced
+
+DEFAULT_MAX_OUTPUT_TOKENS = env_int("MAX_OUTPUT_TOKENS", 8192)
+
+
+class BatchSizer:
+    """
+    Chooses how many tasks to pack into one request without overflowing the output limit.
+
+    The sizer keeps a moving average of the output tokens a single task needs
+    and fits as many tasks as possible into `headroom` of the model's output
+    token limit, never more than `max_batch_size`.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int,
+        initial_tokens_per_task: float,
+        max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS,
+        headroom: float = 0.8,
+    ):
+        self.max_batch_size = max(1, max_batch_size)
+        self.tokens_per_task = initial_tokens_per_task
+        self.max_output_tokens = max_output_tokens
+        self.headroom = headroom
+        self._lock = threading.Lock()
+
+    def next_size(self) -> int:
+        with self._lock:
+            fits = int(self.max_output_tokens * self.headroom // max(1.0, self.tokens_per_task))
+        return max(1, min(self.max_batch_size, fits))
+
+    def record(self, output_tokens: int, task_count: int) -> None:
+        """Updates the per-task estimate from a completed response."""
+        if task_count <= 0:
+            return
+        with self._lock:
+            self.tokens_per_task = 0.7 * self.tokens_per_task + 0.3 * (output_tokens / task_count)
+
+
+class BatchedWorker:
+    """
+    Runs a group of tasks through a batched agent call, falling back to single calls.
+
+    `batch_fn` receives a list of tasks and returns one entry per task, either
+    that task's result or the exception its part of the response raised.
+    Tasks whose entry is an exception, and every task of a batch whose call
+    failed outright, are retried individually with `single_fn`. Batches and
+    retries are traced as spans labelled with `kind`.
+    """
+
+    def __init__(self, batch_fn: Callable[[list], list], single_fn: Callable[[str], object], sizer: BatchSizer,
+                 kind: Optional[str] = None):
+        self.batch_fn = batch_fn
+        self.single_fn = single_fn
+        self.sizer = sizer
+        self.kind = kind
+
+    def submit_all(self, executor, tasks: list, concurrency: int) -> List[Future]:
+        """
+        Schedules every task on `executor` and returns one future per task, in order.
+
+        Up to `concurrency` workers repeatedly take the next batch off a shared
+        queue, so batch sizes follow the sizer's estimate as the run progresses.
+        """
+        futures = [Future() for _ in tasks]
+        queue = deque(zip(tasks, futures))
+        lock = threading.Lock()
+
+        def take_batch() -> list:
+            with lock:
+                size = self.sizer.next_size()
+                return [queue.popleft() for _ in range(min(size, len(queue)))]
+
+        def drain() -> None:
+            while True:
+                batch = take_batch()
+                if not batch:
+                    return
+                with span("batch", kind=self.kind, tasks=len(batch)):
+                    self._run_batch(executor, batch)
+
+        for _ in range(min(max(1, concurrency), len(tasks))):
+            executor.submit(drain)
+        return futures
+
+    def _run_batch(self, executor, batch: list) -> None:
+        batch_tasks = [task for task, _ in batch]
+        if len(batch) == 1:
+            outcomes = [self._call_single(batch_tasks[0])]
+        else:
+            try:
+                outcomes = self.batch_fn(batch_tasks)
+            except Exception as e:
+                print(f"⚠️ Batch of {len(batch)} tasks failed ({e}); splitting it into single calls.")
+                outcomes = [None] * len(batch)
+
+        for (task, future), outcome in zip(batch, outcomes):
+            if outcome is not None and not isinstance(outcome, Exception):
+                future.set_result(outcome)
+            elif len(batch) == 1:
+                future.set_exception(outcome)
+            else:
+                # Retry this task on its own, in parallel with the rest of the run.
+                retry = executor.submit(traced("task", self.single_fn, kind=self.kind, task=task, retry=True), task)
+                retry.add_done_callback(lambda done, future=future: _copy_outcome(done, future))
+
+    def _call_single(self, task: str):
+        try:
+            return self.single_fn(task)
+        except Exception as e:
+            return e
+
+
+def _copy_outcome(source: Future, target: Future) -> None:
+    error = source.exception()
+    if error is not None:
+        target.set_exception(error)
+    else:
+        target.set_result(source.result())
@@ -0,0 +1,375 @@
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from artifact_index import configure_artifact_index
+from env_config import EnvConfigError, check_env
+from hedging import DEFAULT_HEDGE_BUDGET, DEFAULT_HEDGE_PERCENTILE, configure_hedging
+from main import generate_project, pipeline_project, plan_project
+from model_client import continuation_stats, prompt_stats
+from model_providers import StubProvider, configure_provider
+from rate_limiter import configure_rate_limiter
+from response_cache import configure_response_cache
+from stage_timer import get_stage_timer, percentile
+from task_templates import configure_templates, template_stats
+from telemetry import get_telemetry
+
+DEFAULT_SIZES = (10, 100, 1000)
+BENCHMARK_BRIEF = "Build a simple task management application with a task list, a form and a database."
+
+
+# Section topics for `sectioned_brief`. The stub names its tasks after a brief's first words, so distinct topics
+# keep the sections' tasks from being merged as near-duplicates.
+SECTION_TOPICS = ("accounts profiles logins", "billing invoices refunds", "catalog products prices",
+                  "delivery routes drivers", "events tickets venues", "files uploads folders",
+                  "groups members roles", "inventory stock warehouses")
+
+
+def sectioned_brief(count: int) -> list:
+    """Returns `count` Markdown sections, one per topic, each about as long as `BENCHMARK_BRIEF`."""
+    topics = [SECTION_TOPICS[i % len(SECTION_TOPICS)] + ("" if i < len(SECTION_TOPICS) else f" batch{i}")
+              for i in range(count)]
+    return [f"## {topic.title()}\n\n{BENCHMARK_BRIEF}" for topic in topics]
+
+
+def git_revision():
+    """Returns the short commit hash of the checkout, or None outside a git repository."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def _time_python(code: str, repeat: int):
+    """Returns the median wall time of `python -c code` in a fresh interpreter, or None if it fails."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent,
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        samples.append(time.perf_counter() - start)
+    return percentile(samples, 50)
+
+
+# Measured inside a fresh interpreter: the first and second model call with the stub provider.
+_FIRST_CALL_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import model_client, model_providers, response_cache
+response_cache.configure_response_cache(mode="off")
+model_providers.configure_provider("stub")
+imported = time.perf_counter()
+model_client.generate_content("You are an expert AI Product Manager.\\n---\\nfirst\\n---")
+first = time.perf_counter()
+model_client.generate_content("You are an expert AI Product Manager.\\n---\\nsecond\\n---")
+second = time.perf_counter()
+print(json.dumps({"import_s": imported - start, "first_call_s": first - imported, "warm_call_s": second - first}))
+"""
+
+# The one-off cost of the Gemini SDK, which is now paid on the first real call instead of at import.
+_SDK_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import google.generativeai as genai
+imported = time.perf_counter()
+genai.configure(api_key="benchmark")
+print(json.dumps({"sdk_import_s": imported - start, "sdk_configure_s": time.perf_counter() - imported}))
+"""
+
+
+def _run_snippet(code: str):
+    result = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent,
+                            capture_output=True, text=True)
+    return json.loads(result.stdout) if result.returncode == 0 else None
+
+
+def run_startup_benchmark(repeat: int = 5) -> dict:
+    """
+    Measures CLI startup and first-call latency in fresh interpreters.
+
+    "before" is what every invocation paid when the agents imported the Gemini
+    SDK at module level, measured by importing the SDK along with the
+    pipeline. "after" is the pipeline import alone; the SDK is now imported on
+    the first real call. The SDK figures are None when `google-generativeai`
+    is not installed.
+    """
+    interpreter = _time_python("pass", repeat)
+    pipeline_import = _time_python("import main", repeat)
+    eager_import = _time_python("import google.generativeai, main", repeat)
+    help_run = _time_python("import sys, main; sys.argv = ['main.py', '--help']; main.main()", repeat)
+    calls = _run_snippet(_FIRST_CALL_SNIPPET) or {}
+    sdk = _run_snippet(_SDK_SNIPPET) or {}
+    sdk_import = sdk.get("sdk_import_s")
+    return {
+        "interpreter_s": interpreter,
+        "pipeline_import_s": pipeline_import,
+        "help_s": help_run,
+        "sdk_import_s": sdk_import,
+        "sdk_configure_s": sdk.get("sdk_configure_s"),
+        "stub_first_call_s": calls.get("first_call_s"),
+        "stub_warm_call_s": calls.get("warm_call_s"),
+        "before": {"import_s": eager_import},
+        "after": {"import_s": pipeline_import},
+    }
+
+
+def print_startup_report(result: dict) -> None:
+    def fmt(value):
+        return "n/a" if value is None else f"{value * 1000:.1f} ms"
+
+    print(f"\n  interpreter startup        {fmt(result['interpreter_s'])}")
+    print(f"  import pipeline            {fmt(result['pipeline_import_s'])}")
+    print(f"  main.py --help             {fmt(result['help_s'])}")
+    print(f"  Gemini SDK import          {fmt(result['sdk_import_s'])} (deferred to the first real call)")
+    print(f"  Gemini SDK configure       {fmt(result['sdk_configure_s'])} (once per process)")
+    print(f"  first call (stub)          {fmt(result['stub_first_call_s'])}")
+    print(f"  warm call (stub)           {fmt(result['stub_warm_call_s'])}")
+    print(f"  import before -> after     {fmt(result['before']['import_s'])} -> {fmt(result['after']['import_s'])}")
+
+
+def run_pipeline_benchmark(num_tasks: int, concurrency: int, latency_ms: float, latency_sigma: float, seed: int,
+                           stream: bool = False, batch_size: int = 1, pipeline: bool = False,
+                           chunk_delay_ms: float = 0.0, hedge: bool = False, hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+                           hedge_budget: float = DEFAULT_HEDGE_BUDGET, templates: bool = False,
+                           dependencies: bool = False, brief_sections: int = 1, max_output_chars: int = 0,
+                           verbose: bool = False) -> dict:
+    """
+    Runs the full coordinator -> frontend -> backend pipeline against the stub model.
+
+    The plan contains `num_tasks` tasks split evenly between frontend and backend.
+    Caching is disabled and the rate limiter is opened wide so only the
+    orchestration itself and the simulated model latency are measured. With
+    `pipeline`, tasks are dispatched while the plan is still streaming in;
+    `chunk_delay_ms` paces every streamed chunk, including the plan's. With
+    `hedge`, slow agent calls are hedged as with `main.py --hedge`. Template
+    rendering is off unless `templates` is set, so the model path is measured.
+    With `dependencies`, the plan declares dependencies between its tasks, so
+    they are scheduled as a graph. With `brief_sections` above 1, the brief
+    has that many sections, each planned by its own coordinator call that
+    returns its share of the tasks. With `max_output_chars`, longer answers
+    are cut off there and finished with continuation requests.
+
+    Returns:
+        A dict with the per-stage latency breakdown, throughput and peak memory.
+        If no usable plan came back (e.g. a plan still cut off after its
+        continuations), `plan_failed` is set and no task is counted.
+    """
+    provider = configure_provider(StubProvider(
+        latency_ms=latency_ms,
+        latency_sigma=latency_sigma,
+        seed=seed,
+        plan_size=math.ceil(num_tasks / 2 / max(1, brief_sections)),
+        chunk_delay_ms=chunk_delay_ms,
+        plan_dependencies=dependencies,
+        max_output_chars=max_output_chars,
+    ))
+    configure_response_cache(mode="off")
+    configure_rate_limiter(rpm=1e9, tpm=1e12)
+    hedging = configure_hedging(enabled=hedge, percentile=hedge_percentile, budget=hedge_budget)
+    timer = get_stage_timer()
+    timer.reset()
+    configure_templates(enabled=templates)
+    # Answers reused from earlier runs would hide the cost of generation.
+    configure_artifact_index(enabled=False)
+    prompt_stats.reset()
+    continuation_stats.reset()
+    template_stats.reset()
+    get_telemetry().reset()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench-") as output_root:
+        tracemalloc.start()
+        start = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            if not verbose:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+            if brief_sections > 1:
+                sections = sectioned_brief(brief_sections)
+                plan_data = plan_project("\n\n".join(sections), section_chars=max(map(len, sections)),
+                                         concurrency=concurrency)
+                if plan_data is not None:
+                    results = generate_project(plan_data, output_root=Path(output_root), concurrency=concurrency,
+                                               stream=stream, batch_size=batch_size)
+            elif pipeline:
+                outcome = pipeline_project(BENCHMARK_BRIEF, output_root=Path(output_root), concurrency=concurrency,
+                                           stream=stream)
+                plan_data, results = outcome if outcome is not None else (None, {})
+            else:
+                plan_data = plan_project(BENCHMARK_BRIEF)
+                if plan_data is not None:
+                    results = generate_project(plan_data, output_root=Path(output_root), concurrency=concurrency,
+                                               stream=stream, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    outcomes = [error is None for group in results.values() for _, _, error in group]
+    return {
+        "planned_tasks": num_tasks,
+        "plan_failed": plan_data is None,
+        "tasks": len(outcomes),
+        "succeeded": sum(outcomes),
+        "failed": len(outcomes) - sum(outcomes),
+        "model_calls": provider.calls,
+        "wall_time_s": elapsed,
+        "throughput_tasks_per_s": len(outcomes) / elapsed if elapsed else 0.0,
+        "peak_memory_mb": peak_bytes / (1024 * 1024),
+        "prompt_tokens": prompt_stats.as_dict(),
+        "continuations": continuation_stats.as_dict(),
+        "hedging": hedging.stats(),
+        "templates": template_stats.as_dict(),
+        "stages": timer.summary(),
+    }
+
+
+def print_report(result: dict) -> None:
+    if result["plan_failed"]:
+        print(f"\n{result['planned_tasks']} tasks: no usable plan after {result['wall_time_s']:.2f}s "
+              f"and {result['model_calls']} model call(s)")
+        continuations = result["continuations"]
+        if continuations["incomplete"]:
+            print(f"  output limit: {continuations['incomplete']} answer(s) still cut off after "
+                  f"{continuations['continuations']} continuation request(s)")
+        return
+    print(f"\n{result['tasks']} tasks: {result['wall_time_s']:.2f}s, "
+          f"{result['throughput_tasks_per_s']:.1f} tasks/s, peak memory {result['peak_memory_mb']:.1f} MB, "
+          f"{result['failed']} failed")
+    tokens = result["prompt_tokens"]
+    print(f"  prompt tokens: {tokens['prompt_tokens']} total, {tokens['billed_tokens']} after prefix caching")
+    hedging = result["hedging"]
+    if hedging["hedges"]:
+        print(f"  hedging: {hedging['hedges']} extra request(s) ({hedging['extra_request_rate']:.1%}), "
+              f"{hedging['hedge_wins']} won by the hedge")
+    continuations = result["continuations"]
+    if continuations["truncated"]:
+        print(f"  output limit: {continuations['truncated']} answer(s) cut off, {continuations['completed']} "
+              f"completed with {continuations['continuations']} continuation request(s)")
+    templates = result["templates"]
+    if templates["templated"]:
+        print(f"  templates: {templates['templated']} of {templates['tasks']} task(s) rendered locally "
+              f"({templates['templated_rate']:.1%})")
+    print(f"  {'stage':<12}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'total s':>10}")
+    for name, stats in result["stages"].items():
+        print(f"  {name:<12}{stats['count']:>8}{stats['p50_s'] * 1000:>10.2f}"
+              f"{stats['p95_s'] * 1000:>10.2f}{stats['p99_s'] * 1000:>10.2f}{stats['total_s']:>10.2f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the generation pipeline against a simulated model.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Plan sizes (total tasks) to benchmark (default: 10 100 1000).")
+    parser.add_argument("--concurrency", type=int, default=8, help="Agent concurrency limit (default: 8).")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Median simulated model latency (default: 20).")
+    parser.add_argument("--latency-sigma", type=float, default=0.5,
+                        help="Log-normal spread of the simulated latency (default: 0.5).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the simulated model (default: 0).")
+    parser.add_argument("--stream", action="store_true", help="Benchmark the streaming generation path.")
+    parser.add_argument("--batch-size", type=int, default=1, help="Tasks per agent request (default: 1).")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Start generating tasks while the coordinator's plan is still streaming.")
+    parser.add_argument("--chunk-delay-ms", type=float, default=0.0,
+                        help="Simulated delay between streamed chunks, including the plan's (default: 0).")
+    parser.add_argument("--hedge", action="store_true", help="Hedge slow agent calls with a duplicate request.")
+    parser.add_argument("--hedge-percentile", type=float, default=DEFAULT_HEDGE_PERCENTILE,
+                        help=f"Latency percentile after which a call is hedged (default: {DEFAULT_HEDGE_PERCENTILE:g}).")
+    parser.add_argument("--hedge-budget", type=float, default=DEFAULT_HEDGE_BUDGET,
+                        help=f"Most extra requests, as a fraction of agent calls (default: {DEFAULT_HEDGE_BUDGET:g}).")
+    parser.add_argument("--templates", action="store_true",
+                        help="Render tasks covered by a local template instead of calling the model.")
+    parser.add_argument("--dependencies", action="store_true",
+                        help="Have the plan declare dependencies between tasks, so they are scheduled as a graph.")
+    parser.add_argument("--brief-sections", type=int, default=1,
+                        help="Split the brief into this many sections, planned in parallel and merged (default: 1).")
+    parser.add_argument("--max-output-chars", type=int, default=0,
+                        help="Cut off model answers longer than this many characters, as an output token "
+                             "limit would, so they are finished with continuation requests (default: 0, no limit).")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON to this file.")
+    parser.add_argument("--startup", action="store_true",
+                        help="Measure CLI startup and first-call latency instead of the pipeline.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per startup measurement (default: 5).")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own progress output.")
+    args = parser.parse_args(argv)
+    try:
+        check_env()
+    except EnvConfigError as e:
+        parser.error(str(e))
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = {
+        "benchmark": "pipeline",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "concurrency": args.concurrency,
+            "latency_ms": args.latency_ms,
+            "latency_sigma": args.latency_sigma,
+            "seed": args.seed,
+            "stream": args.stream,
+            "batch_size": args.batch_size,
+            "pipeline": args.pipeline,
+            "chunk_delay_ms": args.chunk_delay_ms,
+            "hedge": args.hedge,
+            "hedge_percentile": args.hedge_percentile,
+            "hedge_budget": args.hedge_budget,
+            "templates": args.templates,
+            "dependencies": args.dependencies,
+            "brief_sections": args.brief_sections,
+            "max_output_chars": args.max_output_chars,
+        },
+        "results": [],
+    }
+
+    if args.startup:
+        print("--- ⏱️ Running startup benchmark ---")
+        report["benchmark"] = "startup"
+        report["config"] = {"repeat": args.repeat}
+        result = run_startup_benchmark(args.repeat)
+        report["results"].append(result)
+        print_startup_report(result)
+    else:
+        print("--- ⏱️ Running pipeline benchmark ---")
+        for size in args.sizes:
+            result = run_pipeline_benchmark(size, args.concurrency, args.latency_ms, args.latency_sigma, args.seed,
+                                            stream=args.stream, batch_size=args.batch_size, pipeline=args.pipeline,
+                                            chunk_delay_ms=args.chunk_delay_ms, hedge=args.hedge,
+                                            hedge_percentile=args.hedge_percentile, hedge_budget=args.hedge_budget,
+                                            templates=args.templates, dependencies=args.dependencies,
+                                            brief_sections=args.brief_sections, max_output_chars=args.max_output_chars,
+                                            verbose=args.verbose)
+            report["results"].append(result)
+            print_report(result)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\n✅ Results written to {args.output}")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import re
+import textwrap
+
+from env_config import env_int
+from task_graph import TaskGraph
+
+# Briefs longer than this many characters are planned section by section (0 plans every brief in one call).
+PLAN_SECTION_CHARS = env_int("PLAN_SECTION_CHARS", 12000)
+# How much of the brief's opening every section's prompt repeats, so the coordinator knows what is being built.
+OVERVIEW_MAX_CHARS = env_int("PLAN_OVERVIEW_CHARS", 600)
+
+_HEADING = re.compile(r"^ {0,3}#{1,6}\s+\S", re.M)
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# Finer and finer places to cut a block that is too long on its own: paragraphs, lines, sentences.
+_CUTS = (_PARAGRAPH_BREAK, re.compile(r"\n"), re.compile(r"(?<=[.!?])\s+"))
+
+
+def _blocks(text: str) -> list:
+    """Splits a brief at its markdown headings, or at blank lines if it has none."""
+    starts = [match.start() for match in _HEADING.finditer(text)]
+    if starts:
+        cuts = sorted({0, *starts}) + [len(text)]
+        blocks = [text[start:end] for start, end in zip(cuts, cuts[1:])]
+    else:
+        blocks = _PARAGRAPH_BREAK.split(text)
+    return [block.strip() for block in blocks if block.strip()]
+
+
+def _pieces(block: str, max_chars: int, cuts: tuple = _CUTS) -> list:
+    """Cuts a block into pieces of at most `max_chars`, at the coarsest boundary that gets there."""
+    if len(block) <= max_chars:
+        return [block]
+    for position, cut in enumerate(cuts):
+        parts = [part.strip() for part in cut.split(block) if part.strip()]
+        if len(parts) > 1:
+            return [piece for part in parts for piece in _pieces(part, max_chars, cuts[position:])]
+    return [block[start:start + max_chars] for start in range(0, len(block), max_chars)]
+
+
+def split_brief(brief: str, max_chars: int = PLAN_SECTION_CHARS) -> list:
+    """
+    Splits a long brief into sections the coordinator can plan independently.
+
+    The brief is cut at its markdown headings (or at blank lines when it has
+    none), and consecutive blocks are packed into sections of at most
+    `max_chars` characters. A block that is too long on its own is cut at
+    paragraphs, then lines, then sentences.
+
+    Args:
+        brief: The project brief.
+        max_chars: The longest section; 0 or a brief that fits returns the brief whole.
+
+    Returns:
+        The sections, in order.
+    """
+    if max_chars <= 0 or len(brief) <= max_chars:
+        return [brief]
+    sections = []
+    current = ""
+    for block in _blocks(textwrap.dedent(brief).strip()):
+        for piece in _pieces(block, max_chars):
+            if current and len(current) + 2 + len(piece) > max_chars:
+                sections.append(current)
+                current = ""
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        sections.append(current)
+    return sections
+
+
+def brief_overview(brief: str, max_chars: int = OVERVIEW_MAX_CHARS) -> str:
+    """Returns the brief's opening (its title and first paragraph), cut to `max_chars`."""
+    overview = []
+    for block in _PARAGRAPH_BREAK.split(textwrap.dedent(brief).strip()):
+        block = block.strip()
+        overview.append(block)
+        # A title on its own is kept together with the paragraph that follows it.
+        if "\n" in block or not _HEADING.match(block):
+            break
+    text = "\n\n".join(overview)
+    return text if len(text) <= max_chars else text[:max_chars].rsplit(" ", 1)[0] + " ..."
+
+
+def merge_plans(plans: list) -> dict:
+    """
+    Concatenates the plans of a brief's sections into one plan.
+
+    Each section numbers its tasks from F1 and B1, so its dependencies are
+    renumbered to the tasks' positions in the merged lists. Sections are
+    planned without seeing each other, so the merged plan has no
+    dependencies between tasks of different sections.
+    """
+    merged = {key: [task for plan in plans for task in plan.get(key, [])]
+              for key in ("frontend_tasks", "backend_tasks")}
+    nodes = []
+    dependencies = {}
+    for plan in plans:
+        graph = TaskGraph.from_plan(plan)
+        nodes.extend(graph.nodes)
+        for node, upstream in graph.dependencies.items():
+            dependencies.setdefault(node, []).extend(upstream)
+    ids = TaskGraph(nodes, dependencies).dependency_ids(merged)
+    if ids:
+        merged["dependencies"] = ids
+    return merged
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MANIFEST_FILENAME = ".build_manifest.json"
+
+
+def task_fingerprint(kind: str, prompt: str, model: str, upstream: tuple = ()) -> str:
+    """
+    Returns the hash identifying one task's inputs.
+
+    `prompt` is the agent's full prompt for the task, so it covers both the
+    task text and the prompt template; any change to either, or to the model,
+    produces a new fingerprint. `upstream` holds the fingerprints of the tasks
+    this task depends on, whose code goes into its prompt, so a change to any
+    of them changes this task's fingerprint too.
+    """
+    inputs = {"kind": kind, "prompt": prompt, "model": model}
+    if upstream:
+        inputs["upstream"] = sorted(upstream)
+    payload = json.dumps(inputs, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class BuildManifest:
+    """
+    Records which files each task produced, so unchanged tasks can be skipped.
+
+    The manifest lives in the output directory and maps every task fingerprint
+    to the task and the files (relative to the output directory) it wrote.
+    A task is up to date when its fingerprint is in the manifest and all of its
+    files still exist. Files whose task disappeared from the plan are pruned.
+    """
+
+    def __init__(self, output_root: Path):
+        self.output_root = Path(output_root)
+        self.path = self.output_root / MANIFEST_FILENAME
+        self.entries = {}
+        if self.path.exists():
+            try:
+                self.entries = json.loads(self.path.read_text(encoding="utf-8")).get("tasks", {})
+            except (json.JSONDecodeError, AttributeError):
+                print(f"⚠️ Ignoring unreadable build manifest at {self.path}; everything will be regenerated.")
+
+    def is_up_to_date(self, fingerprint: str) -> bool:
+        entry = self.entries.get(fingerprint)
+        return entry is not None and all((self.output_root / name).exists() for name in entry["files"])
+
+    def outputs(self, fingerprint: str) -> list:
+        """Returns the paths of the files recorded for a task."""
+        return [self.output_root / name for name in self.entries[fingerprint]["files"]]
+
+    def record(self, fingerprint: str, kind: str, task: str, files: list) -> None:
+        """Stores the files a task just produced."""
+        self.entries[fingerprint] = {
+            "kind": kind,
+            "task": task,
+            "files": sorted(Path(path).resolve().relative_to(self.output_root.resolve()).as_posix() for path in files),
+        }
+
+    def prune(self, current: set) -> list:
+        """
+        Forgets tasks that are no longer in the plan and deletes their files.
+
+        Files still produced by a current task are kept, and directories left
+        empty are removed.
+
+        Args:
+            current: The fingerprints of every task in the current plan.
+
+        Returns:
+            The relative paths of the deleted files.
+        """
+        stale = {fingerprint: entry for fingerprint, entry in self.entries.items() if fingerprint not in current}
+        kept = {name for fingerprint, entry in self.entries.items() if fingerprint in current for name in entry["files"]}
+        removed = []
+        for fingerprint, entry in stale.items():
+            for name in entry["files"]:
+                path = self.output_root / name
+                if name not in kept and path.exists():
+                    path.unlink()
+                    removed.append(name)
+                    self._remove_empty_dirs(path.parent)
+            del self.entries[fingerprint]
+        return removed
+
+    def _remove_empty_dirs(self, directory: Path) -> None:
+        root = self.output_root.resolve()
+        directory = directory.resolve()
+        while directory != root and root in directory.parents and not any(directory.iterdir()):
+            directory.rmdir()
+            directory = directory.parent
+
+    def save(self) -> None:
+        """Writes the manifest atomically, so an interrupted run never corrupts it."""
+        self.output_root.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        temp_path.write_text(json.dumps({"tasks": self.entries}, indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(temp_path, self.path)
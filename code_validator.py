@@ -0,0 +1,390 @@
+import ast
+import importlib.util
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+# Modules the backend prompt tells the agent to assume exist (see backend_agent.RULES).
+ASSUMED_MODULES = frozenset(
+    name for name in os.getenv("VALIDATE_ASSUMED_MODULES", "database,models,schemas").split(",") if name
+)
+# Third-party packages generated code may import even when they are not installed here.
+KNOWN_PACKAGES = frozenset(
+    name for name in os.getenv(
+        "VALIDATE_KNOWN_PACKAGES",
+        "fastapi,pydantic,pydantic_settings,sqlalchemy,starlette,uvicorn,jose,jwt,passlib,bcrypt,"
+        "email_validator,httpx,requests,dotenv,alembic,typing_extensions",
+    ).split(",") if name
+)
+SCRIPT_SUFFIXES = (".tsx", ".ts", ".jsx", ".js")
+MAX_ERRORS_PER_FILE = 10
+
+_STYLE_IMPORT = re.compile(r"""import\s+(\w+)\s+from\s+['"]([^'"]+\.module\.css)['"]""")
+_RELATIVE_IMPORT = re.compile(r"""(?:from|import)\s+['"](\.{1,2}/[^'"]*)['"]""")
+_CSS_CLASS = re.compile(r"\.(-?[_a-zA-Z][_a-zA-Z0-9-]*)")
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+
+
+class CodeValidationError(Exception):
+    """Raised for a task whose generated files still fail validation after regeneration."""
+
+
+# --- Python ---------------------------------------------------------------
+
+def module_index(root: Path) -> dict:
+    """
+    Maps the dotted name of every module and package under `root` to its path.
+
+    Packages map to their directory, with or without an `__init__.py`.
+    """
+    index = {}
+    root = Path(root)
+    for path in root.rglob("*.py"):
+        parts = path.relative_to(root).with_suffix("").parts
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        if parts:
+            index[".".join(parts)] = str(path)
+        for depth in range(1, len(parts)):
+            index.setdefault(".".join(parts[:depth]), str(root.joinpath(*parts[:depth])))
+    return index
+
+
+@lru_cache(maxsize=None)
+def _top_level_names(path: str, mtime: float) -> Optional[frozenset]:
+    """Returns the names a module defines at its top level, or None if that cannot be known."""
+    if os.path.isdir(path):
+        path = os.path.join(path, "__init__.py")
+        if not os.path.exists(path):
+            return frozenset()
+    try:
+        tree = ast.parse(Path(path).read_text(encoding="utf-8"))
+    except (OSError, SyntaxError, ValueError):
+        return None
+    names = set()
+    statements = list(tree.body)
+    while statements:
+        node = statements.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name == "*":
+                    return None
+                names.add((alias.asname or alias.name).split(".")[0])
+        elif isinstance(node, (ast.If, ast.Try, ast.With, ast.For, ast.While)):
+            # Names bound in module-level blocks, e.g. `try: import x except ImportError: ...`.
+            for field in ("body", "orelse", "finalbody", "handlers"):
+                statements.extend(getattr(node, field, []))
+            if isinstance(node, ast.For):
+                names.update(n.id for n in ast.walk(node.target) if isinstance(n, ast.Name))
+        elif isinstance(node, ast.ExceptHandler):
+            statements.extend(node.body)
+        else:
+            names.update(
+                n.id for n in ast.walk(node) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)
+            )
+    if "__getattr__" in names:
+        return None
+    return frozenset(names)
+
+
+def _defines(index: dict, module: str, name: str) -> bool:
+    if f"{module}.{name}" in index:
+        return True
+    path = index[module]
+    names = _top_level_names(path, os.path.getmtime(path))
+    return names is None or name in names
+
+
+def _external_ok(module: str) -> bool:
+    top = module.split(".")[0]
+    if top in sys.stdlib_module_names or top in KNOWN_PACKAGES or top in ASSUMED_MODULES:
+        return True
+    try:
+        return importlib.util.find_spec(top) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def check_python(path: Path, root: Path, index: dict) -> list:
+    """
+    Compiles a generated Python file and resolves its imports against the generated tree.
+
+    Imports of modules in the tree must name modules and attributes that
+    exist there, relative imports must stay inside the tree, and other imports
+    must be the standard library, installed, or known dependencies. Attribute
+    access on an imported tree module (e.g. `crud.get_task`) is checked too.
+
+    Args:
+        path: The file to check.
+        root: The root of the generated Python tree (e.g. `output/backend`).
+        index: The tree's `module_index`.
+
+    Returns:
+        A list of human-readable errors, empty if the file looks valid.
+    """
+    try:
+        source = Path(path).read_text(encoding="utf-8")
+        tree = ast.parse(source, filename=str(path))
+        compile(tree, str(path), "exec")
+    except SyntaxError as e:
+        return [f"SyntaxError: {e.msg} (line {e.lineno})"]
+    except (OSError, ValueError) as e:
+        return [f"Could not read the file: {e}"]
+
+    parts = Path(path).relative_to(root).with_suffix("").parts
+    package = parts[:-1]
+    errors = []
+    aliases = {}
+
+    # Imports guarded by `except ImportError` are optional, so an unknown module is fine there.
+    optional = {
+        id(child)
+        for node in ast.walk(tree) if isinstance(node, ast.Try) and any(
+            handler.type is None or any(
+                isinstance(name, ast.Name) and name.id in ("ImportError", "ModuleNotFoundError", "Exception")
+                for name in ast.walk(handler.type)
+            )
+            for handler in node.handlers
+        )
+        for statement in node.body for child in ast.walk(statement)
+    }
+
+    def check_module(module: str, node: ast.stmt) -> bool:
+        """Returns True if `module` is in the tree; records an error if it cannot be found at all."""
+        if module in index:
+            return True
+        if module.split(".")[0] in index:
+            errors.append(f"line {node.lineno}: module '{module}' does not exist in the generated code.")
+        elif id(node) not in optional and not _external_ok(module):
+            errors.append(f"line {node.lineno}: module '{module}' is neither in the generated code "
+                          f"nor a known dependency.")
+        return False
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if check_module(alias.name, node):
+                    if alias.asname:
+                        aliases[alias.asname] = alias.name
+                    elif "." not in alias.name:
+                        aliases[alias.name] = alias.name
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                if node.level - 1 > len(package):
+                    errors.append(f"line {node.lineno}: relative import '{'.' * node.level}{node.module or ''}' "
+                                  f"goes above the top of the generated code.")
+                    continue
+                base = package[:len(package) - (node.level - 1)]
+                module = ".".join(base + tuple((node.module or "").split(".")) if node.module else base)
+                if not module:
+                    # `from . import x` at the top of the tree: each name must be a top-level module.
+                    for alias in node.names:
+                        if alias.name not in index and alias.name not in ASSUMED_MODULES:
+                            errors.append(f"line {node.lineno}: module '{alias.name}' does not exist in the generated code.")
+                        elif alias.name in index:
+                            aliases[alias.asname or alias.name] = alias.name
+                    continue
+                if module not in index:
+                    if module.split(".")[0] in ASSUMED_MODULES and not base:
+                        continue
+                    errors.append(f"line {node.lineno}: module '{'.' * node.level}{node.module or ''}' "
+                                  f"does not exist in the generated code.")
+                    continue
+            else:
+                module = node.module
+                if not check_module(module, node):
+                    continue
+            for alias in node.names:
+                if alias.name == "*":
+                    continue
+                if not _defines(index, module, alias.name):
+                    errors.append(f"line {node.lineno}: '{alias.name}' is not defined in module '{module}'.")
+                elif f"{module}.{alias.name}" in index:
+                    aliases[alias.asname or alias.name] = f"{module}.{alias.name}"
+
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name)
+                and node.value.id in aliases and isinstance(node.ctx, ast.Load)):
+            module = aliases[node.value.id]
+            if not _defines(index, module, node.attr):
+                errors.append(f"line {node.lineno}: module '{module}' has no attribute '{node.attr}'.")
+    return list(dict.fromkeys(errors))
+
+
+# --- TSX / CSS ------------------------------------------------------------
+
+_CLOSERS = {")": "(", "]": "[", "}": "{"}
+
+
+def _unbalanced(source: str, strings: str = "'\"`") -> Optional[str]:
+    """
+    Returns a description of the first unbalanced bracket in `source`, or None.
+
+    Comments and string literals are skipped. Quotes do not carry over a line
+    break (except in template literals), so stray apostrophes in JSX text only
+    affect their own line.
+    """
+    stack = []
+    line = 1
+    i = 0
+    quote = None
+    while i < len(source):
+        char = source[i]
+        if char == "\n":
+            line += 1
+            if quote in ("'", '"'):
+                quote = None
+        if quote:
+            if char == "\\":
+                i += 1
+            elif char == quote:
+                quote = None
+        elif source.startswith("//", i) and "`" in strings:
+            end = source.find("\n", i)
+            i = len(source) if end == -1 else end
+            continue
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            if end == -1:
+                return f"unterminated comment starting on line {line}"
+            line += source.count("\n", i, end)
+            i = end + 2
+            continue
+        elif char in strings:
+            quote = char
+        elif char in "([{":
+            stack.append((char, line))
+        elif char in _CLOSERS:
+            if not stack or stack[-1][0] != _CLOSERS[char]:
+                return f"unexpected '{char}' on line {line}"
+            stack.pop()
+        i += 1
+    if quote == "`":
+        return "unterminated template literal"
+    if stack:
+        char, opened = stack[-1]
+        return f"'{char}' opened on line {opened} is never closed"
+    return None
+
+
+def _resolve_script_import(base: Path, target: str) -> Optional[Path]:
+    candidate = (base / target).resolve()
+    if candidate.is_file():
+        return candidate
+    for suffix in SCRIPT_SUFFIXES:
+        if candidate.with_name(candidate.name + suffix).is_file():
+            return candidate.with_name(candidate.name + suffix)
+        if (candidate / f"index{suffix}").is_file():
+            return candidate / f"index{suffix}"
+    return None
+
+
+def css_classes(source: str) -> set:
+    """Returns the class names a stylesheet defines, from its selectors."""
+    selectors = re.sub(r"\{[^{}]*\}", "{}", _CSS_COMMENT.sub("", source))
+    return set(_CSS_CLASS.findall(re.sub(r"\{\}", " ", selectors)))
+
+
+def check_script(path: Path) -> list:
+    """
+    Runs lightweight structural checks on a generated TSX/TS file.
+
+    Brackets must balance, the file must export something, relative imports
+    must point at existing files, and every `styles.name` used with an
+    imported CSS module must be a class that stylesheet defines.
+
+    Returns:
+        A list of human-readable errors, empty if the file looks valid.
+    """
+    try:
+        source = Path(path).read_text(encoding="utf-8")
+    except (OSError, ValueError) as e:
+        return [f"Could not read the file: {e}"]
+    errors = []
+    problem = _unbalanced(source)
+    if problem:
+        errors.append(f"Unbalanced brackets: {problem}.")
+    if not re.search(r"^\s*export\s", source, re.M):
+        errors.append("The file does not export anything.")
+    base = Path(path).parent
+    for target in _RELATIVE_IMPORT.findall(source):
+        if _resolve_script_import(base, target) is None:
+            errors.append(f"Import '{target}' does not match any generated file.")
+    for name, target in _STYLE_IMPORT.findall(source):
+        stylesheet = _resolve_script_import(base, target)
+        if stylesheet is None:
+            continue
+        defined = css_classes(stylesheet.read_text(encoding="utf-8"))
+        used = set(re.findall(rf"\b{name}\.([_a-zA-Z][_a-zA-Z0-9]*)", source))
+        used |= set(re.findall(rf"\b{name}\[['\"]([^'\"]+)['\"]\]", source))
+        for missing in sorted(used - defined):
+            errors.append(f"Class '.{missing}' is used but not defined in '{target}'.")
+    return errors
+
+
+def check_css(path: Path) -> list:
+    """Checks that a generated stylesheet's braces, comments and strings are balanced."""
+    try:
+        source = Path(path).read_text(encoding="utf-8")
+    except (OSError, ValueError) as e:
+        return [f"Could not read the file: {e}"]
+    problem = _unbalanced(source, strings="'\"")
+    return [f"Unbalanced CSS: {problem}."] if problem else []
+
+
+# --- Running the checks ---------------------------------------------------
+
+_worker_state = {}
+
+
+def _init_worker(output_root: str, index: dict) -> None:
+    _worker_state["python_root"] = Path(output_root) / "backend"
+    _worker_state["index"] = index
+
+
+def _check_file(path: str) -> tuple:
+    file_path = Path(path)
+    if file_path.suffix == ".py":
+        errors = check_python(file_path, _worker_state["python_root"], _worker_state["index"])
+    elif file_path.suffix in SCRIPT_SUFFIXES:
+        errors = check_script(file_path)
+    elif file_path.suffix == ".css":
+        errors = check_css(file_path)
+    else:
+        errors = []
+    return path, errors[:MAX_ERRORS_PER_FILE]
+
+
+def validate_files(files: list, output_root: Path, workers: Optional[int] = None) -> dict:
+    """
+    Validates generated files in parallel, in a pool of worker processes.
+
+    Python files are compiled and their imports resolved against the whole
+    generated backend tree, not just the files being checked. Parsing is
+    CPU-bound, so processes (rather than threads) let large projects use every
+    core.
+
+    Args:
+        files: The files to check.
+        output_root: The directory the project was generated into.
+        workers: The number of processes (default: one per CPU, at most one per file).
+
+    Returns:
+        A dict mapping each file that failed to its list of errors.
+    """
+    files = [str(path) for path in files if Path(path).exists()]
+    if not files:
+        return {}
+    index = module_index(Path(output_root) / "backend")
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files)))
+    chunksize = max(1, len(files) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(str(output_root), index)) as pool:
+        results = pool.map(_check_file, files, chunksize=chunksize)
+        return {Path(path): errors for path, errors in results if errors}
@@ -1,32 +1,44 @@
-import os
-import json
-import google.generativeai as genai
-from dotenv import load_dotenv
-
-def initialize_gemini():
-    """Loads API key and configures the Gemini client."""
-    load_dotenv()
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY not found. Please check your .env file.")
-    genai.configure(api_key=api_key)
-    print("Gemini API initialized successfully.")
-
-def coordinator_agent(project_brief: str) -> str:
+from typing import Iterator, Optional
+
+from json_extract import JSONExtractionError, ListOf, extract_json
+from model_client import generate_content, initialize_gemini, stream_content
+
+# The keys and types every response from this agent must contain.
+RESPONSE_SCHEMA = {"frontend_tasks": ListOf(str), "backend_tasks": ListOf(str)}
+
+def section_note(position: int, total: int, overview: str) -> str:
     """
-    Analyzes the project brief and decomposes it into tasks using the Gemini API.
-    
+    Tells the coordinator that it is planning one section of a longer brief.
+
     Args:
-        project_brief: A string containing the user's project description.
-        
-    Returns:
-        A string containing the AI's response in JSON format.
+        position: The section's number, from 1.
+        total: How many sections the brief was split into.
+        overview: The brief's opening, so the section is planned in context.
     """
-    print(f"Received project brief. Analyzing and decomposing...")
+    return f"""
+    The project brief is too long to plan at once, so it was split into {total} sections that are planned
+    separately. You only see section {position} of {total}. List only the tasks this section asks for; the other
+    sections' tasks are planned elsewhere. Number the tasks and dependencies within this section, starting at F1 and B1.
+    For context, the full brief starts with:
+    {overview}
+    """
+
+def build_prompt(project_brief: str, section: Optional[str] = None) -> str:
+    """
+    Builds the coordinator agent's prompt for a project brief.
+
+    Args:
+        project_brief: A string containing the user's project description,
+            or one section of it.
+        section: When `project_brief` is a section of a longer brief, a
+            `section_note` describing it.
 
+    Returns:
+        The full prompt to send to the model.
+    """
     # --- PROMPT ENGINEERING ---
     # We instruct the AI on its role, the format of the output, and the task to perform.
-    prompt = f"""
+    return f"""
     You are an expert AI Product Manager. Your role is to analyze a project brief
     and break it down into a structured list of actionable tasks for a software development team.
 
@@ -34,13 +46,19 @@ def coordinator_agent(project_brief: str) -> str:
     1.  `frontend_tasks`: Specific tasks for a frontend developer (e.g., creating React components).
     2.  `backend_tasks`: Specific tasks for a backend developer (e.g., creating API endpoints, database schemas).
 
+    Tasks are identified by their position: F1 is the first frontend task, F2 the second, and B1 the first backend task.
+    Also list which tasks build on the code of other tasks, such as a router that uses a database schema, or a
+    component that calls an endpoint, under `dependencies`: an object mapping a task ID to the IDs it depends on.
+    Leave out tasks without dependencies, and never make a task depend on itself or on a task that depends on it.
+    {section or ""}
     The project brief is as follows:
     ---
     {project_brief}
     ---
 
     IMPORTANT: Your final output must be ONLY a valid JSON object, with no other text before or after it.
-    The JSON object should have two keys: "frontend_tasks" and "backend_tasks", where each key holds a list of strings.
+    The JSON object should have the keys "frontend_tasks" and "backend_tasks", where each key holds a list of strings,
+    and "dependencies", which maps task IDs to lists of task IDs.
 
     Example format:
     {{
@@ -51,17 +69,47 @@ def coordinator_agent(project_brief: str) -> str:
       "backend_tasks": [
         "Set up a database schema for a 'users' table.",
         "Create a REST API endpoint for user authentication."
-      ]
+      ],
+      "dependencies": {{
+        "F2": ["B2"],
+        "B2": ["B1"]
+      }}
     }}
     """
 
-    # --- API CALL ---
-    # Initialize the model and generate the content
-    model = genai.GenerativeModel('models/gemini-pro-latest')
-    response = model.generate_content(prompt)
+def coordinator_agent(project_brief: str, section: Optional[str] = None) -> str:
+    """
+    Analyzes the project brief and decomposes it into tasks using the Gemini API.
     
+    Args:
+        project_brief: A string containing the user's project description,
+            or one section of it.
+        section: When `project_brief` is a section of a longer brief, a
+            `section_note` describing it.
+        
+    Returns:
+        A string containing the AI's response in JSON format.
+    """
+    if section is None:
+        print(f"Received project brief. Analyzing and decomposing...")
+
+    # --- API CALL ---
+    # Generate the content (served from the response cache when possible)
     # For now, we'll return the raw text. We'll parse it in the next step.
-    return response.text
+    return generate_content(build_prompt(project_brief, section))
+
+def coordinator_agent_stream(project_brief: str) -> Iterator[str]:
+    """
+    Like `coordinator_agent`, but yields the AI's JSON plan in chunks as it is generated.
+
+    Args:
+        project_brief: A string containing the user's project description.
+
+    Returns:
+        An iterator over pieces of the AI's response.
+    """
+    print("Received project brief. Streaming the task breakdown...")
+    return stream_content(build_prompt(project_brief))
 
 # This block allows us to test the script directly
 if __name__ == "__main__":
@@ -83,12 +131,9 @@ if __name__ == "__main__":
         # 4. Clean and Parse the AI's output
         print("\n--- Parsing Agent's Output ---")
         
-        # Clean the string by removing markdown fences and stripping whitespace
-        cleaned_json_str = raw_output.strip().replace("```json", "").replace("```", "").strip()
-        
         try:
-            # Convert the cleaned string into a Python dictionary
-            tasks_data = json.loads(cleaned_json_str)
+            # Extract, repair and validate the JSON object in the AI's response
+            tasks_data = extract_json(raw_output, RESPONSE_SCHEMA)
             
             print("Successfully parsed JSON.")
             
@@ -105,8 +150,8 @@ if __name__ == "__main__":
                 
             print("\n------------------------")
             
-        except json.JSONDecodeError:
-            print("Error: Failed to decode JSON from the AI's response.")
+        except JSONExtractionError as e:
+            print(f"Error: Failed to decode JSON from the AI's response. {e}")
             print("Raw response was:")
             print(raw_output)
 
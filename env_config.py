@@ -0,0 +1,60 @@
+import os
+import threading
+
+_invalid = {}
+_lock = threading.Lock()
+
+
+class EnvConfigError(ValueError):
+    """Raised when numeric settings in the environment are not valid numbers."""
+
+
+def _read(name: str, default, kind: type, description: str):
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return kind(value)
+    except ValueError:
+        with _lock:
+            _invalid[name] = f"{name}={value!r} is not {description}"
+        return default
+
+
+def env_int(name: str, default: int) -> int:
+    """
+    Reads an integer setting from the environment.
+
+    An invalid value does not raise here, since settings are read when modules
+    are imported (which would break even `--help`); the default is returned
+    instead and `check_env` reports the value.
+    """
+    return _read(name, default, int, "an integer")
+
+
+def env_float(name: str, default: float) -> float:
+    """Reads a number setting from the environment, like `env_int`."""
+    return _read(name, default, float, "a number")
+
+
+def env_choice(name: str, default: str, choices) -> str:
+    """Reads a setting that must be one of `choices` from the environment, like `env_int`."""
+    def choose(value: str) -> str:
+        if value not in choices:
+            raise ValueError(value)
+        return value
+
+    return _read(name, default, choose, f"one of: {', '.join(choices)}")
+
+
+def check_env() -> None:
+    """
+    Reports every invalid setting read by `env_int`, `env_float` or `env_choice` so far.
+
+    Raises:
+        EnvConfigError: If any setting was invalid.
+    """
+    with _lock:
+        problems = list(_invalid.values())
+    if problems:
+        raise EnvConfigError(f"Invalid environment setting(s): {'; '.join(problems)}.")
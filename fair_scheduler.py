@@ -0,0 +1,98 @@
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+
+class FairScheduler:
+    """
+    A fixed pool of worker threads shared by several projects, serving them in turn.
+
+    Work is queued per project, and idle workers take the next job from each
+    project with pending work in round-robin order. A project that queues a
+    thousand tasks therefore cannot starve one that queues ten: every project
+    with work waiting gets one slot per round, so all of them progress at once
+    under the same concurrency (and, through the shared rate limiter, the same
+    API budget).
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = max(1, concurrency)
+        self._queues = {}
+        self._ring = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f"fair-worker-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, project: str, fn, *args, **kwargs) -> Future:
+        """Queues `fn(*args, **kwargs)` on behalf of `project` and returns its future."""
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Cannot submit work to a scheduler that has been shut down.")
+            queue = self._queues.setdefault(project, deque())
+            if not queue:
+                self._ring.append(project)
+            queue.append((future, fn, args, kwargs))
+            self._condition.notify()
+        return future
+
+    def executor_for(self, project: str) -> "ProjectExecutor":
+        """Returns an executor-like view that submits everything on behalf of `project`."""
+        return ProjectExecutor(self, project)
+
+    def _next_job(self):
+        with self._condition:
+            while not self._ring:
+                if self._closed:
+                    return None
+                self._condition.wait()
+            project = self._ring.popleft()
+            queue = self._queues[project]
+            job = queue.popleft()
+            if queue:
+                self._ring.append(project)
+            return job
+
+    def _work(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            future, fn, args, kwargs = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops the workers once every queued job has run."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self) -> "FairScheduler":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+
+class ProjectExecutor:
+    """The `submit` interface of an executor, bound to one project of a `FairScheduler`."""
+
+    def __init__(self, scheduler: FairScheduler, project: str):
+        self.scheduler = scheduler
+        self.project = project
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        return self.scheduler.submit(self.project, fn, *args, **kwargs)
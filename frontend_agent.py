@@ -1,45 +1,29 @@
-import os
-import json 
+import json
 from pathlib import Path
-import google.generativeai as genai
-from dotenv import load_dotenv
+from typing import Iterator, Optional
 
-def initialize_gemini():
-    """Loads API key and configures the Gemini client."""
-    load_dotenv()
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY not found. Please check your .env file.")
-    genai.configure(api_key=api_key)
-    print("Gemini API initialized successfully for Frontend Agent.")
+from json_extract import JSONExtractionError, extract_json
+from model_client import generate_content, initialize_gemini, stream_content
 
-def frontend_agent(task_description: str) -> str:
-    """
-    Generates frontend code based on a task description.
-    
-    Args:
-        task_description: A string describing a specific frontend task.
-        
-    Returns:
-        A string containing the AI's response in JSON format.
-    """
-    print(f"Generating frontend code for: '{task_description}'")
-
-    # --- PROMPT ENGINEERING FOR REACT/TYPESCRIPT ---
-    prompt = f"""
-    You are an expert Senior Frontend Developer specializing in React and TypeScript.
-    Your task is to generate the code for a single React functional component based on the task description below.
+# The keys and types every response from this agent must contain.
+RESPONSE_SCHEMA = {"component_name": str, "tsx_code": str, "css_code": str}
 
+# Coding rules shared by the single-task and batched prompts.
+RULES = """\
     Follow these rules strictly:
     1.  Use modern functional components with React Hooks.
     2.  Use TypeScript for all prop definitions. Define props in an `interface` named `Props`.
     3.  Use CSS Modules for styling. The generated CSS should be a placeholder, but functional.
-    4.  The component file should be self-contained.
+    4.  The component file should be self-contained."""
 
-    Task Description:
-    ---
-    {task_description}
-    ---
+# The static instructions every single-task prompt starts with. Only the task
+# description that follows them varies, so providers can cache this prefix once
+# per run instead of processing it with every request.
+PROMPT_PREFIX = f"""
+    You are an expert Senior Frontend Developer specializing in React and TypeScript.
+    Your task is to generate the code for a single React functional component based on the task description at the end of this prompt.
+
+{RULES}
 
     IMPORTANT: Your final output must be ONLY a valid JSON object. Do not include any other text, explanations, or markdown fences.
     The JSON object must have three keys:
@@ -53,13 +37,167 @@ def frontend_agent(task_description: str) -> str:
       "tsx_code": "import React from 'react';\\nimport styles from './MyComponent.module.css';\\n...",
       "css_code": ".container {{ \\n  background-color: #f0f0f0;\\n }}"
     }}
+"""
+
+# The static instructions of the batched prompt.
+BATCH_PROMPT_PREFIX = f"""
+    You are an expert Senior Frontend Developer specializing in React and TypeScript.
+    Your task is to generate the code for several React functional components, one for each task description at the end of this prompt.
+
+{RULES}
+
+    IMPORTANT: Your final output must be ONLY a valid JSON array with one object per task, in the same order as the task descriptions. Do not include any other text, explanations, or markdown fences.
+    Each object must have three keys:
+    1.  `component_name`: A suitable PascalCase name for the component (e.g., "TaskItem").
+    2.  `tsx_code`: A string containing the full code for the React component (`.tsx` file).
+    3.  `css_code`: A string containing the placeholder CSS code for the component's CSS Module (`.module.css` file).
+
+    Example JSON structure:
+    [
+      {{
+        "component_name": "MyComponent",
+        "tsx_code": "import React from 'react';\\nimport styles from './MyComponent.module.css';\\n...",
+        "css_code": ".container {{ \\n  background-color: #f0f0f0;\\n }}"
+      }}
+    ]
+"""
+
+def build_task_prompt(task_description: str, feedback: Optional[str] = None,
+                      reference: Optional[dict] = None, upstream: Optional[str] = None) -> str:
     """
+    Builds the per-task part of the prompt, which follows `PROMPT_PREFIX`.
 
-    # --- API CALL ---
-    model = genai.GenerativeModel('models/gemini-pro-latest')
-    response = model.generate_content(prompt)
+    Args:
+        task_description: A string describing a specific frontend task.
+        feedback: Optional validation errors in the previous answer for this task.
+        reference: Optional earlier task and its answer (see `artifact_index`), to reuse or adapt.
+        upstream: Optional code of the tasks this task depends on (see `task_graph`).
+
+    Returns:
+        The prompt suffix for this task.
+    """
+    prompt = f"""
+    Task Description:
+    ---
+    {task_description}
+    ---
+    """
+    if upstream:
+        prompt += f"""
+    This task builds on code that was already generated for the tasks it depends on.
+    Use the same module names, routes, fields and types:
+    {upstream}
+    """
+    if feedback:
+        prompt += f"""
+    Your previous answer for this task failed validation with these errors:
+    {feedback}
+    Fix every error and answer again with the complete JSON object.
+    """
+    if reference:
+        prompt += f"""
+    A similar task was implemented earlier. Its description and answer were:
+    Task: {reference["task"]}
+    Answer: {json.dumps(reference["code"])}
+    If that answer already does everything this task asks, reply with exactly {{"reuse_reference": true}} instead of repeating it.
+    Otherwise answer with the complete JSON object for this task, reusing as much of the earlier answer as fits.
+    """
+    return prompt
+
+def build_prompt(task_description: str) -> str:
+    """
+    Builds the frontend agent's full prompt for a single task.
+
+    Args:
+        task_description: A string describing a specific frontend task.
+
+    Returns:
+        The full prompt to send to the model.
+    """
+    # --- PROMPT ENGINEERING FOR REACT/TYPESCRIPT ---
+    return PROMPT_PREFIX + build_task_prompt(task_description)
+
+def build_batch_task_prompt(task_descriptions: list) -> str:
+    """
+    Builds the per-batch part of the batched prompt, which follows `BATCH_PROMPT_PREFIX`.
+
+    Args:
+        task_descriptions: The frontend task descriptions to generate code for.
+
+    Returns:
+        The prompt suffix for this batch.
+    """
+    return f"""
+    Task Descriptions (JSON array; answer with exactly {len(task_descriptions)} objects):
+    ---
+    {json.dumps(task_descriptions, indent=2)}
+    ---
+    """
+
+def build_batch_prompt(task_descriptions: list) -> str:
+    """
+    Builds a prompt asking for the code of several frontend tasks in a single request.
+
+    Args:
+        task_descriptions: The frontend task descriptions to generate code for.
+
+    Returns:
+        The full prompt to send to the model.
+    """
+    return BATCH_PROMPT_PREFIX + build_batch_task_prompt(task_descriptions)
+
+def frontend_agent(task_description: str, feedback: Optional[str] = None,
+                   reference: Optional[dict] = None, upstream: Optional[str] = None) -> str:
+    """
+    Generates frontend code based on a task description.
     
-    return response.text
+    Args:
+        task_description: A string describing a specific frontend task.
+        feedback: Optional validation errors in a previous answer, to have them fixed.
+        reference: Optional earlier task and its answer to reuse or adapt.
+        upstream: Optional code of the tasks this task depends on.
+        
+    Returns:
+        A string containing the AI's response in JSON format.
+    """
+    if feedback:
+        print(f"Regenerating frontend code for: '{task_description}' to fix validation errors")
+    elif reference:
+        print(f"Generating frontend code for: '{task_description}' with a reference to '{reference['task']}'")
+    else:
+        print(f"Generating frontend code for: '{task_description}'")
+
+    # --- API CALL ---
+    return generate_content(build_task_prompt(task_description, feedback, reference, upstream),
+                            prefix=PROMPT_PREFIX, hedge="frontend")
+
+def frontend_agent_stream(task_description: str, upstream: Optional[str] = None) -> Iterator[str]:
+    """
+    Like `frontend_agent`, but yields the AI's JSON response in chunks as it is generated.
+
+    Args:
+        task_description: A string describing a specific frontend task.
+        upstream: Optional code of the tasks this task depends on.
+
+    Returns:
+        An iterator over pieces of the AI's response.
+    """
+    print(f"Streaming frontend code for: '{task_description}'")
+    return stream_content(build_task_prompt(task_description, upstream=upstream), prefix=PROMPT_PREFIX, hedge="frontend")
+
+def frontend_agent_batch(task_descriptions: list) -> str:
+    """
+    Generates frontend code for several tasks with a single request.
+
+    Args:
+        task_descriptions: The frontend task descriptions to generate code for.
+
+    Returns:
+        A string containing the AI's response, a JSON array with one object per task.
+    """
+    print(f"Generating frontend code for a batch of {len(task_descriptions)} tasks.")
+    return generate_content(build_batch_task_prompt(task_descriptions), prefix=BATCH_PROMPT_PREFIX,
+                            hedge="frontend_batch")
 
 # This block allows us to test the script directly
 if __name__ == "__main__":
@@ -76,12 +214,9 @@ if __name__ == "__main__":
         # --- PARSE AND SAVE THE OUTPUT ---
         print("\n--- Parsing and Saving Code ---")
         
-        # Clean the string by removing markdown fences
-        cleaned_json_str = raw_output.strip().replace("```json", "").replace("```", "").strip()
-        
         try:
-            # Convert the cleaned string into a Python dictionary
-            code_data = json.loads(cleaned_json_str)
+            # Extract, repair and validate the JSON object in the AI's response
+            code_data = extract_json(raw_output, RESPONSE_SCHEMA)
             
             # Extract the code parts
             component_name = code_data["component_name"]
@@ -104,7 +239,7 @@ if __name__ == "__main__":
             print(f"   - {tsx_file_path.name}")
             print(f"   - {css_file_path.name}")
 
-        except (json.JSONDecodeError, KeyError) as e:
+        except JSONExtractionError as e:
             print(f"Error: Failed to parse JSON or find expected keys. {e}")
             print("Raw response was:")
             print(raw_output)
@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional, TypeVar
+
+from env_config import env_float, env_int
+from stage_timer import percentile
+
+T = TypeVar("T")
+
+DEFAULT_HEDGE_PERCENTILE = env_float("HEDGE_PERCENTILE", 95.0)
+# The most extra requests hedging may add, as a fraction of hedgeable calls.
+DEFAULT_HEDGE_BUDGET = env_float("HEDGE_BUDGET", 0.1)
+# Recent latencies kept per call class, and how many are needed before hedging starts.
+HEDGE_WINDOW = 200
+HEDGE_MIN_SAMPLES = env_int("HEDGE_MIN_SAMPLES", 20)
+
+
+class HedgeCancelled(Exception):
+    """Raised inside a request whose duplicate already finished, to stop it from retrying."""
+
+
+class HedgingPolicy:
+    """
+    Sends a duplicate of a slow request and keeps whichever answer arrives first.
+
+    For each call class (e.g. one agent), the policy learns the recent latency
+    distribution. A call still running after the `percentile` latency gets a
+    second, identical request; the first result wins and the other request is
+    cancelled: it is dropped if it has not started, told to stop before its
+    next attempt, and its late result is discarded. Hedges are capped at
+    `budget` times the number of calls, so the extra cost stays bounded.
+
+    Hedging only pays off because model latency has a long tail that is
+    mostly independent between requests, so a fresh request usually beats
+    the slow one.
+    """
+
+    def __init__(self, enabled: bool = False, percentile: float = DEFAULT_HEDGE_PERCENTILE,
+                 budget: float = DEFAULT_HEDGE_BUDGET, min_samples: int = HEDGE_MIN_SAMPLES,
+                 window: int = HEDGE_WINDOW, max_workers: int = 64):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = max(1, min_samples)
+        self.window = window
+        self.max_workers = max_workers
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.over_budget = 0
+        self._latencies = {}
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def delay(self, key: str) -> Optional[float]:
+        """Returns how long a call of class `key` may run before it is hedged, or None if not yet known."""
+        with self._lock:
+            samples = list(self._latencies.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return percentile(samples, self.percentile)
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def _spend(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.calls:
+                self.over_budget += 1
+                return False
+            self.hedges += 1
+            return True
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hedge")
+            return self._pool
+
+    def call(self, key: str, fn: Callable[[threading.Event], T],
+             discard: Optional[Callable[[T], None]] = None) -> T:
+        """
+        Runs `fn`, hedging it with a second call if it is slower than usual for `key`.
+
+        Args:
+            key: The call class whose latency distribution decides when to hedge.
+            fn: Makes one request. It receives an event that is set once the
+                other request has won; it should check it before retrying and
+                raise `HedgeCancelled` if it is set.
+            discard: Optional cleanup for the losing request's late result,
+                e.g. closing a response stream.
+
+        Returns:
+            The result of whichever request finished successfully first.
+        """
+        with self._lock:
+            self.calls += 1
+        start = time.perf_counter()
+        delay = self.delay(key) if self.enabled else None
+        if delay is None:
+            result = fn(threading.Event())
+            self.record(key, time.perf_counter() - start)
+            return result
+
+        pool = self._executor()
+        cancel = threading.Event()
+        primary = pool.submit(fn, cancel)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._spend():
+            result = primary.result()
+            self.record(key, time.perf_counter() - start)
+            return result
+
+        hedge = pool.submit(fn, cancel)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    cancel.set()
+                    for other in pending:
+                        if not other.cancel():
+                            other.add_done_callback(lambda late: _discard(late, discard))
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    # The primary's full latency is unknown; what the caller waited is a lower bound.
+                    self.record(key, time.perf_counter() - start)
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "over_budget": self.over_budget,
+                "extra_request_rate": self.hedges / self.calls if self.calls else 0.0,
+            }
+
+    def report(self) -> str:
+        stats = self.stats()
+        return (
+            f"Hedging: {stats['hedges']} extra request(s) for {stats['calls']} call(s) "
+            f"({stats['extra_request_rate']:.1%}), {stats['hedge_wins']} won by the hedge, "
+            f"{stats['over_budget']} skipped over budget."
+        )
+
+
+def _discard(future, discard: Optional[Callable]) -> None:
+    if discard is not None and not future.cancelled() and future.exception() is None:
+        discard(future.result())
+
+
+_policy = HedgingPolicy()
+_policy_lock = threading.Lock()
+
+
+def configure_hedging(**kwargs) -> HedgingPolicy:
+    """Replaces the process-wide hedging policy, e.g. to apply command-line options."""
+    global _policy
+    with _policy_lock:
+        _policy = HedgingPolicy(**kwargs)
+    return _policy
+
+
+def get_hedging_policy() -> HedgingPolicy:
+    """Returns the process-wide hedging policy (disabled unless configured)."""
+    with _policy_lock:
+        return _policy
@@ -0,0 +1,267 @@
+import json
+import threading
+from typing import Optional
+
+_VALID_ESCAPES = set('"\\/bfnrtu')
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+
+class JSONExtractionError(ValueError):
+    """Raised when no usable JSON object can be extracted from a response."""
+
+
+class ListOf:
+    """Schema marker for a list whose items must all have the given type."""
+
+    def __init__(self, item_type):
+        self.item_type = item_type
+
+    def __repr__(self):
+        return f"list of {self.item_type.__name__}"
+
+
+class _ParseStats:
+    """Thread-safe counters describing how responses were parsed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.clean = 0
+        self.repaired = 0
+        self.rescued = 0
+        self.failures = {}
+
+    def record(self, outcome: str, rescued: bool = False) -> None:
+        with self._lock:
+            self.calls += 1
+            if outcome in ("clean", "repaired"):
+                setattr(self, outcome, getattr(self, outcome) + 1)
+                self.rescued += rescued
+            else:
+                self.failures[outcome] = self.failures.get(outcome, 0) + 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "clean": self.clean,
+                "repaired": self.repaired,
+                "rescued": self.rescued,
+                "failures": dict(self.failures),
+            }
+
+
+parse_stats = _ParseStats()
+
+
+def _scan_blocks(text: str, opener: str = "{"):
+    """
+    Yields `(start, end)` spans of balanced top-level blocks starting with `opener`.
+
+    Brackets inside JSON strings are ignored, and scanning resumes after each
+    block, so the whole text is examined once.
+    """
+    depth = 0
+    start = None
+    in_string = False
+    escape = False
+    for i, char in enumerate(text):
+        if depth == 0:
+            if char == opener:
+                depth = 1
+                start = i
+            continue
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                yield start, i + 1
+
+
+def json_state(text: str) -> str:
+    """
+    Tells whether the first JSON object or array in a response is complete.
+
+    Returns:
+        "complete" if it is closed, "partial" if the text ends inside it (e.g.
+        a response cut off by the output token limit), and "none" if the text
+        opens no object or array at all.
+    """
+    starts = [start for start in (text.find("{"), text.find("[")) if start >= 0]
+    if not starts:
+        return "none"
+    start = min(starts)
+    for _ in _scan_blocks(text[start:], text[start]):
+        return "complete"
+    return "partial"
+
+
+def repair_json(candidate: str) -> str:
+    """
+    Fixes the defects models commonly produce in otherwise valid JSON.
+
+    - Raw newlines, carriage returns and tabs inside strings are escaped.
+    - Invalid escapes inside strings (e.g. `\\d` in a regex) keep their backslash;
+      `\\'` becomes a plain quote.
+    - Trailing commas before `}` or `]` are removed.
+    """
+    out = []
+    in_string = False
+    i = 0
+    n = len(candidate)
+    while i < n:
+        char = candidate[i]
+        if in_string:
+            if char == "\\" and i + 1 < n:
+                following = candidate[i + 1]
+                if following in _VALID_ESCAPES:
+                    out.append(char + following)
+                elif following == "'":
+                    out.append("'")
+                else:
+                    out.append("\\\\")
+                    i += 1
+                    continue
+                i += 2
+                continue
+            if char == '"':
+                in_string = False
+            out.append(_CONTROL_ESCAPES.get(char, char))
+        elif char == '"':
+            in_string = True
+            out.append(char)
+        elif char == ",":
+            j = i + 1
+            while j < n and candidate[j] in " \t\r\n":
+                j += 1
+            if j < n and candidate[j] in "}]":
+                i = j
+                continue
+            out.append(char)
+        else:
+            out.append(char)
+        i += 1
+    return "".join(out)
+
+
+def validate(data, schema: dict) -> None:
+    """
+    Checks that `data` is an object with every key in `schema` of the expected type.
+
+    Raises:
+        JSONExtractionError: If a key is missing or has the wrong type.
+    """
+    if not isinstance(data, dict):
+        raise JSONExtractionError(f"Expected a JSON object but got {type(data).__name__}.")
+    for key, expected in schema.items():
+        if key not in data:
+            raise JSONExtractionError(f"Missing required key '{key}'.")
+        value = data[key]
+        if isinstance(expected, ListOf):
+            if not isinstance(value, list) or not all(isinstance(item, expected.item_type) for item in value):
+                raise JSONExtractionError(f"Key '{key}' must be a {expected!r}.")
+        elif not isinstance(value, expected):
+            raise JSONExtractionError(f"Key '{key}' must be of type {expected.__name__}.")
+
+
+def _is_wrapping(text: str) -> bool:
+    # What a plain `json.loads` after stripping markdown fences would also have
+    # coped with: nothing but whitespace and fence markers.
+    return not text.replace("```json", "").replace("```", "").strip()
+
+
+def extract_json(text: str, schema: Optional[dict] = None) -> dict:
+    """
+    Finds, repairs and validates the JSON object in a model response.
+
+    The response may wrap the object in prose or markdown fences, and the code
+    inside its strings may itself contain triple backticks. The first balanced
+    object that parses (after repair if needed) and matches `schema` is returned.
+
+    Args:
+        text: The raw model response.
+        schema: Optional mapping of required keys to their types.
+
+    Returns:
+        The parsed JSON object.
+
+    Raises:
+        JSONExtractionError: If no valid object is found.
+    """
+    return _extract(text, "{", schema)
+
+
+def extract_json_array(text: str, item_schema: Optional[dict] = None) -> list:
+    """
+    Like `extract_json`, but finds the JSON array in a response, e.g. a batched answer.
+
+    Items are not validated here when `item_schema` is None, so callers can
+    check them one by one and salvage the valid ones.
+
+    Args:
+        text: The raw model response.
+        item_schema: Optional mapping of required keys to their types, checked for every item.
+
+    Returns:
+        The parsed JSON array.
+
+    Raises:
+        JSONExtractionError: If no valid array is found.
+    """
+    return _extract(text, "[", item_schema)
+
+
+def _extract(text: str, opener: str, schema: Optional[dict]):
+    last_error = None
+    outcome = "no_object"
+    for start, end in _scan_blocks(text, opener):
+        candidate = text[start:end]
+        try:
+            data = json.loads(candidate)
+            repaired = False
+        except json.JSONDecodeError:
+            try:
+                data = json.loads(repair_json(candidate))
+                repaired = True
+            except json.JSONDecodeError as e:
+                last_error, outcome = e, "invalid_json"
+                continue
+        if schema is not None:
+            try:
+                for item in data if opener == "[" else [data]:
+                    validate(item, schema)
+            except JSONExtractionError as e:
+                last_error, outcome = e, "schema"
+                continue
+        # Rescued: a naive parse would have failed on the repair or on the text around the object.
+        rescued = repaired or not (_is_wrapping(text[:start]) and _is_wrapping(text[end:]))
+        parse_stats.record("repaired" if repaired else "clean", rescued=rescued)
+        return data
+
+    parse_stats.record(outcome)
+    kind = "array" if opener == "[" else "object"
+    if last_error is None:
+        raise JSONExtractionError(f"No complete JSON {kind} found in the response.")
+    raise JSONExtractionError(f"No valid JSON {kind} found in the response: {last_error}")
+
+
+def parse_report() -> str:
+    stats = parse_stats.as_dict()
+    failures = sum(stats["failures"].values())
+    return (
+        f"JSON parsing: {stats['calls']} response(s), {stats['repaired']} repaired, "
+        f"{stats['rescued']} rescued from a retry, {failures} failed."
+    )
@@ -0,0 +1,327 @@
+import argparse
+import asyncio
+import importlib
+import json
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+from typing import Optional
+
+from stage_timer import percentile
+
+DEFAULT_BACKEND_DIR = Path("output/backend")
+DEFAULT_REQUESTS = 200
+DEFAULT_CONCURRENCY = 32
+# Items sent to endpoints whose body is a list, e.g. bulk inserts.
+BULK_ITEMS = 10
+# Endpoints are measured in this order, so creates fill the tables the reads and deletes use.
+METHOD_ORDER = ("post", "put", "patch", "get", "delete")
+
+
+class LoadTestError(Exception):
+    """Raised when the generated backend cannot be assembled into an app."""
+
+
+def _require_dependencies() -> None:
+    try:
+        import fastapi  # noqa: F401
+        import httpx  # noqa: F401
+        import sqlalchemy.ext.asyncio  # noqa: F401
+        import aiosqlite  # noqa: F401
+    except ImportError as e:
+        raise LoadTestError("The load test needs `pip install fastapi httpx \"sqlalchemy[asyncio]\" aiosqlite`.") from e
+
+
+def database_module(url: str) -> types.ModuleType:
+    """
+    Builds the `database` module the performance profile imports from.
+
+    It holds one pooled async engine for the whole app, the declarative `Base`
+    every generated model subclasses, and the `get_session` dependency (also
+    exported as `get_db`). SQLite runs in WAL mode so reads do not wait for writes.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.orm import DeclarativeBase
+
+    engine = create_async_engine(url, connect_args={"timeout": 30})
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _tune_sqlite(connection, _record):
+        cursor = connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    class Base(DeclarativeBase):
+        pass
+
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def get_session():
+        async with session_factory() as session:
+            yield session
+
+    module = types.ModuleType("database")
+    module.__doc__ = "Shared async database setup, provided by load_test.py."
+    module.DATABASE_URL = url
+    module.engine = engine
+    module.Base = Base
+    module.SessionLocal = session_factory
+    module.get_session = module.get_db = get_session
+    return module
+
+
+def build_app(backend_dir: Path, database_url: str) -> tuple:
+    """
+    Assembles every router under `backend_dir` into one FastAPI app.
+
+    Each `.py` file is imported as a module (its dotted path relative to
+    `backend_dir`) and every `APIRouter` it defines is included. A backend
+    without its own `database.py` gets the one from `database_module`. Files
+    that fail to import are skipped and reported, not fatal.
+
+    Returns:
+        An `(app, database, routers, skipped)` tuple: the app, the `database`
+        module in use, the names of the modules whose routers were included
+        and a dict of skipped module names to the import error.
+
+    Raises:
+        LoadTestError: If the dependencies are missing or no router could be loaded.
+    """
+    _require_dependencies()
+    from fastapi import APIRouter, FastAPI
+
+    backend_dir = Path(backend_dir).resolve()
+    if not backend_dir.is_dir():
+        raise LoadTestError(f"No generated backend found in {backend_dir}.")
+    sys.path.insert(0, str(backend_dir))
+    if not (backend_dir / "database.py").exists():
+        sys.modules["database"] = database_module(database_url)
+    database = importlib.import_module("database")
+
+    app = FastAPI(title=f"Load test of {backend_dir.name}")
+    routers, skipped, included = [], {}, set()
+    for path in sorted(backend_dir.rglob("*.py")):
+        relative = path.relative_to(backend_dir).with_suffix("")
+        if "__pycache__" in relative.parts or relative.name in ("__init__", "database"):
+            continue
+        name = ".".join(relative.parts)
+        try:
+            module = importlib.import_module(name)
+        except Exception as e:
+            skipped[name] = f"{type(e).__name__}: {e}"
+            continue
+        found = [value for value in vars(module).values() if isinstance(value, APIRouter) and id(value) not in included]
+        for router in found:
+            included.add(id(router))
+            app.include_router(router)
+        if found:
+            routers.append(name)
+    if not routers:
+        raise LoadTestError(f"No router under {backend_dir} could be loaded: {skipped or 'no Python files'}.")
+    return app, database, routers, skipped
+
+
+async def create_tables(database: types.ModuleType) -> None:
+    """Creates the tables of every model registered on `database.Base`."""
+    base, engine = getattr(database, "Base", None), getattr(database, "engine", None)
+    if base is None or engine is None:
+        return
+    if hasattr(engine, "sync_engine"):
+        async with engine.begin() as connection:
+            await connection.run_sync(base.metadata.create_all)
+    else:
+        base.metadata.create_all(engine)
+
+
+def sample_value(schema: dict, components: dict, depth: int = 0):
+    """Returns a plausible value for an OpenAPI `schema`, used to fill paths, queries and bodies."""
+    if "$ref" in schema:
+        schema = components.get(schema["$ref"].rsplit("/", 1)[-1], {})
+    if depth > 5:
+        return None
+    for key in ("anyOf", "oneOf", "allOf"):
+        options = [option for option in schema.get(key, ()) if option.get("type") != "null"]
+        if options:
+            return sample_value(options[0], components, depth + 1)
+    if "default" in schema:
+        return schema["default"]
+    if schema.get("examples"):
+        return schema["examples"][0]
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if kind == "integer":
+        return max(1, schema.get("minimum", 1))
+    if kind == "number":
+        return float(max(1, schema.get("minimum", 1)))
+    if kind == "boolean":
+        return True
+    if kind == "array":
+        item = sample_value(schema.get("items", {}), components, depth + 1)
+        return [item] * (BULK_ITEMS if depth == 0 else 1)
+    if kind == "object" or "properties" in schema:
+        return {name: sample_value(prop, components, depth + 1) for name, prop in schema.get("properties", {}).items()}
+    if schema.get("format") == "email":
+        return "user@example.com"
+    if schema.get("format") == "date-time":
+        return "2024-01-01T00:00:00Z"
+    if schema.get("format") == "date":
+        return "2024-01-01"
+    return "sample"
+
+
+def plan_requests(app) -> list:
+    """
+    Turns the app's OpenAPI schema into one request per endpoint.
+
+    Path and required query parameters and JSON bodies are filled with
+    `sample_value`, so e.g. `GET /tasks/{task_id}` is requested as `/tasks/1`.
+
+    Returns:
+        `(label, method, url, params, body)` tuples, creates first and deletes last.
+    """
+    spec = app.openapi()
+    components = spec.get("components", {}).get("schemas", {})
+    requests = []
+    for path, operations in spec.get("paths", {}).items():
+        for method, operation in operations.items():
+            if method not in METHOD_ORDER:
+                continue
+            url, params = path, {}
+            for parameter in operation.get("parameters", ()):
+                value = sample_value(parameter.get("schema", {}), components)
+                if parameter.get("in") == "path":
+                    url = url.replace("{" + parameter["name"] + "}", str(value))
+                elif parameter.get("in") == "query" and parameter.get("required"):
+                    params[parameter["name"]] = value
+            body = None
+            content = operation.get("requestBody", {}).get("content", {})
+            if "application/json" in content:
+                body = sample_value(content["application/json"].get("schema", {}), components)
+            requests.append((f"{method.upper()} {path}", method.upper(), url, params, body))
+    return sorted(requests, key=lambda request: METHOD_ORDER.index(request[1].lower()))
+
+
+async def measure(client, request: tuple, count: int, concurrency: int) -> dict:
+    """Sends `count` copies of `request` with up to `concurrency` in flight and summarizes the responses."""
+    label, method, url, params, body = request
+    latencies, statuses = [], {}
+    pending = iter(range(count))
+
+    async def worker():
+        for _ in pending:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, params=params, json=body)
+                outcome = str(response.status_code)
+            except Exception as e:
+                outcome = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[outcome] = statuses.get(outcome, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, count)))))
+    elapsed = time.perf_counter() - start
+    ok = sum(n for status, n in statuses.items() if status.isdigit() and 200 <= int(status) < 300)
+    return {
+        "endpoint": label,
+        "requests": count,
+        "ok": ok,
+        "wall_time_s": elapsed,
+        "requests_per_s": count / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "statuses": statuses,
+    }
+
+
+async def run_load_test(backend_dir: Path, requests: int = DEFAULT_REQUESTS, concurrency: int = DEFAULT_CONCURRENCY,
+                        database_url: Optional[str] = None) -> dict:
+    """
+    Builds the app from `backend_dir` and measures every endpoint in turn.
+
+    Requests go through an in-process ASGI client, so the numbers cover the
+    app, its database and serialization, but not the network or a server.
+    A fresh SQLite file in a temporary directory is used unless `database_url`
+    is given.
+
+    Returns:
+        A dict with the loaded and skipped modules, per-endpoint requests/sec,
+        latency percentiles and status counts, and the totals.
+    """
+    import httpx
+
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as workdir:
+        url = database_url or f"sqlite+aiosqlite:///{Path(workdir) / 'app.db'}"
+        app, database, routers, skipped = build_app(backend_dir, url)
+        await create_tables(database)
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        results = []
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            for request in plan_requests(app):
+                results.append(await measure(client, request, requests, concurrency))
+        engine = getattr(database, "engine", None)
+        if hasattr(engine, "dispose") and hasattr(engine, "sync_engine"):
+            await engine.dispose()
+
+    total = sum(result["requests"] for result in results)
+    elapsed = sum(result["wall_time_s"] for result in results)
+    return {
+        "routers": routers,
+        "skipped": skipped,
+        "endpoints": results,
+        "requests": total,
+        "ok": sum(result["ok"] for result in results),
+        "requests_per_s": total / elapsed if elapsed else 0.0,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"Loaded {len(report['routers'])} router module(s).")
+    for name, error in report["skipped"].items():
+        print(f"⚠️ Skipped {name}: {error}")
+    print(f"\n  {'endpoint':<48}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  statuses")
+    for result in report["endpoints"]:
+        statuses = ", ".join(f"{status}×{n}" for status, n in sorted(result["statuses"].items()))
+        print(f"  {result['endpoint'][:47]:<48}{result['requests_per_s']:>9.0f}{result['p50_ms']:>9.2f}"
+              f"{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}  {statuses}")
+    print(f"\n{report['requests']} request(s), {report['ok']} succeeded, {report['requests_per_s']:.0f} req/s overall.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Load-test a generated FastAPI backend in-process on a local SQLite database."
+    )
+    parser.add_argument("backend_dir", type=Path, nargs="?", default=DEFAULT_BACKEND_DIR,
+                        help=f"Directory of the generated backend (default: {DEFAULT_BACKEND_DIR}).")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS,
+                        help=f"Requests per endpoint (default: {DEFAULT_REQUESTS}).")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Requests in flight at once (default: {DEFAULT_CONCURRENCY}).")
+    parser.add_argument("--database-url",
+                        help="SQLAlchemy async URL to test against (default: a fresh temporary SQLite file).")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON to this file.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"--- 🏋️ Load-testing {args.backend_dir} ---")
+    try:
+        report = asyncio.run(run_load_test(args.backend_dir, args.requests, args.concurrency, args.database_url))
+    except LoadTestError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\n✅ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,100 +1,1540 @@
-import json
-from pathlib import Path
+import argparse
+import contextlib
+import hashlib
+import sqlite3
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterable, NamedTuple, Optional
 
 # Import the main functions from our agent files
-from coordinator_agent import coordinator_agent, initialize_gemini
-from frontend_agent import frontend_agent
-from backend_agent import backend_agent
+from coordinator_agent import RESPONSE_SCHEMA as PLAN_SCHEMA, coordinator_agent, coordinator_agent_stream, section_note
+from frontend_agent import RESPONSE_SCHEMA as FRONTEND_SCHEMA, frontend_agent, frontend_agent_batch, frontend_agent_stream
+from frontend_agent import build_prompt as build_frontend_prompt
+from backend_agent import RESPONSE_SCHEMA as BACKEND_SCHEMA, backend_agent, backend_agent_batch, backend_agent_stream
+from backend_agent import DEFAULT_PROFILE as DEFAULT_BACKEND_PROFILE, PROFILES as BACKEND_PROFILES, configure_profile, get_profile
+from backend_agent import build_prompt as build_backend_prompt
+from artifact_index import ARTIFACT_INDEX_ENABLED, DEFAULT_REUSE_THRESHOLD, REUSE_SCHEMA, Artifact
+from artifact_index import configure_artifact_index, get_artifact_index, read_artifact, reuse_report, reuse_stats
+from batching import BatchedWorker, BatchSizer
+from brief_sections import PLAN_SECTION_CHARS, brief_overview, merge_plans, split_brief
+from build_manifest import BuildManifest, task_fingerprint
+from code_validator import CodeValidationError, validate_files
+from env_config import EnvConfigError, check_env, env_int
+from hedging import DEFAULT_HEDGE_BUDGET, DEFAULT_HEDGE_PERCENTILE, configure_hedging
+from json_extract import JSONExtractionError, extract_json, extract_json_array, parse_report, validate
+from model_client import MODEL_NAME, continuation_report, continuation_stats, discard_response, prompt_report, response_digest
+from model_providers import DEFAULT_PROVIDER, PROVIDERS, configure_provider, get_provider
+from output_writer import get_output_writer, safe_name, safe_relative_path
+from rate_limiter import DEFAULT_RPM, DEFAULT_TPM, configure_rate_limiter, estimate_tokens
+from response_cache import CACHE_MODES, DEFAULT_CACHE_MODE, CacheMissError, configure_response_cache
+from run_journal import DEFAULT_JOURNAL_DIR, RunJournal
+from stage_timer import get_stage_timer, stage
+from task_dedup import DEDUPE_THRESHOLD, TaskDeduplicator, dedupe_plan, describe
+from task_graph import GraphScheduler, TaskGraph, dedupe_renames
+from task_templates import configure_templates, render, template_report, template_stats
+from telemetry import get_telemetry, span, traced
+from streaming_json import StreamingJSONError, StreamingJSONParser
+
+# Maximum number of agent calls that may be in flight at the same time.
+DEFAULT_CONCURRENCY = env_int("AGENT_CONCURRENCY", 4)
+# Starting estimates of the output tokens one task needs, refined during a run.
+FRONTEND_TOKENS_PER_TASK = 1500
+BACKEND_TOKENS_PER_TASK = 1000
+OUTPUT_ROOT = Path("output")
+# How many times a task whose files fail validation is regenerated with the errors attached.
+VALIDATION_ROUNDS = env_int("VALIDATION_ROUNDS", 1)
+# How much of the code of a task's dependencies is added to its prompt.
+UPSTREAM_MAX_CHARS = env_int("UPSTREAM_MAX_CHARS", 8000)
+
+
+class TaskResult(NamedTuple):
+    """What a worker produced for one task."""
+
+    message: str
+    files: list
+    # Completes once the files are on disk, when they are written in the background.
+    written: Optional[Future] = None
+
+
+def component_paths(component_name: str, output_root: Path = OUTPUT_ROOT, owner: Optional[str] = None) -> dict:
+    """
+    Returns the files a frontend component is written to, keyed by the response field they hold.
+
+    The name is sanitized, and if another task of this run already claimed the
+    component's directory, a numbered directory is used instead.
+    """
+    component_name = safe_name(component_name)
+    output_dir = get_output_writer().claim(output_root / "frontend" / "components" / component_name, owner)
+    return {
+        "tsx_code": output_dir / f"{component_name}.tsx",
+        "css_code": output_dir / f"{component_name}.module.css",
+    }
+
+
+def backend_paths(filename: str, output_root: Path = OUTPUT_ROOT, owner: Optional[str] = None) -> dict:
+    """Like `component_paths`, for a backend agent's Python file."""
+    path = output_root / "backend" / safe_relative_path(filename)
+    return {"python_code": get_output_writer().claim(path, owner)}
+
+
+def save_component(code_data: dict, output_root: Path = OUTPUT_ROOT, owner: Optional[str] = None) -> TaskResult:
+    """
+    Queues a frontend agent's component to be written to disk.
+
+    Args:
+        code_data: A parsed frontend response with `component_name`, `tsx_code` and `css_code`.
+        output_root: The directory the generated project is written to.
+        owner: The task the component belongs to, used to keep tasks from overwriting each other.
+
+    Returns:
+        A `TaskResult` with a status message, the files and the pending write.
+    """
+    paths = component_paths(code_data["component_name"], output_root, owner)
+    written = get_output_writer().write({path: code_data[key] for key, path in paths.items()})
+    component_name = paths["tsx_code"].parent.name
+    return TaskResult(f"✅ Code for '{component_name}' saved successfully.", list(paths.values()), written)
+
+
+def save_backend_file(code_data: dict, output_root: Path = OUTPUT_ROOT, owner: Optional[str] = None) -> TaskResult:
+    """
+    Queues a backend agent's Python file to be written to disk.
+
+    Args:
+        code_data: A parsed backend response with `filename` and `python_code`.
+        output_root: The directory the generated project is written to.
+        owner: The task the file belongs to, used to keep tasks from overwriting each other.
+
+    Returns:
+        A `TaskResult` with a status message, the file and the pending write.
+    """
+    file_path = backend_paths(code_data["filename"], output_root, owner)["python_code"]
+    written = get_output_writer().write({file_path: code_data["python_code"]})
+    filename = file_path.relative_to(output_root / "backend").as_posix()
+    return TaskResult(f"✅ Code for '{filename}' saved successfully.", [file_path], written)
+
+
+def render_from_template(kind: str, task: str) -> Optional[dict]:
+    """
+    Renders a standard task locally if a template covers it (see `task_templates`).
+
+    Every task is counted, so the run report can tell which share of tasks
+    skipped the model.
+
+    Returns:
+        The same fields the agent would have answered with, or None if the
+        task has to go to the model.
+    """
+    with stage("templating"):
+        rendered = render(kind, task)
+    template_stats.record(kind, rendered and rendered[0])
+    if rendered is None:
+        return None
+    print(f"⚡ Rendered {kind} code for: '{task}' from the '{rendered[0]}' template.")
+    return rendered[1]
+
+
+def parse_response(raw: str, parse: Callable = extract_json, *args):
+    """
+    Parses a model response with `parse`, evicting it from the response cache if it is unusable.
+
+    Raises:
+        JSONExtractionError: If the response cannot be parsed.
+    """
+    try:
+        return parse(raw, *args)
+    except JSONExtractionError:
+        discard_response(response_digest(raw))
+        raise
+
+
+def qualified_model() -> str:
+    """Returns the provider and model answering agent calls, e.g. "gemini:models/gemini-pro-latest"."""
+    return f"{get_provider().name}:{MODEL_NAME}"
+
+
+def find_artifact(kind: str, task: str) -> Optional[Artifact]:
+    """
+    Looks up the earlier artifact most similar to `task` in the artifact index (see `artifact_index`).
+
+    Returns:
+        The closest artifact, or None if none is close enough to reuse or refer to.
+    """
+    index = get_artifact_index()
+    if not index.enabled:
+        return None
+    with stage("retrieval"):
+        match = index.lookup(kind, task, get_profile() if kind == "backend" else "", qualified_model())
+    reuse_stats.record("lookup")
+    if match is not None and match.reusable:
+        reuse_stats.record("reused")
+        print(f"♻️ Reusing the {kind} code of '{match.task}' for: '{task}' (similarity {match.similarity:.2f}).")
+    return match
+
+
+def local_code(kind: str, task: str) -> Optional[dict]:
+    """Returns the code for `task` from a template or a reusable earlier artifact, or None if it needs the agent."""
+    code_data = render_from_template(kind, task)
+    if code_data is None:
+        match = find_artifact(kind, task)
+        if match is not None and match.reusable:
+            code_data = match.code
+    return code_data
+
+
+def generate_code(kind: str, task: str, agent_fn: Callable[..., str], schema: dict,
+                  feedback: Optional[str] = None, upstream: Optional[str] = None) -> dict:
+    """
+    Returns the code for a single task, calling the agent only when it has to.
+
+    Standard tasks are rendered from a template, and tasks that closely match
+    an earlier one reuse its code. Otherwise the agent is called, with the
+    closest earlier artifact (if any) as a reference it may reuse by
+    answering `{"reuse_reference": true}`. Fixes requested with `feedback`
+    always go to the agent.
+
+    Args:
+        kind: "frontend" or "backend".
+        task: The task description from the coordinator's plan.
+        agent_fn: The agent, e.g. `frontend_agent`.
+        schema: The keys and types the agent's answer must have.
+        feedback: Optional validation errors in an earlier answer, to have them fixed.
+        upstream: Optional code of the tasks this task depends on (see `describe_upstream`).
+
+    Returns:
+        A dict with the same keys as the agent's response.
+    """
+    if feedback:
+        with stage("generation"):
+            raw_code_json = agent_fn(task, feedback, upstream=upstream)
+        with stage("parsing"):
+            return parse_response(raw_code_json, extract_json, schema)
+
+    code_data = render_from_template(kind, task)
+    if code_data is not None:
+        return code_data
+    match = find_artifact(kind, task)
+    if match is not None and match.reusable:
+        return match.code
+    reference = match.reference if match is not None else None
+    if reference is not None:
+        reuse_stats.record("referenced")
+    with stage("generation"):
+        raw_code_json = agent_fn(task, reference=reference, upstream=upstream)
+    with stage("parsing"):
+        if reference is not None and '"reuse_reference"' in raw_code_json:
+            try:
+                if extract_json(raw_code_json, REUSE_SCHEMA)["reuse_reference"]:
+                    reuse_stats.record("references_accepted")
+                    print(f"♻️ The agent reused the code of '{match.task}' for: '{task}'.")
+                    return match.code
+            except JSONExtractionError:
+                pass
+        return parse_response(raw_code_json, extract_json, schema)
+
+
+def process_frontend_task(task: str, output_root: Path = OUTPUT_ROOT, feedback: Optional[str] = None,
+                          upstream: Optional[str] = None) -> TaskResult:
+    """
+    Generates and saves the component for a single frontend task (see `generate_code`).
+
+    Args:
+        task: The frontend task description from the coordinator's plan.
+        output_root: The directory the generated project is written to.
+        feedback: Optional validation errors in the task's previous code, for the agent to fix.
+        upstream: Optional code of the tasks this task depends on.
+
+    Returns:
+        A `TaskResult` with a status message and the files written.
+    """
+    code_data = generate_code("frontend", task, frontend_agent, FRONTEND_SCHEMA, feedback, upstream)
+    return save_component(code_data, output_root, owner=task)
+
+
+def process_backend_task(task: str, output_root: Path = OUTPUT_ROOT, feedback: Optional[str] = None,
+                         upstream: Optional[str] = None) -> TaskResult:
+    """
+    Generates and saves the Python file for a single backend task (see `generate_code`).
+
+    Args:
+        task: The backend task description from the coordinator's plan.
+        output_root: The directory the generated project is written to.
+        feedback: Optional validation errors in the task's previous code, for the agent to fix.
+        upstream: Optional code of the tasks this task depends on.
+
+    Returns:
+        A `TaskResult` with a status message and the files written.
+    """
+    code_data = generate_code("backend", task, backend_agent, BACKEND_SCHEMA, feedback, upstream)
+    return save_backend_file(code_data, output_root, owner=task)
+
+
+def process_batch(tasks: list, agent_batch_fn: Callable[[list], str], schema: dict,
+                  save_fn: Callable[..., TaskResult], sizer: BatchSizer,
+                  output_root: Path = OUTPUT_ROOT, kind: Optional[str] = None) -> list:
+    """
+    Generates the code for several tasks with one batched agent call.
+
+    With `kind`, tasks a template or an earlier artifact covers are answered
+    locally (see `local_code`) and only the others are sent to the agent; no
+    call is made if none is left.
+
+    Args:
+        tasks: The task descriptions to generate code for.
+        agent_batch_fn: The agent's batched call, e.g. `frontend_agent_batch`.
+        schema: The agent's response schema, checked for every item.
+        save_fn: Writes one parsed item to disk and returns its `TaskResult`, e.g. `save_component`.
+        sizer: The group's batch sizer, updated with the response size.
+        output_root: The directory the generated project is written to.
+        kind: The agent's kind ("frontend" or "backend"), to look up templates and artifacts.
+
+    Returns:
+        One entry per task: a `TaskResult`, or the exception raised for that item.
+
+    Raises:
+        JSONExtractionError: If the response is not an array with one item per task.
+    """
+    items = [local_code(kind, task) if kind else None for task in tasks]
+    pending = [index for index, item in enumerate(items) if item is None]
+    if pending:
+        with stage("generation"):
+            raw_code_json = agent_batch_fn([tasks[index] for index in pending])
+        sizer.record(estimate_tokens(raw_code_json), len(pending))
+        with stage("parsing"):
+            generated = parse_response(raw_code_json, extract_json_array)
+        if len(generated) != len(pending):
+            discard_response(response_digest(raw_code_json))
+            raise JSONExtractionError(f"Expected {len(pending)} results but the response contained {len(generated)}.")
+        for index, item in zip(pending, generated):
+            items[index] = item
+
+    outcomes = []
+    for task, item in zip(tasks, items):
+        try:
+            validate(item, schema)
+            outcomes.append(save_fn(item, output_root, owner=task))
+        except Exception as e:
+            outcomes.append(e)
+    return outcomes
+
+
+def stream_json_to_files(chunks: Iterable[str], name_key: str, code_keys: tuple,
+                         paths_for_name: Callable[[str], dict]) -> tuple:
+    """
+    Parses a streamed agent response and writes its code fields to disk as they arrive.
+
+    As soon as the `name_key` field is complete, the target files are opened and
+    every code field is written chunk by chunk, so files appear long before the
+    response ends and large code strings are never held in memory. Text that
+    arrives before the name is known is buffered until then. Each file is
+    written to a `.part` file and only renamed into place once the whole
+    response has been parsed, so a failed stream never leaves half-written code,
+    and a file whose content did not change is left untouched. A response that
+    cannot be parsed is evicted from the response cache (see `parse_response`).
+
+    Args:
+        chunks: The streamed response text.
+        name_key: The JSON key naming the output (e.g. "component_name").
+        code_keys: The JSON keys holding code to be written.
+        paths_for_name: Maps the name to a dict of `{code_key: Path}`.
+
+    Returns:
+        A `(name, paths)` tuple: the value of the `name_key` field and the files written.
+    """
+    parser = StreamingJSONParser(stream_keys=code_keys)
+    name = None
+    paths = {}
+    files = {}
+    pending = {key: [] for key in code_keys}
+    completed = set()
+    digest = hashlib.sha256()
+    start = time.perf_counter()
+    try:
+        for chunk in chunks:
+            digest.update(chunk.encode("utf-8"))
+            for event in parser.feed(chunk):
+                kind = event[0]
+                key = event[1] if len(event) > 1 else None
+                if kind == "value" and key == name_key:
+                    name = event[2]
+                    get_stage_timer().record("first_file", time.perf_counter() - start)
+                    paths = paths_for_name(name)
+                    for code_key, path in paths.items():
+                        path.parent.mkdir(parents=True, exist_ok=True)
+                        files[code_key] = open(path.with_name(path.name + ".part"), "w", encoding="utf-8")
+                        files[code_key].write("".join(pending.pop(code_key)))
+                elif kind == "string_chunk" and key in code_keys:
+                    if key in files:
+                        files[key].write(event[2])
+                    else:
+                        pending[key].append(event[2])
+                elif kind == "value" and key in code_keys:
+                    completed.add(key)
+        missing = [key for key in code_keys if key not in completed]
+        if name is None or missing or not parser.done:
+            raise ValueError(f"Incomplete response: missing {', '.join(missing) or name_key}.")
+    except BaseException as e:
+        if isinstance(e, ValueError):
+            # Raised for a malformed or incomplete response, including `StreamingJSONError`.
+            discard_response(digest.hexdigest())
+        for code_key, handle in files.items():
+            handle.close()
+            part = paths[code_key].with_name(paths[code_key].name + ".part")
+            if part.exists():
+                part.unlink()
+        raise
+    for code_key, handle in files.items():
+        handle.close()
+        path = paths[code_key]
+        get_output_writer().replace(path.with_name(path.name + ".part"), path)
+    return name, list(paths.values())
+
+
+def stream_frontend_task(task: str, output_root: Path = OUTPUT_ROOT, upstream: Optional[str] = None) -> TaskResult:
+    """
+    Like `process_frontend_task`, but streams the component's code to disk while it is generated.
+    """
+    code_data = local_code("frontend", task)
+    if code_data is not None:
+        return save_component(code_data, output_root, owner=task)
+    with stage("generation"):
+        _, files = stream_json_to_files(
+            frontend_agent_stream(task, upstream), "component_name", ("tsx_code", "css_code"),
+            partial(component_paths, output_root=output_root, owner=task),
+        )
+    return TaskResult(f"✅ Code for '{files[0].parent.name}' saved successfully.", files)
+
+
+def stream_backend_task(task: str, output_root: Path = OUTPUT_ROOT, upstream: Optional[str] = None) -> TaskResult:
+    """
+    Like `process_backend_task`, but streams the Python code to disk while it is generated.
+    """
+    code_data = local_code("backend", task)
+    if code_data is not None:
+        return save_backend_file(code_data, output_root, owner=task)
+    with stage("generation"):
+        _, files = stream_json_to_files(
+            backend_agent_stream(task, upstream), "filename", ("python_code",),
+            partial(backend_paths, output_root=output_root, owner=task),
+        )
+    filename = files[0].relative_to(output_root / "backend").as_posix()
+    return TaskResult(f"✅ Code for '{filename}' saved successfully.", files)
+
+
+def describe_upstream(upstream: list, max_chars: int = UPSTREAM_MAX_CHARS) -> Optional[str]:
+    """
+    Formats the files of a task's finished dependencies for its prompt.
+
+    Files are included whole, in dependency order, while they fit in
+    `max_chars`; the rest are only named.
+
+    Args:
+        upstream: `((kind, task), result)` pairs, as passed by `GraphScheduler`.
+        max_chars: The most characters of code to include.
+
+    Returns:
+        The text to add to the prompt, or None if there is nothing to add.
+    """
+    parts = []
+    for (_, task), result in upstream:
+        for path in result.files:
+            try:
+                code = Path(path).read_text(encoding="utf-8")
+            except OSError:
+                continue
+            if len(code) <= max_chars:
+                parts.append(f"From '{task}' ({Path(path).as_posix()}):\n{code}")
+                max_chars -= len(code)
+            else:
+                parts.append(f"From '{task}' ({Path(path).as_posix()}): omitted for length.")
+    return "\n\n".join(parts) or None
+
+
+def run_tasks(task_groups, concurrency: int = DEFAULT_CONCURRENCY,
+              on_task_done: Optional[Callable[[str, str, TaskResult], None]] = None, executor=None,
+              graph: Optional[TaskGraph] = None, finished: Optional[dict] = None) -> dict:
+    """
+    Dispatches every task of every group to a bounded thread pool at once.
+
+    Each group is a `(label, tasks, worker)` tuple, where `worker` is either a
+    function of one task or a `BatchedWorker` that packs several tasks into one
+    call. Progress is reported in plan order, group by group, as results become
+    available. A failing task is reported and recorded but never stops the
+    remaining tasks.
+
+    With a `graph` that has dependencies, tasks are instead started as soon as
+    their dependencies finish, longest critical path first (see
+    `GraphScheduler`), one per request, and each gets the code its
+    dependencies produced (see `describe_upstream`).
+
+    Args:
+        task_groups: A list of `(label, tasks, worker)` tuples.
+        concurrency: The maximum number of tasks running at the same time.
+        on_task_done: Optional `(label, task, result)` callback, called from the
+            worker thread as soon as a task succeeds, whatever its plan position.
+        executor: Optional executor to submit to instead of a private thread
+            pool, e.g. one shared by several projects.
+        graph: Optional dependencies between the tasks, as `(kind, task)` nodes.
+        finished: Optional results of dependencies that are not run here
+            (e.g. skipped as unchanged), keyed by `(kind, task)`.
+
+    Returns:
+        A dict mapping each label to a list of `(task, result, error)` tuples.
+    """
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency)) if executor is None else contextlib.nullcontext(executor)
+    with pool as executor:
+        if graph is not None and graph.edge_count:
+            submitted = _submit_graph(task_groups, graph, executor, concurrency, finished or {})
+        else:
+            # Submit everything up front so the pool stays saturated across groups.
+            submitted = [
+                (
+                    label,
+                    tasks,
+                    worker.submit_all(executor, tasks, concurrency)
+                    if isinstance(worker, BatchedWorker)
+                    else [executor.submit(traced("task", worker, kind=label.lower(), task=task), task)
+                          for task in tasks],
+                )
+                for label, tasks, worker in task_groups
+            ]
+        if on_task_done is not None:
+            for label, tasks, futures in submitted:
+                for task, future in zip(tasks, futures):
+                    future.add_done_callback(partial(_report_done, on_task_done, label, task))
+        return collect_results(submitted)
+
+
+def _submit_graph(task_groups, graph: TaskGraph, executor, concurrency: int, finished: dict) -> list:
+    workers = {
+        label.lower(): worker.single_fn if isinstance(worker, BatchedWorker) else worker
+        for label, _, worker in task_groups
+    }
+
+    def run(node: tuple, upstream: list) -> TaskResult:
+        kind, task = node
+        result = workers[kind](task, upstream=describe_upstream(upstream))
+        if result.written is not None:
+            # Dependents read these files, so they must be on disk first.
+            result.written.result()
+        return result
+
+    nodes = [(label.lower(), task) for label, tasks, _ in task_groups for task in tasks]
+    scheduler = GraphScheduler(graph, {"frontend": FRONTEND_TOKENS_PER_TASK, "backend": BACKEND_TOKENS_PER_TASK})
+    futures = iter(scheduler.submit_all(executor, nodes, run, concurrency, finished))
+    return [(label, tasks, [next(futures) for _ in tasks]) for label, tasks, _ in task_groups]
+
+
+def collect_results(submitted: list) -> dict:
+    """
+    Waits for submitted tasks and reports their outcomes in plan order, group by group.
+
+    Args:
+        submitted: A list of `(label, tasks, futures)` tuples, one future per task.
+
+    Returns:
+        A dict mapping each label to a list of `(task, result, error)` tuples.
+    """
+    results = {}
+    for step, (label, tasks, futures) in enumerate(submitted, 2):
+        print(f"\n--- [{step}/3] Running {label} Agent for each task ---")
+        if not tasks:
+            print(f"No {label.lower()} tasks found.")
+        results[label] = []
+        for i, (task, future) in enumerate(zip(tasks, futures), 1):
+            print(f"\nProcessing {label} Task ({i}/{len(tasks)}): {task}")
+            try:
+                result = future.result()
+                if result.written is not None:
+                    result.written.result()
+                print(result.message)
+                results[label].append((task, result, None))
+            except Exception as e:
+                print(f"❌ Error processing {label.lower()} task '{task}': {e}")
+                results[label].append((task, None, e))
+    return results
+
+
+def _report_done(on_task_done: Callable, label: str, task: str, future) -> None:
+    if future.exception() is not None:
+        return
+    result = future.result()
+    if result.written is not None and not result.written.done():
+        # Only report the task once its files are actually on disk.
+        result.written.add_done_callback(lambda written: _report_done(on_task_done, label, task, future))
+        return
+    if result.written is not None and result.written.exception() is not None:
+        return
+    try:
+        on_task_done(label, task, result)
+    except Exception as e:
+        print(f"⚠️ Could not record the result of '{task}': {e}")
+
+
+def plan_project(project_brief: str, section_chars: int = PLAN_SECTION_CHARS, concurrency: int = DEFAULT_CONCURRENCY,
+                 dedupe_threshold: Optional[float] = DEDUPE_THRESHOLD, executor=None) -> Optional[dict]:
+    """
+    Runs the coordinator agent and parses its plan.
+
+    A brief longer than `section_chars` is planned map-reduce style (see
+    `plan_sections`), so planning takes about as long as its largest section.
+
+    Args:
+        project_brief: The user's project description.
+        section_chars: The longest brief planned in one call, and the size of
+            the sections a longer brief is split into; 0 never splits.
+        concurrency: The most sections planned at once, when no `executor` is given.
+        dedupe_threshold: Similarity above which tasks planned by different
+            sections are merged, or None to keep them all.
+        executor: Optional executor to run the coordinator calls on, e.g. a
+            project's share of a `FairScheduler`.
+
+    Returns:
+        The parsed plan, or None if it could not be obtained.
+    """
+    print("\n--- [1/3] Running Coordinator Agent to get the project plan ---")
+    sections = split_brief(project_brief, section_chars)
+    if len(sections) > 1:
+        return plan_sections(project_brief, sections, concurrency, dedupe_threshold, executor)
+    with span("plan") as plan_span:
+        try:
+            with stage("planning"):
+                if executor is None:
+                    raw_plan_output = coordinator_agent(project_brief)
+                else:
+                    raw_plan_output = executor.submit(coordinator_agent, project_brief).result()
+        except CacheMissError as e:
+            print(f"❌ Error: {e}")
+            plan_span.set("error", type(e).__name__)
+            return None
+        except Exception as e:
+            # The provider's error once its retries ran out, e.g. a 503 from the API.
+            print(f"❌ Error: The coordinator call failed. Cannot proceed. {e}")
+            plan_span.set("error", type(e).__name__)
+            return None
+
+        try:
+            # Extract, repair and validate the coordinator's plan
+            with stage("parsing"):
+                plan_data = parse_response(raw_plan_output, extract_json, PLAN_SCHEMA)
+            print("✅ Plan received and parsed successfully.")
+        except JSONExtractionError as e:
+            print(f"❌ Error: Failed to parse the project plan. Cannot proceed. {e}")
+            plan_span.set("error", type(e).__name__)
+            return None
+        return plan_data
+
+
+def plan_section(section: str, position: int, total: int, overview: str, parent=None) -> dict:
+    """
+    Plans one section of a long brief.
+
+    Returns:
+        The section's parsed plan, with task IDs local to the section.
+
+    Raises:
+        CacheMissError: If the cache is in replay mode and has no answer.
+        JSONExtractionError: If the coordinator's answer is not a valid plan.
+        Exception: The provider's error, if the coordinator call still fails after its retries.
+    """
+    with get_telemetry().span("plan_section", parent=parent, section=position, chars=len(section)):
+        with stage("planning"):
+            raw_plan_output = coordinator_agent(section, section_note(position, total, overview))
+        with stage("parsing"):
+            return parse_response(raw_plan_output, extract_json, PLAN_SCHEMA)
+
+
+def plan_sections(project_brief: str, sections: list, concurrency: int = DEFAULT_CONCURRENCY,
+                  dedupe_threshold: Optional[float] = DEDUPE_THRESHOLD, executor=None) -> Optional[dict]:
+    """
+    Plans a long brief map-reduce style: each section in parallel, then one merged plan.
+
+    Every section is sent to the coordinator on its own, with the brief's
+    opening for context (see `brief_sections`). The partial plans are then
+    concatenated, their dependencies renumbered, and tasks that several
+    sections planned are merged as near-duplicates (see `task_dedup`).
+
+    Args:
+        project_brief: The user's project description.
+        sections: The brief, split by `split_brief`.
+        concurrency: The most sections planned at once, when no `executor` is given.
+        dedupe_threshold: Similarity above which tasks are merged, or None to keep them all.
+        executor: Optional executor to run the coordinator calls on.
+
+    Returns:
+        The merged plan, or None if any section could not be planned.
+    """
+    print(f"📑 The brief is {len(project_brief)} characters long; planning its {len(sections)} sections in parallel.")
+    overview = brief_overview(project_brief)
+    with span("plan", sections=len(sections)) as plan_span, contextlib.ExitStack() as stack:
+        if executor is None:
+            executor = stack.enter_context(ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(sections)))))
+        futures = [executor.submit(plan_section, section, position, len(sections), overview, plan_span)
+                   for position, section in enumerate(sections, 1)]
+        plans = []
+        for position, future in enumerate(futures, 1):
+            try:
+                plans.append(future.result())
+            except Exception as e:
+                print(f"❌ Error: Failed to plan section {position} of {len(sections)}. Cannot proceed. {e}")
+                plan_span.set("error", type(e).__name__)
+        if len(plans) < len(sections):
+            return None
+
+        with stage("merging"):
+            plan_data = merge_plans(plans)
+            if dedupe_threshold is not None:
+                deduped, duplicates = dedupe_tasks(plan_data, dedupe_threshold)
+                if duplicates:
+                    # The merged tasks' IDs shift, so the dependencies are renumbered along with them.
+                    graph = TaskGraph.from_plan(plan_data).renamed(dedupe_renames(plan_data, deduped, duplicates))
+                    deduped.pop("dependencies", None)
+                    dependencies = graph.dependency_ids(deduped)
+                    if dependencies:
+                        deduped["dependencies"] = dependencies
+                    plan_data = deduped
+    tasks = len(plan_data["frontend_tasks"]) + len(plan_data["backend_tasks"])
+    print(f"✅ Plans of all {len(sections)} sections received and merged into {tasks} task(s).")
+    return plan_data
+
+
+def _agent_groups(output_root: Path, stream: bool, batch_size: int) -> list:
+    """Returns a `(label, kind, worker, build_prompt)` tuple for each agent, in plan order."""
+    frontend_worker = partial(stream_frontend_task if stream else process_frontend_task, output_root=output_root)
+    backend_worker = partial(stream_backend_task if stream else process_backend_task, output_root=output_root)
+    if batch_size > 1:
+        print(f"Packing up to {batch_size} tasks into each agent call.")
+        frontend_sizer = BatchSizer(batch_size, FRONTEND_TOKENS_PER_TASK)
+        backend_sizer = BatchSizer(batch_size, BACKEND_TOKENS_PER_TASK)
+        frontend_worker = BatchedWorker(
+            partial(process_batch, agent_batch_fn=frontend_agent_batch, schema=FRONTEND_SCHEMA,
+                    save_fn=save_component, sizer=frontend_sizer, output_root=output_root, kind="frontend"),
+            frontend_worker,
+            frontend_sizer,
+            kind="frontend",
+        )
+        backend_worker = BatchedWorker(
+            partial(process_batch, agent_batch_fn=backend_agent_batch, schema=BACKEND_SCHEMA,
+                    save_fn=save_backend_file, sizer=backend_sizer, output_root=output_root, kind="backend"),
+            backend_worker,
+            backend_sizer,
+            kind="backend",
+        )
+    return [
+        ("Frontend", "frontend", frontend_worker, build_frontend_prompt),
+        ("Backend", "backend", backend_worker, build_backend_prompt),
+    ]
+
+
+def _skip_reason(kind: str, task: str, fingerprint: str, manifest: BuildManifest,
+                 completed: dict, incremental: bool, upstream_rerun: bool = False) -> Optional[str]:
+    """
+    Tells why a task does not need to run, or returns None if it does.
+
+    A task with a dependency that runs again (`upstream_rerun`) always runs,
+    since its code was built on the dependency's old code. Tasks finished by
+    an interrupted run are recorded in the manifest here, and the files of
+    skipped tasks are claimed so that no other task overwrites them.
+    """
+    if upstream_rerun:
+        return None
+    if (kind, task) in completed:
+        manifest.record(fingerprint, kind, task, completed[kind, task])
+        _claim_outputs(completed[kind, task], task)
+        return "finished by the interrupted run"
+    if incremental and manifest.is_up_to_date(fingerprint):
+        _claim_outputs(manifest.outputs(fingerprint), task)
+        return "unchanged"
+    return None
+
+
+def _claim_outputs(files: list, owner: str) -> None:
+    writer = get_output_writer()
+    for path in files:
+        writer.claim(Path(path), owner)
+        writer.claim(Path(path).parent, owner)
+
+
+def _format_errors(errors: dict, output_root: Path) -> str:
+    lines = []
+    for path, messages in errors.items():
+        name = path.relative_to(output_root).as_posix() if path.is_relative_to(output_root) else str(path)
+        lines += [f"- {name}: {message}" for message in messages]
+    return "\n    ".join(lines)
+
+
+def validate_results(groups: list, results: dict, output_root: Path = OUTPUT_ROOT,
+                     concurrency: int = DEFAULT_CONCURRENCY, rounds: int = VALIDATION_ROUNDS,
+                     on_task_done: Optional[Callable[[str, str, TaskResult], None]] = None, executor=None,
+                     graph: Optional[TaskGraph] = None, finished: Optional[dict] = None) -> dict:
+    """
+    Checks the files of every successful task and regenerates only the tasks whose files fail.
+
+    The files are compiled, import-resolved and structurally checked in a
+    process pool (see `code_validator`). Each failing task is sent back to its
+    agent, with the errors attached to its prompt, up to `rounds` times; tasks
+    that still fail are turned into failures with a `CodeValidationError`, so
+    they are not recorded in the build manifest and are retried by the next run.
+    With a `graph`, a regenerated task gets its dependencies' code again, as
+    when it was first generated (see `describe_upstream`).
+
+    Args:
+        groups: The `_agent_groups` the results belong to.
+        results: The per-task results from `run_tasks`, updated in place.
+        output_root: The directory the generated project is written to.
+        concurrency: The maximum number of regeneration calls in flight at once.
+        rounds: How many times a failing task is regenerated (0 only reports the errors).
+        on_task_done: Optional `(kind, task, result)` callback for regenerated tasks.
+        executor: Optional executor to regenerate on instead of a private thread pool.
+        graph: Optional dependencies between the tasks, as passed to `run_tasks`.
+        finished: Optional results of dependencies that were not run, as passed to `run_tasks`.
+
+    Returns:
+        `results`.
+    """
+    kinds = {label: kind for label, kind, *_ in groups}
+    repair_workers = {"frontend": process_frontend_task, "backend": process_backend_task}
+    positions = {
+        (label, i): result.files
+        for label, outcomes in results.items()
+        for i, (_, result, error) in enumerate(outcomes)
+        if error is None
+    }
+    if not positions:
+        return results
+
+    print(f"\n--- 🔎 Validating the code of {len(positions)} task(s) ---")
+    with stage("validation"):
+        errors = validate_files([path for files in positions.values() for path in files], output_root)
+    failing = {key: {path: errors[path] for path in files if path in errors} for key, files in positions.items()}
+    failing = {key: task_errors for key, task_errors in failing.items() if task_errors}
+    print(f"{len(positions) - len(failing)} task(s) passed, {len(failing)} failed.")
+
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency)) if executor is None else contextlib.nullcontext(executor)
+    with pool as executor:
+        for round_number in range(1, rounds + 1):
+            if not failing:
+                break
+            print(f"\n--- 🔁 Regenerating {len(failing)} task(s) with their validation errors "
+                  f"(round {round_number}/{rounds}) ---")
+            for (label, i), task_errors in failing.items():
+                print(f"❌ {label} task '{results[label][i][0]}':\n    {_format_errors(task_errors, output_root)}")
+            done = dict(finished or {})
+            done.update({(kinds[label], task): result for label, outcomes in results.items()
+                         for task, result, error in outcomes if error is None})
+            submitted = {}
+            for (label, i), task_errors in failing.items():
+                task = results[label][i][0]
+                kind = kinds[label]
+                dependencies = graph.dependencies.get((kind, task), ()) if graph is not None else ()
+                upstream = [(dependency, done[dependency]) for dependency in dependencies if dependency in done]
+                worker = partial(repair_workers[kind], output_root=output_root,
+                                 feedback=_format_errors(task_errors, output_root),
+                                 upstream=describe_upstream(upstream))
+                submitted[label, i] = executor.submit(traced("repair", worker, kind=kind, task=task), task)
+
+            repaired = {}
+            for (label, i), future in submitted.items():
+                task, old_result, _ = results[label][i]
+                try:
+                    result = future.result()
+                    if result.written is not None:
+                        result.written.result()
+                except Exception as e:
+                    print(f"❌ Error regenerating {label.lower()} task '{task}': {e}")
+                    results[label][i] = (task, None, e)
+                    continue
+                for stale in set(old_result.files) - set(result.files):
+                    # The new answer used different file names; drop the rejected files.
+                    stale.unlink(missing_ok=True)
+                results[label][i] = (task, result, None)
+                repaired[label, i] = result.files
+
+            with stage("validation"):
+                errors = validate_files([path for files in repaired.values() for path in files], output_root)
+            failing = {}
+            for (label, i), files in repaired.items():
+                task, result, _ = results[label][i]
+                task_errors = {path: errors[path] for path in files if path in errors}
+                if task_errors:
+                    failing[label, i] = task_errors
+                    continue
+                print(f"✅ {label} task '{task}' now passes validation.")
+                if on_task_done is not None:
+                    try:
+                        on_task_done(kinds[label], task, result)
+                    except Exception as e:
+                        print(f"⚠️ Could not record the result of '{task}': {e}")
+
+    for (label, i), task_errors in failing.items():
+        task = results[label][i][0]
+        error = CodeValidationError(f"Generated code failed validation:\n    {_format_errors(task_errors, output_root)}")
+        if rounds == 0:
+            print(f"❌ {label} task '{task}':\n    {_format_errors(task_errors, output_root)}")
+        results[label][i] = (task, None, error)
+    return results
+
+
+def index_results(groups: list, results: dict, output_root: Path = OUTPUT_ROOT) -> None:
+    """Adds the validated code of every successful task to the artifact index, for later runs to reuse."""
+    index = get_artifact_index()
+    if not index.enabled:
+        return
+    kinds = {label: kind for label, kind, *_ in groups}
+    try:
+        for label, outcomes in results.items():
+            kind = kinds[label]
+            for task, result, error in outcomes:
+                code_data = read_artifact(kind, result.files, output_root) if error is None else None
+                if code_data is not None:
+                    index.add(kind, task, code_data, get_profile() if kind == "backend" else "", qualified_model())
+    except sqlite3.Error as e:
+        print(f"⚠️ Could not update the artifact index: {e}")
+
+
+def _finish_manifest(manifest: BuildManifest, groups: list, results: dict, fingerprints: dict) -> None:
+    failed = False
+    for label, kind, *_ in groups:
+        for task, result, error in results[label]:
+            if error is None:
+                manifest.record(fingerprints[kind, task], kind, task, result.files)
+            else:
+                failed = True
+    if failed:
+        # Keep stale outputs until every task succeeds, so a failed
+        # regeneration never removes the last working version.
+        print("⚠️ Some tasks failed; stale outputs were kept and will be pruned on the next clean run.")
+    else:
+        for name in manifest.prune(set(fingerprints.values())):
+            print(f"🗑️ Pruned '{name}' (its task is no longer in the plan).")
+    manifest.save()
+
+
+def dedupe_tasks(plan_data: dict, threshold: float = DEDUPE_THRESHOLD) -> tuple:
+    """
+    Merges near-duplicate tasks of the plan (see `task_dedup`) and logs what was merged.
+
+    Returns:
+        A `(plan, duplicates)` tuple: the plan with each cluster of similar
+        tasks merged into its first task, and the `Duplicate`s folded in.
+    """
+    plan, duplicates = dedupe_plan(plan_data, threshold)
+    if duplicates:
+        print(f"\n🧹 Merged {len(duplicates)} near-duplicate task(s), saving as many agent calls:")
+        for duplicate in duplicates:
+            print(f"   {describe(duplicate)}")
+    return plan, duplicates
+
+
+def plan_graph(plan_data: dict, deduped: Optional[dict] = None, duplicates: Optional[list] = None) -> TaskGraph:
+    """
+    Builds the dependency graph of a plan (see `task_graph`) and logs its critical path.
+
+    Args:
+        plan_data: The coordinator's plan, whose task IDs the dependencies refer to.
+        deduped: Optional plan after near-duplicate tasks were merged, with
+            the `duplicates` that were folded in; the graph follows the merge.
+        duplicates: The `Duplicate`s returned with `deduped`.
+
+    Returns:
+        The graph, with `(kind, task)` nodes.
+    """
+    graph = TaskGraph.from_plan(plan_data)
+    if deduped is not None:
+        graph = graph.renamed(dedupe_renames(plan_data, deduped, duplicates or []))
+    if graph.edge_count:
+        path = graph.critical_path({"frontend": FRONTEND_TOKENS_PER_TASK, "backend": BACKEND_TOKENS_PER_TASK})
+        print(f"\n🧭 The plan has {graph.edge_count} dependency(ies); its critical path is {len(path)} task(s) long:")
+        for kind, task in path:
+            print(f"   {kind}: {task}")
+    return graph
 
-def main():
+
+def plan_fingerprints(groups: list, plan_data: dict, graph: Optional[TaskGraph] = None) -> dict:
+    """
+    Returns the build fingerprint of every task of the plan, keyed by `(kind, task)`.
+
+    With a `graph`, each fingerprint covers the fingerprints of the task's
+    dependencies (see `task_fingerprint`), so a change to a task also changes
+    every task built on its code.
+    """
+    model = qualified_model()
+    prompts = {
+        (kind, task): build_prompt(task)
+        for _, kind, _, build_prompt in groups
+        for task in plan_data.get(f"{kind}_tasks", [])
+    }
+    order = graph.topological_order() if graph is not None else []
+    fingerprints = {}
+    for node in [node for node in order if node in prompts] + [node for node in prompts if node not in order]:
+        upstream = [fingerprints[dependency] for dependency in (graph.dependencies.get(node, ()) if graph else ())
+                    if dependency in fingerprints]
+        fingerprints[node] = task_fingerprint(node[0], prompts[node], model, tuple(upstream))
+    return fingerprints
+
+
+def generate_project(plan_data: dict, output_root: Path = OUTPUT_ROOT, concurrency: int = DEFAULT_CONCURRENCY,
+                     stream: bool = False, batch_size: int = 1, incremental: bool = False,
+                     completed: Optional[dict] = None,
+                     on_task_done: Optional[Callable[[str, str, TaskResult], None]] = None, executor=None,
+                     validation_rounds: Optional[int] = VALIDATION_ROUNDS,
+                     dedupe_threshold: Optional[float] = DEDUPE_THRESHOLD) -> dict:
+    """
+    Runs the frontend and backend agents for every task in the plan.
+
+    All tasks are dispatched together; results are reported in plan order.
+    When the plan declares dependencies between tasks, each task starts once
+    the tasks it depends on have finished and receives their code, and the
+    longest chains start first (see `run_tasks`). The files each task produced are recorded in the output directory's build
+    manifest, and the files of tasks that left the plan are pruned. In
+    incremental mode, tasks whose inputs match the manifest from an earlier run
+    (and whose files still exist) are skipped.
+
+    Args:
+        plan_data: The coordinator's parsed plan.
+        output_root: The directory the generated project is written to.
+        concurrency: The maximum number of agent calls in flight at once.
+        stream: Whether to stream generated code to disk while it is produced.
+        batch_size: The most tasks to pack into one agent call. Batches shrink
+            automatically to fit the model's output limit, and single tasks
+            (including retries of failed batch items) use the regular path.
+        incremental: Whether to skip unchanged tasks using the build manifest.
+        completed: Tasks already finished by an interrupted run, as a dict
+            mapping `(kind, task)` to the files they wrote. They are skipped and
+            their files are recorded in the manifest as they are.
+        on_task_done: Optional `(kind, task, result)` callback, called as soon as
+            each task succeeds, e.g. to journal it.
+        executor: Optional shared executor, passed on to `run_tasks`.
+        validation_rounds: How many times to regenerate tasks whose code fails
+            validation (see `validate_results`), or None to skip validation.
+        dedupe_threshold: The similarity above which tasks are merged before
+            dispatch (see `dedupe_tasks`), or None to keep every task.
+
+    Returns:
+        The per-task results from `run_tasks` (skipped tasks are not included).
+    """
+    if dedupe_threshold is not None:
+        deduped, duplicates = dedupe_tasks(plan_data, dedupe_threshold)
+        graph = plan_graph(plan_data, deduped, duplicates)
+        plan_data = deduped
+    else:
+        graph = plan_graph(plan_data)
+    if graph.edge_count and batch_size > 1:
+        print("Tasks are scheduled by their dependencies and sent one per request, so --batch-size is ignored.")
+    print(f"\nDispatching all tasks with a concurrency limit of {max(1, concurrency)}.")
+    groups = _agent_groups(output_root, stream, batch_size)
+    fingerprints = plan_fingerprints(groups, plan_data, graph)
+    manifest = BuildManifest(output_root)
+
+    completed = completed or {}
+    # Dependencies are decided first, so a task whose dependency runs again runs too.
+    reasons = {}
+    for node in graph.topological_order():
+        if node in fingerprints:
+            upstream_rerun = any(dependency in fingerprints and dependency not in reasons
+                                 for dependency in graph.dependencies[node])
+            reason = _skip_reason(*node, fingerprints[node], manifest, completed, incremental, upstream_rerun)
+            if reason is not None:
+                reasons[node] = reason
+    task_groups = []
+    finished = {}
+    for label, kind, worker, _ in groups:
+        tasks = plan_data.get(f"{kind}_tasks", [])
+        skipped = {}
+        for task in tasks:
+            reason = reasons.get((kind, task))
+            if reason is not None:
+                skipped.setdefault(reason, []).append(task)
+                finished[kind, task] = TaskResult("", manifest.outputs(fingerprints[kind, task]))
+        for reason, done in skipped.items():
+            print(f"⏭️ Skipping {len(done)} {label.lower()} task(s) {reason}.")
+        skipped_tasks = {task for done in skipped.values() for task in done}
+        task_groups.append((label, [task for task in tasks if task not in skipped_tasks], worker))
+
+    kinds = {label: kind for label, kind, *_ in groups}
+    results = run_tasks(
+        task_groups,
+        concurrency=concurrency,
+        on_task_done=on_task_done and (lambda label, task, result: on_task_done(kinds[label], task, result)),
+        executor=executor,
+        graph=graph,
+        finished=finished,
+    )
+    if validation_rounds is not None:
+        validate_results(groups, results, output_root, concurrency, validation_rounds, on_task_done, executor,
+                         graph, finished)
+        index_results(groups, results, output_root)
+    _finish_manifest(manifest, groups, results, fingerprints)
+    return results
+
+
+def pipeline_project(project_brief: str, output_root: Path = OUTPUT_ROOT, concurrency: int = DEFAULT_CONCURRENCY,
+                     stream: bool = False, incremental: bool = False, completed: Optional[dict] = None,
+                     on_task_done: Optional[Callable[[str, str, TaskResult], None]] = None,
+                     on_plan: Optional[Callable[[dict], None]] = None,
+                     validation_rounds: Optional[int] = VALIDATION_ROUNDS,
+                     dedupe_threshold: Optional[float] = DEDUPE_THRESHOLD) -> Optional[tuple]:
+    """
+    Plans and generates the project at once, overlapping planning with generation.
+
+    The coordinator's response is streamed and parsed incrementally; each task
+    is handed to the thread pool the moment its string in `frontend_tasks` or
+    `backend_tasks` is complete, so code generation starts while the rest of
+    the plan is still being written. Once the stream ends, the full response is
+    extracted and validated as usual, and any task the incremental parser did
+    not deliver (e.g. because the response needed repair) is dispatched then.
+    Skipping, manifest bookkeeping and reporting work as in `generate_project`.
+    Tasks are dispatched before the plan's dependencies are known, so these
+    are not used here.
+
+    Args:
+        project_brief: The user's project description.
+        output_root: The directory the generated project is written to.
+        concurrency: The maximum number of agent calls in flight at once.
+        stream: Whether to stream generated code to disk while it is produced.
+        incremental: Whether to skip unchanged tasks using the build manifest.
+        completed: Tasks already finished by an interrupted run, as in `generate_project`.
+        on_task_done: Optional `(kind, task, result)` callback, called as soon as each task succeeds.
+        on_plan: Optional callback receiving the validated plan.
+        validation_rounds: As in `generate_project`.
+        dedupe_threshold: As in `generate_project`. Tasks arrive one at a time
+            here, so a near-duplicate of an already dispatched task is dropped
+            rather than merged into it.
+
+    Returns:
+        A `(plan_data, results)` tuple, or None if no usable plan was received.
+    """
+    print("\n--- [1/3] Running Coordinator Agent and dispatching tasks as they are planned ---")
+    print(f"Dispatching tasks with a concurrency limit of {max(1, concurrency)}.")
+    groups = _agent_groups(output_root, stream, batch_size=1)
+    groups_by_key = {f"{group[1]}_tasks": group for group in groups}
+    model = qualified_model()
+    manifest = BuildManifest(output_root)
+    completed = completed or {}
+    fingerprints = {}
+    submitted = {label: ([], []) for label, *_ in groups}
+    skipped = {}
+    deduplicator = TaskDeduplicator(dedupe_threshold) if dedupe_threshold is not None else None
+    dropped = set()
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        def dispatch(key: str, task) -> None:
+            if key not in groups_by_key or not isinstance(task, str):
+                return
+            label, kind, worker, build_prompt = groups_by_key[key]
+            if (kind, task) in fingerprints or (kind, task) in dropped:
+                return
+            if deduplicator is not None and deduplicator.check(kind, task) is not None:
+                dropped.add((kind, task))
+                return
+            fingerprints[kind, task] = task_fingerprint(kind, build_prompt(task), model)
+            reason = _skip_reason(kind, task, fingerprints[kind, task], manifest, completed, incremental)
+            if reason is not None:
+                skipped[label, reason] = skipped.get((label, reason), 0) + 1
+                return
+            if not any(futures for _, futures in submitted.values()):
+                get_stage_timer().record("first_task", time.perf_counter() - start)
+            future = executor.submit(traced("task", worker, kind=kind, task=task), task)
+            if on_task_done is not None:
+                future.add_done_callback(partial(_report_done, on_task_done, kind, task))
+            submitted[label][0].append(task)
+            submitted[label][1].append(future)
+
+        parser = StreamingJSONParser()
+        raw_parts = []
+        plan_span = get_telemetry().open_span("plan", streamed=True)
+        try:
+            with stage("planning"):
+                for chunk in coordinator_agent_stream(project_brief):
+                    raw_parts.append(chunk)
+                    if parser is None:
+                        continue
+                    try:
+                        for event in parser.feed(chunk):
+                            if event[0] == "item":
+                                dispatch(event[1], event[2])
+                    except StreamingJSONError:
+                        # Leave it to the repairing extractor once the response is complete.
+                        parser = None
+            with stage("parsing"):
+                plan_data = parse_response("".join(raw_parts), extract_json, PLAN_SCHEMA)
+        except Exception as e:
+            # A cache miss in replay mode, an unusable plan, or the provider's error once its retries ran out.
+            plan_span.finish(type(e).__name__)
+            executor.shutdown(wait=True, cancel_futures=True)
+            print(f"❌ Error: Failed to get the project plan. Cannot proceed. {e}")
+            return None
+        except BaseException as e:
+            plan_span.finish(type(e).__name__)
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        plan_span.finish()
+        print("✅ Plan received and parsed successfully.")
+        if on_plan is not None:
+            on_plan(plan_data)
+
+        for key in groups_by_key:
+            for task in plan_data[key]:
+                dispatch(key, task)
+        if dropped:
+            print(f"🧹 Dropped {len(dropped)} near-duplicate task(s), saving as many agent calls:")
+            for line in deduplicator.report():
+                print(f"   {line}")
+        for (label, reason), count in skipped.items():
+            print(f"⏭️ Skipping {count} {label.lower()} task(s) {reason}.")
+        results = collect_results([(label, *submitted[label]) for label, *_ in groups])
+        if validation_rounds is not None:
+            validate_results(groups, results, output_root, concurrency, validation_rounds, on_task_done, executor)
+            index_results(groups, results, output_root)
+
+    _finish_manifest(manifest, groups, results, fingerprints)
+    return plan_data, results
+
+
+# Options recorded in a run's journal and restored when it is resumed.
+RESUMED_OPTIONS = ("provider", "stream", "batch_size", "backend_profile")
+
+
+def add_generation_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the options shared by every command that generates projects (`main.py` and `run_batch.py`)."""
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Maximum number of agent calls in flight at once (default: {DEFAULT_CONCURRENCY}). Use 1 for sequential runs.",
+    )
+    parser.add_argument(
+        "--provider",
+        choices=sorted(PROVIDERS),
+        default=DEFAULT_PROVIDER,
+        help="Model backend: 'gemini' calls the Gemini API, 'stub' returns deterministic local "
+             "responses (configured with STUB_* environment variables) for offline runs.",
+    )
+    parser.add_argument(
+        "--cache",
+        choices=CACHE_MODES,
+        default=DEFAULT_CACHE_MODE,
+        help="Response cache mode: 'on' reuses cached responses, 'off' always calls the API, "
+             "'replay' only serves cached responses and fails on a miss.",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=DEFAULT_RPM,
+        help=f"Requests per minute allowed by your API quota (default: {DEFAULT_RPM:g}).",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=float,
+        default=DEFAULT_TPM,
+        help=f"Tokens per minute allowed by your API quota (default: {DEFAULT_TPM:g}).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Pack up to this many tasks into one agent request (default: 1, no batching). "
+             "Batches shrink to fit the model's output token limit (MAX_OUTPUT_TOKENS).",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Regenerate every task, ignoring the build manifest from earlier runs and never reusing indexed code "
+             "as it is.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream agent responses and write code files while they are being generated.",
+    )
+    parser.add_argument(
+        "--plan-section-chars",
+        type=int,
+        default=PLAN_SECTION_CHARS,
+        help="Split briefs longer than this many characters into sections of at most this size, plan them in "
+             f"parallel and merge the plans (default: {PLAN_SECTION_CHARS}; 0 plans every brief in one call).",
+    )
+    parser.add_argument(
+        "--validation-rounds",
+        type=int,
+        default=VALIDATION_ROUNDS,
+        help="Check the generated code (syntax, imports, TSX/CSS structure) and regenerate failing tasks "
+             f"with their errors up to this many times (default: {VALIDATION_ROUNDS}; 0 only reports).",
+    )
+    parser.add_argument(
+        "--no-validate",
+        action="store_true",
+        help="Skip validating the generated code.",
+    )
+    parser.add_argument(
+        "--dedupe-threshold",
+        type=float,
+        default=DEDUPE_THRESHOLD,
+        help="Merge planned tasks whose wording is at least this similar (0-1, default: "
+             f"{DEDUPE_THRESHOLD:g}) before dispatching them.",
+    )
+    parser.add_argument(
+        "--no-dedupe",
+        action="store_true",
+        help="Dispatch every planned task, even near-duplicates.",
+    )
+    parser.add_argument(
+        "--no-templates",
+        action="store_true",
+        help="Send every task to the model, including standard CRUD, list, form and checkbox tasks "
+             "that are otherwise rendered locally from templates.",
+    )
+    parser.add_argument(
+        "--no-reuse",
+        action="store_true",
+        help="Do not look up or reuse code generated for similar tasks by earlier runs (the artifact index).",
+    )
+    parser.add_argument(
+        "--reuse-threshold",
+        type=float,
+        default=DEFAULT_REUSE_THRESHOLD,
+        help="Reuse an earlier task's code without a model call when the tasks are at least this similar "
+             f"(0-1, default: {DEFAULT_REUSE_THRESHOLD:g}); less similar matches are sent as a reference.",
+    )
+    parser.add_argument(
+        "--backend-profile",
+        choices=sorted(BACKEND_PROFILES),
+        default=DEFAULT_BACKEND_PROFILE,
+        help="Backend prompt profile: 'default' writes plain synchronous endpoints, 'performance' asks for "
+             "async SQLAlchemy on a pooled engine, paginated lists, bulk inserts and indexes "
+             "(check the result with load_test.py).",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Send a duplicate request for agent calls that run longer than usual and keep the first answer.",
+    )
+    parser.add_argument(
+        "--hedge-percentile",
+        type=float,
+        default=DEFAULT_HEDGE_PERCENTILE,
+        help="With --hedge, hedge calls slower than this latency percentile of their agent "
+             f"(default: {DEFAULT_HEDGE_PERCENTILE:g}).",
+    )
+    parser.add_argument(
+        "--hedge-budget",
+        type=float,
+        default=DEFAULT_HEDGE_BUDGET,
+        help="With --hedge, the most extra requests to send, as a fraction of agent calls "
+             f"(default: {DEFAULT_HEDGE_BUDGET:g}).",
+    )
+
+
+def configure_run(args) -> tuple:
+    """
+    Applies the options added by `add_generation_arguments` to the process-wide cache, limiter and agents.
+
+    Returns:
+        The `(cache, limiter, hedging)` that were configured, for the run's report.
+    """
+    cache = configure_response_cache(mode=args.cache)
+    limiter = configure_rate_limiter(rpm=args.rpm, tpm=args.tpm)
+    configure_profile(args.backend_profile)
+    configure_templates(enabled=not args.no_templates)
+    configure_artifact_index(enabled=ARTIFACT_INDEX_ENABLED and not args.no_reuse, reuse_threshold=args.reuse_threshold,
+                             rebuild=args.rebuild)
+    hedging = configure_hedging(enabled=args.hedge, percentile=args.hedge_percentile, budget=args.hedge_budget)
+    return cache, limiter, hedging
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Returns the orchestrator's command-line parser."""
+    parser = argparse.ArgumentParser(description="Generate a project from a brief using the multi-agent system.")
+    add_generation_arguments(parser)
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Stream the coordinator's plan and start generating each task as soon as it is planned. "
+             "Tasks are sent one per request, so --batch-size is ignored.",
+    )
+    parser.add_argument(
+        "--brief",
+        type=Path,
+        metavar="FILE",
+        help="Read the project brief from this file (e.g. a Markdown PRD) instead of the built-in example.",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="Resume an interrupted run from its journal, reusing its plan and only "
+             "dispatching the tasks that had not finished.",
+    )
+    parser.add_argument(
+        "--otel",
+        action="store_true",
+        help="Also export the run's spans to an OpenTelemetry collector (configured with the "
+             "standard OTEL_EXPORTER_OTLP_* variables; needs opentelemetry-sdk).",
+    )
+    return parser
+
+
+def parse_args(argv=None):
+    """Parses the command-line options for the orchestrator, and exits on invalid numeric environment settings."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        check_env()
+    except EnvConfigError as e:
+        parser.error(str(e))
+    return args
+
+
+def restore_options(args, options: dict, argv=None) -> Optional[str]:
+    """
+    Restores the `RESUMED_OPTIONS` a resumed run was started with onto `args`.
+
+    The run's plan, fingerprints and journaled files depend on them, so an
+    option given on the command line that differs from the journal is refused.
+
+    Returns:
+        An error message, or None if the options were restored.
+    """
+    parser = build_parser()
+    parser.set_defaults(**{name: None for name in RESUMED_OPTIONS})
+    explicit = {name: value for name, value in vars(parser.parse_args(argv)).items() if value is not None}
+    for name in RESUMED_OPTIONS:
+        if name not in options:
+            continue
+        if name in explicit and explicit[name] != options[name]:
+            flag = "--" + name.replace("_", "-")
+            return (f"The run was started with {flag} {options[name]}, not {explicit[name]}. "
+                    f"Resume it without {flag}, or start a new run.")
+        setattr(args, name, options[name])
+    return None
+
+
+def write_telemetry(run_id: str, otel: bool = False) -> None:
+    """Writes the run's metrics report next to its journal and optionally exports its spans."""
+    telemetry = get_telemetry()
+    try:
+        json_path, prom_path = telemetry.write_reports(DEFAULT_JOURNAL_DIR, run_id)
+        print(f"Run metrics written to {json_path} and {prom_path}.")
+    except OSError as e:
+        print(f"⚠️ Could not write the run metrics: {e}")
+    if otel:
+        try:
+            print(f"Exported {telemetry.export_otel()} span(s) to OpenTelemetry.")
+        except RuntimeError as e:
+            print(f"⚠️ {e}")
+
+
+def main(argv=None):
     """
     The main function to orchestrate the multi-agent system.
     """
+    args = parse_args(argv)
+    journal = None
+    if args.resume:
+        try:
+            journal = RunJournal.open(args.resume)
+        except FileNotFoundError:
+            print(f"❌ Error: No journal found for run '{args.resume}'.")
+            return
+        error = restore_options(args, journal.options, argv)
+        if error is not None:
+            print(f"❌ Error: {error}")
+            return
+    cache, limiter, hedging = configure_run(args)
+
     try:
-        initialize_gemini()
+        configure_provider(args.provider).initialize()
     except ValueError as e:
         print(e)
         return
 
     project_brief = """
-    Build a simple task management application. 
+    Build a simple task management application.
     Users need to see a list of tasks, add new tasks via a form, and mark tasks as complete by clicking a checkbox.
     This requires a frontend UI and a backend API with a database to persist the tasks.
     """
-    
-    print("--- 🚀 Starting AI Project Generation ---")
+
+    if args.brief:
+        try:
+            project_brief = args.brief.read_text(encoding="utf-8")
+        except OSError as e:
+            print(f"❌ Error: Could not read the brief: {e}")
+            return
+
+    if journal is not None:
+        project_brief = journal.brief
+        print(f"--- 🔁 Resuming run {journal.run_id}: {len(journal.completed)} task(s) already finished ---")
+    else:
+        journal = RunJournal.create(project_brief, options={name: getattr(args, name) for name in RESUMED_OPTIONS})
+        print(f"--- 🚀 Starting AI Project Generation (run {journal.run_id}) ---")
     print(f"Project Brief: '{project_brief.strip()[:80]}...'")
 
-    # --- 1. RUN COORDINATOR AGENT ---
-    print("\n--- [1/3] Running Coordinator Agent to get the project plan ---")
-    raw_plan_output = coordinator_agent(project_brief)
-    
-    try:
-        # Clean and parse the coordinator's output
-        cleaned_plan_str = raw_plan_output.strip().replace("```json", "").replace("```", "").strip()
-        plan_data = json.loads(cleaned_plan_str)
-        print("✅ Plan received and parsed successfully.")
-    except (json.JSONDecodeError, KeyError) as e:
-        print(f"❌ Error: Failed to parse the project plan. Cannot proceed. {e}")
-        return
+    def record_task(kind: str, task: str, result: TaskResult) -> None:
+        journal.record_task(kind, task, result.message, result.files)
 
-    # --- 2. RUN FRONTEND AGENT ---
-    print("\n--- [2/3] Running Frontend Agent for each task ---")
-    frontend_tasks = plan_data.get("frontend_tasks", [])
-    if not frontend_tasks:
-        print("No frontend tasks found.")
+    validation_rounds = None if args.no_validate else max(0, args.validation_rounds)
+    dedupe_threshold = None if args.no_dedupe else args.dedupe_threshold
+    plan_data = journal.plan
+    pipeline = args.pipeline
+    if pipeline and plan_data is None and len(split_brief(project_brief, args.plan_section_chars)) > 1:
+        print("The brief is planned in sections, which are not streamed, so --pipeline is ignored.")
+        pipeline = False
+    if plan_data is None and pipeline:
+        # --- 1, 2 & 3. RUN THE COORDINATOR, FEEDING TASKS TO THE AGENTS AS THEY ARE PLANNED ---
+        outcome = pipeline_project(
+            project_brief, concurrency=args.concurrency, stream=args.stream, incremental=not args.rebuild,
+            completed=journal.completed_tasks(), on_task_done=record_task, on_plan=journal.record_plan,
+            validation_rounds=validation_rounds, dedupe_threshold=dedupe_threshold,
+        )
+        if outcome is None:
+            print(f"Resume later with: python main.py --resume {journal.run_id}")
+            return
+        plan_data, results = outcome
     else:
-        for i, task in enumerate(frontend_tasks, 1):
-            print(f"\nProcessing Frontend Task ({i}/{len(frontend_tasks)}): {task}")
-            try:
-                raw_code_json = frontend_agent(task)
-                cleaned_code_str = raw_code_json.strip().replace("```json", "").replace("```", "").strip()
-                code_data = json.loads(cleaned_code_str)
-
-                component_name = code_data["component_name"]
-                tsx_code = code_data["tsx_code"]
-                css_code = code_data["css_code"]
-                
-                output_dir = Path(f"output/frontend/components/{component_name}")
-                output_dir.mkdir(parents=True, exist_ok=True)
-                
-                (output_dir / f"{component_name}.tsx").write_text(tsx_code, encoding="utf-8")
-                (output_dir / f"{component_name}.module.css").write_text(css_code, encoding="utf-8")
-                
-                print(f"✅ Code for '{component_name}' saved successfully.")
-                time.sleep(1) # Brief pause to avoid overwhelming the API
-            except Exception as e:
-                print(f"❌ Error processing frontend task '{task}': {e}")
+        # --- 1. RUN COORDINATOR AGENT ---
+        if plan_data is None:
+            plan_data = plan_project(project_brief, section_chars=args.plan_section_chars,
+                                     concurrency=args.concurrency, dedupe_threshold=dedupe_threshold)
+            if plan_data is None:
+                print(f"Resume later with: python main.py --resume {journal.run_id}")
+                return
+            journal.record_plan(plan_data)
+        else:
+            print("\n--- [1/3] Reusing the project plan from the run journal ---")
 
-    # --- 3. RUN BACKEND AGENT ---
-    print("\n--- [3/3] Running Backend Agent for each task ---")
-    backend_tasks = plan_data.get("backend_tasks", [])
-    if not backend_tasks:
-        print("No backend tasks found.")
+        # --- 2 & 3. RUN FRONTEND AND BACKEND AGENTS ---
+        results = generate_project(
+            plan_data, concurrency=args.concurrency, stream=args.stream, batch_size=args.batch_size,
+            incremental=not args.rebuild, completed=journal.completed_tasks(), on_task_done=record_task,
+            validation_rounds=validation_rounds, dedupe_threshold=dedupe_threshold,
+        )
+    for label, outcomes in results.items():
+        for task, _, error in outcomes:
+            if isinstance(error, CodeValidationError):
+                # It was journaled when its files were written; a resumed run must regenerate it.
+                journal.record_task_invalid(label.lower(), task)
+    if any(error is not None for outcomes in results.values() for _, _, error in outcomes):
+        print(f"\n⚠️ Some tasks failed. Retry just those with: python main.py --resume {journal.run_id}")
     else:
-        for i, task in enumerate(backend_tasks, 1):
-            print(f"\nProcessing Backend Task ({i}/{len(backend_tasks)}): {task}")
-            try:
-                raw_code_json = backend_agent(task)
-                cleaned_code_str = raw_code_json.strip().replace("```json", "").replace("```", "").strip()
-                code_data = json.loads(cleaned_code_str)
-
-                filename = code_data["filename"]
-                python_code = code_data["python_code"]
-                
-                base_output_dir = Path("output/backend")
-                file_path = base_output_dir / filename
-                file_path.parent.mkdir(parents=True, exist_ok=True)
-                file_path.write_text(python_code, encoding="utf-8")
-                
-                print(f"✅ Code for '{filename}' saved successfully.")
-                time.sleep(1) # Brief pause to avoid overwhelming the API
-            except Exception as e:
-                print(f"❌ Error processing backend task '{task}': {e}")
-    
+        journal.record_finish()
+
+    if cache.enabled:
+        print(f"\nResponse cache: {cache.hits} hit(s), {cache.misses} miss(es).")
+    print(limiter.report())
+    print(prompt_report())
+    if continuation_stats.truncated:
+        print(continuation_report())
+    print(template_report())
+    if get_artifact_index().enabled:
+        print(reuse_report())
+    if hedging.enabled:
+        print(hedging.report())
+    print(parse_report())
+    print(get_output_writer().report())
+    write_telemetry(journal.run_id, otel=args.otel)
     print("\n--- ✅ All tasks complete! Project generated successfully in the 'output' directory. ---")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
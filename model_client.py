@@ -0,0 +1,516 @@
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+from env_config import env_int
+from hedging import HedgeCancelled, get_hedging_policy
+from json_extract import json_state
+from model_providers import FINISH_MAX_TOKENS, Completion, get_provider
+from rate_limiter import estimate_tokens, get_rate_limiter
+from response_cache import CacheMissError, get_response_cache
+from telemetry import estimate_cost, get_telemetry
+
+MODEL_NAME = 'models/gemini-pro-latest'
+# The most continuation requests sent to finish one response that was cut off by the output token limit.
+MAX_CONTINUATIONS = env_int("MAX_CONTINUATIONS", 2)
+# How much of the end of a cut-off response the continuation prompt asks the model to repeat before going on.
+RESUME_MARKER_CHARS = 32
+# How many recent responses remember the cache entries they came from, so an unusable one can be evicted.
+MAX_TRACKED_RESPONSES = 1024
+
+CONTINUATION_PROMPT = """{prompt}
+
+    Your previous response to this prompt was cut off by the output token limit. This is what you wrote so far:
+<partial_response>
+{partial}
+</partial_response>
+    Continue the response from exactly the character where it stops, as if you had never been interrupted.
+    Start your answer by repeating exactly the end of the response shown here, then go straight on from it:
+<resume_from>
+{marker}
+</resume_from>
+    Repeat nothing else, and add no introduction, explanation or code fences of your own.
+    """
+
+
+class _PromptTokenStats:
+    """
+    Thread-safe accounting of the prompt tokens sent to the model.
+
+    A cached prefix is processed once, when the provider first caches it; every
+    later call that reuses it saves that many prompt tokens.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self._prefixes = set()
+
+    def record(self, prefix_key: Optional[tuple], prefix_tokens: int, suffix_tokens: int) -> None:
+        """Records one API call; `prefix_key` is None when the prefix was sent uncached."""
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prefix_tokens + suffix_tokens
+            if prefix_key is not None:
+                if prefix_key in self._prefixes:
+                    self.cached_tokens += prefix_tokens
+                self._prefixes.add(prefix_key)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "billed_tokens": self.prompt_tokens - self.cached_tokens,
+            }
+
+
+prompt_stats = _PromptTokenStats()
+
+
+def prompt_report() -> str:
+    stats = prompt_stats.as_dict()
+    saved = 100.0 * stats["cached_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+    return (
+        f"Prompt tokens: {stats['prompt_tokens']} in {stats['calls']} call(s), "
+        f"{stats['cached_tokens']} served from the prefix cache ({saved:.0f}% saved)."
+    )
+
+
+class _ContinuationStats:
+    """Thread-safe counts of responses cut off by the output token limit and of their continuations."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.truncated = 0
+        self.continuations = 0
+        self.completed = 0
+
+    def record(self, continuations: int, completed: bool) -> None:
+        """Records one truncated response, continued with `continuations` requests."""
+        with self._lock:
+            self.truncated += 1
+            self.continuations += continuations
+            self.completed += completed
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "truncated": self.truncated,
+                "continuations": self.continuations,
+                "completed": self.completed,
+                "incomplete": self.truncated - self.completed,
+            }
+
+
+continuation_stats = _ContinuationStats()
+
+
+def continuation_report() -> str:
+    stats = continuation_stats.as_dict()
+    return (
+        f"Output limit: {stats['truncated']} response(s) cut off, {stats['completed']} completed with "
+        f"{stats['continuations']} continuation request(s), {stats['incomplete']} still incomplete."
+    )
+
+
+class _ResponseKeys:
+    """
+    Remembers which response cache entries each recent response was assembled from.
+
+    A response is only known to be unusable once the caller has tried to parse
+    it, long after it was cached; `discard_response` looks its entries up here
+    to evict them. Only the last `MAX_TRACKED_RESPONSES` responses are kept.
+    """
+
+    def __init__(self, max_entries: int = MAX_TRACKED_RESPONSES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._keys = OrderedDict()
+
+    def record(self, text: str, keys: list) -> None:
+        digest = response_digest(text)
+        with self._lock:
+            self._keys[digest] = list(keys)
+            self._keys.move_to_end(digest)
+            while len(self._keys) > self.max_entries:
+                self._keys.popitem(last=False)
+
+    def pop(self, digest: str) -> list:
+        with self._lock:
+            return self._keys.pop(digest, [])
+
+
+_response_keys = _ResponseKeys()
+
+
+def response_digest(text: str) -> str:
+    """Returns the SHA-256 of a response's text, as `discard_response` expects it."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def discard_response(digest: str) -> int:
+    """
+    Evicts a response that turned out to be unusable (e.g. malformed or truncated JSON) from the response cache.
+
+    Without this, a bad answer would be replayed from the cache on every run.
+    A response that was stitched from continuations loses all its pieces.
+
+    Args:
+        digest: The response's `response_digest`. Streaming callers can hash
+            the chunks as they go instead of keeping the whole text.
+
+    Returns:
+        The number of cache entries removed.
+    """
+    keys = _response_keys.pop(digest)
+    cache = get_response_cache()
+    if not cache.enabled:
+        return 0
+    for key in keys:
+        cache.delete(key)
+    if keys:
+        print("🗑️ Evicted an unusable response from the response cache, so the next run asks the model again.")
+    return len(keys)
+
+
+def is_truncated(text: str, finish_reason: Optional[str]) -> bool:
+    """
+    Tells whether a response was cut off before its JSON was complete.
+
+    When the provider reports the finish reason, only a response stopped by
+    the output token limit counts; when it does not (e.g. a cached response),
+    a response whose first JSON object or array is never closed does.
+    """
+    if finish_reason is None:
+        return json_state(text) == "partial"
+    return finish_reason == FINISH_MAX_TOKENS and json_state(text) != "complete"
+
+
+def resume_marker(text: str) -> str:
+    """Returns the end of a cut-off response that its continuation is asked to start with."""
+    return text[-RESUME_MARKER_CHARS:]
+
+
+def stitch(text: str, continuation: str) -> str:
+    """
+    Returns the part of `continuation` that follows `text`.
+
+    The continuation prompt asks the model to start by repeating the end of
+    `text` (see `resume_marker`), so that echo, and a code fence opened before
+    it, are dropped. Nothing else is: code that legitimately repeats the lines
+    before it is kept, and a continuation without the echo is kept whole.
+    """
+    marker = resume_marker(text)
+    if continuation.startswith(marker):
+        return continuation[len(marker):]
+    if continuation.startswith("```") and "\n" in continuation:
+        unfenced = continuation.split("\n", 1)[1]
+        if unfenced.startswith(marker):
+            return unfenced[len(marker):]
+    return continuation
+
+
+def _prepare_prompt(provider, prompt: str, prefix: str, model_name: str) -> tuple:
+    """
+    Returns `(text_to_send, cached_prefix)` for one API call and records its token usage.
+
+    When the provider has cached `prefix`, only `prompt` is sent along with a
+    reference to the cached prefix; otherwise the two are sent together.
+    """
+    prefix_tokens = estimate_tokens(prefix) if prefix else 0
+    prefix_key = None
+    if prefix and provider.cache_prefix(prefix, model_name):
+        prefix_key = (provider.name, model_name, hashlib.sha256(prefix.encode("utf-8")).hexdigest())
+    prompt_stats.record(prefix_key, prefix_tokens, estimate_tokens(prompt))
+    if prefix_key is not None:
+        return prompt, prefix
+    return prefix + prompt, None
+
+
+def _close(chunks) -> None:
+    close = getattr(chunks, "close", None)
+    if close is not None:
+        close()
+
+
+def initialize_gemini() -> None:
+    """
+    Prepares the process-wide model client.
+
+    With the default Gemini provider this loads the API key and configures the
+    SDK; later calls are no-ops. Raises ValueError if the client cannot be set up.
+    """
+    get_provider().initialize()
+
+
+class _CallTimer:
+    """
+    Records the timing, retries and token counts of one model call on its span.
+
+    A hedged call sends more than one request, each from its own thread; the
+    timings are those of the request whose answer was used.
+    """
+
+    def __init__(self, span, prompt_tokens: int):
+        self.span = span
+        self.prompt_tokens = prompt_tokens
+        self.created = time.time()
+        self.requests = 0
+        self.attempts = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        span.set("prompt_tokens", prompt_tokens)
+
+    def wrap(self, fn):
+        """Wraps one request's API attempts, as passed to `RateLimiter.call`."""
+        with self._lock:
+            self.requests += 1
+            if self.requests > 1:
+                self.span.set("hedged", True)
+
+        def attempt():
+            self._local.start = time.time()
+            with self._lock:
+                first = self.attempts == 0
+                self.attempts += 1
+                retries = self.attempts - self.requests
+            if first:
+                self.span.set("rate_limit_wait_s", self._local.start - self.created)
+            self.span.set("retries", retries)
+            return fn()
+        return attempt
+
+    def started(self) -> float:
+        """Returns when the calling thread's latest attempt started."""
+        return self._local.start
+
+    def first_token(self, started: float) -> None:
+        self.span.set("ttft_s", time.time() - started)
+
+    def done(self, started: float, response_tokens: int) -> None:
+        self.span.set("latency_s", time.time() - started)
+        self.span.set("response_tokens", response_tokens)
+        cost = estimate_cost(self.prompt_tokens, response_tokens)
+        if cost:
+            self.span.set("cost_usd", cost)
+
+
+def _send(request, hedge: Optional[str], discard=None):
+    """Runs `request(cancel_event)` once, or under the hedging policy for call class `hedge`."""
+    if hedge is None:
+        return request(threading.Event())
+    return get_hedging_policy().call(hedge, request, discard)
+
+
+def _check_cancelled(cancel: threading.Event) -> None:
+    if cancel.is_set():
+        raise HedgeCancelled("A hedged duplicate of this request already succeeded.")
+
+
+def generate_content(prompt: str, model_name: str = MODEL_NAME, generation_config: Optional[dict] = None,
+                     prefix: str = "", hedge: Optional[str] = None) -> str:
+    """
+    Sends a prompt to the selected model provider and returns the response text.
+
+    Every agent goes through this function, so identical calls (same provider,
+    model, prompt and generation settings) are answered from the on-disk
+    response cache instead of the API, and real API calls share one rate limiter.
+    A response cut off by the output token limit is finished with up to
+    `MAX_CONTINUATIONS` continuation requests instead of being thrown away.
+
+    Args:
+        prompt: The prompt to send, or the part of it that follows `prefix`.
+        model_name: The model to use.
+        generation_config: Optional generation settings passed to the model.
+        prefix: Optional static start of the prompt shared by many calls (e.g.
+            an agent's instructions). Providers that support context caching
+            cache it once and reuse it, so it is not processed with every call.
+        hedge: Optional call class (e.g. the agent's name) under which slow
+            calls may be hedged with a duplicate request, if hedging is enabled.
+
+    Returns:
+        The text of the model's response.
+    """
+    keys = []
+    text, finish_reason = _complete(prompt, model_name, generation_config, prefix, hedge, keys)
+    text += "".join(_continue(prompt, text, finish_reason, model_name, generation_config, prefix, keys))
+    _response_keys.record(text, keys)
+    return text
+
+
+def _complete(prompt: str, model_name: str, generation_config: Optional[dict], prefix: str,
+              hedge: Optional[str], keys: list, **attributes) -> Completion:
+    """
+    Sends one request, or answers it from the response cache (with an unknown finish reason).
+
+    The request's cache key is appended to `keys`.
+    """
+    provider = get_provider()
+    cache = get_response_cache()
+    qualified_name = f"{provider.name}:{model_name}"
+    key = cache.make_key(qualified_name, prefix + prompt, generation_config)
+    keys.append(key)
+    with get_telemetry().span("model_call", model=qualified_name, **attributes) as span:
+        cached = cache.get(key)
+        span.set("response_cache", "hit" if cached is not None else "miss")
+        if cached is not None:
+            return Completion(cached)
+        if cache.replay_only:
+            raise CacheMissError(f"No cached response for this prompt (key {key[:12]}) and the cache is in replay mode.")
+
+        limiter = get_rate_limiter()
+        timer = _CallTimer(span, estimate_tokens(prefix + prompt))
+
+        def request(cancel: threading.Event) -> tuple:
+            text_to_send, cached_prefix = _prepare_prompt(provider, prompt, prefix, model_name)
+
+            def send() -> Completion:
+                _check_cancelled(cancel)
+                return provider.complete(text_to_send, model_name, generation_config, cached_prefix=cached_prefix)
+
+            completion = limiter.call(timer.wrap(send), prompt_tokens=estimate_tokens(prefix + prompt))
+            limiter.charge(estimate_tokens(completion.text))
+            return completion, timer.started()
+
+        completion, started = _send(request, hedge)
+        # Without streaming, the first token arrives with the whole response.
+        timer.first_token(started)
+        timer.done(started, estimate_tokens(completion.text))
+        if completion.finish_reason:
+            span.set("finish_reason", completion.finish_reason)
+
+        cache.put(key, qualified_name, completion.text)
+        return completion
+
+
+def _continue(prompt: str, text: str, finish_reason: Optional[str], model_name: str,
+              generation_config: Optional[dict], prefix: str, keys: list) -> Iterator[str]:
+    """
+    Yields the rest of a response that was cut off by the output token limit, piece by piece.
+
+    Each continuation request repeats the prompt with the response so far and
+    asks the model to go on from its last character, repeating the response's
+    last few characters first (see `CONTINUATION_PROMPT`); its answer is
+    stitched on (see `stitch`). A response that was not cut off
+    yields nothing.
+    """
+    if not is_truncated(text, finish_reason):
+        return
+    continuations = 0
+    while continuations < MAX_CONTINUATIONS:
+        continuations += 1
+        print(f"✂️ A response was cut off by the output token limit; requesting the rest "
+              f"({continuations}/{MAX_CONTINUATIONS}).")
+        continuation_prompt = CONTINUATION_PROMPT.format(prompt=prompt, partial=text, marker=resume_marker(text))
+        more, finish_reason = _complete(continuation_prompt, model_name,
+                                        generation_config, prefix, None, keys, continuation=continuations)
+        piece = stitch(text, more)
+        text += piece
+        yield piece
+        if not is_truncated(text, finish_reason):
+            break
+    continuation_stats.record(continuations, completed=json_state(text) != "partial")
+
+
+def stream_content(prompt: str, model_name: str = MODEL_NAME, generation_config: Optional[dict] = None,
+                   prefix: str = "", hedge: Optional[str] = None) -> Iterator[str]:
+    """
+    Like `generate_content`, but yields the response text in chunks as it arrives.
+
+    A cached response is yielded as a single chunk. Rate-limit and transient
+    errors are retried until the first chunk arrives; an error after that
+    point is raised to the caller, since part of the response was consumed.
+    Hedging, when requested, races requests up to their first chunk. If the
+    response is cut off by the output token limit, the rest is requested
+    without streaming and yielded as one more chunk per continuation.
+
+    Args:
+        prompt: The prompt to send, or the part of it that follows `prefix`.
+        model_name: The model to use.
+        generation_config: Optional generation settings passed to the model.
+        prefix: Optional static start of the prompt, as in `generate_content`.
+        hedge: Optional call class for hedging, as in `generate_content`.
+
+    Yields:
+        Successive pieces of the model's response text.
+    """
+    provider = get_provider()
+    cache = get_response_cache()
+    qualified_name = f"{provider.name}:{model_name}"
+    key = cache.make_key(qualified_name, prefix + prompt, generation_config)
+    # The span is not made current: the caller's code runs between our yields.
+    span = get_telemetry().open_span("model_call", model=qualified_name, streamed=True)
+    outcome = "GeneratorExit"
+    finish = {"reason": None}
+    try:
+        cached = cache.get(key)
+        span.set("response_cache", "hit" if cached is not None else "miss")
+        if cached is not None:
+            outcome = "ok"
+            # Recorded before it is yielded, so a caller that fails to parse it can evict it.
+            _response_keys.record(cached, [key])
+            yield cached
+            text = cached
+        else:
+            if cache.replay_only:
+                raise CacheMissError(
+                    f"No cached response for this prompt (key {key[:12]}) and the cache is in replay mode.")
+
+            limiter = get_rate_limiter()
+            timer = _CallTimer(span, estimate_tokens(prefix + prompt))
+
+            def request(cancel: threading.Event) -> tuple:
+                text_to_send, cached_prefix = _prepare_prompt(provider, prompt, prefix, model_name)
+
+                def open_stream() -> tuple:
+                    _check_cancelled(cancel)
+                    chunks = iter(provider.stream(text_to_send, model_name, generation_config,
+                                                  cached_prefix=cached_prefix))
+                    return next(chunks, ""), chunks
+
+                opened = limiter.call(timer.wrap(open_stream), prompt_tokens=estimate_tokens(prefix + prompt))
+                return opened, timer.started()
+
+            (first, chunks), started = _send(request, hedge, discard=lambda late: _close(late[0][1]))
+            timer.first_token(started)
+
+            def rest() -> Iterator[str]:
+                # The provider's stream returns its finish reason once it is exhausted.
+                finish["reason"] = yield from chunks
+
+            # The text is kept to cache it and, if it was cut off, to ask for the rest.
+            parts = []
+            for chunk in itertools.chain([first], rest()):
+                parts.append(chunk)
+                yield chunk
+            text = "".join(parts)
+            timer.done(started, max(1, len(text) // 4))
+            limiter.charge(max(1, len(text) // 4))
+            if finish["reason"]:
+                span.set("finish_reason", finish["reason"])
+
+            cache.put(key, qualified_name, text)
+            outcome = "ok"
+    except Exception as e:
+        outcome = type(e).__name__
+        raise
+    finally:
+        span.finish(outcome)
+    keys = [key]
+    for piece in _continue(prompt, text, finish["reason"], model_name, generation_config, prefix, keys):
+        text += piece
+        yield piece
+    _response_keys.record(text, keys)
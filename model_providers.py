@@ -0,0 +1,594 @@
+import datetime
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from functools import partial
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+from env_config import check_env, env_choice, env_float, env_int
+from rate_limiter import estimate_tokens
+
+# Gemini only caches contexts above a minimum size; shorter prefixes are sent inline.
+GEMINI_CACHE_MIN_TOKENS = env_int("GEMINI_CACHE_MIN_TOKENS", 4096)
+GEMINI_CACHE_TTL_MINUTES = env_float("GEMINI_CACHE_TTL_MINUTES", 60.0)
+# The finish reason of a response that was cut off by the output token limit.
+FINISH_MAX_TOKENS = "MAX_TOKENS"
+
+
+class Completion(NamedTuple):
+    """A response's text and why the model stopped ("STOP", `FINISH_MAX_TOKENS`, ...; None if unknown)."""
+
+    text: str
+    finish_reason: Optional[str] = None
+
+
+class ModelProvider:
+    """
+    The interface every model backend implements.
+
+    A provider turns a prompt into response text. Agents never talk to a
+    provider directly; they go through `model_client.generate_content`, which
+    adds caching and rate limiting on top of whichever provider is selected.
+    """
+
+    name = "base"
+
+    def initialize(self) -> None:
+        """Prepares the provider (credentials, clients). Raises ValueError if it cannot run."""
+
+    def cache_prefix(self, prefix: str, model_name: str) -> bool:
+        """
+        Makes `prefix` available as cached context for `model_name`, if the provider can.
+
+        Returns:
+            True if calls may pass `prefix` as `cached_prefix` and send only the
+            rest of the prompt. The default provider cannot cache anything.
+        """
+        return False
+
+    def generate(self, prompt: str, model_name: str, generation_config: Optional[dict] = None,
+                 cached_prefix: Optional[str] = None) -> str:
+        """
+        Returns the response to `prompt`, which follows `cached_prefix` when one is given.
+        """
+        raise NotImplementedError
+
+    def complete(self, prompt: str, model_name: str, generation_config: Optional[dict] = None,
+                 cached_prefix: Optional[str] = None) -> Completion:
+        """
+        Like `generate`, but also returns why the model stopped, if the provider can tell.
+        """
+        return Completion(self.generate(prompt, model_name, generation_config, cached_prefix=cached_prefix))
+
+    def stream(self, prompt: str, model_name: str, generation_config: Optional[dict] = None,
+               cached_prefix: Optional[str] = None) -> Iterator[str]:
+        """
+        Yields the response text in chunks as it is produced. Defaults to one chunk.
+
+        The generator returns the response's finish reason (see `Completion`), or None if unknown.
+        """
+        completion = self.complete(prompt, model_name, generation_config, cached_prefix=cached_prefix)
+        yield completion.text
+        return completion.finish_reason
+
+
+class GeminiProvider(ModelProvider):
+    """
+    Calls Google's Gemini API through the `google-generativeai` SDK.
+
+    The SDK (and its grpc/protobuf dependencies) is only imported when the
+    provider is first used, so importing the pipeline or running `--help`
+    stays fast. The client is configured once per process, and one
+    `GenerativeModel` per model name is reused by every call, so all agents
+    share the same underlying connection.
+
+    Prompt prefixes of at least `GEMINI_CACHE_MIN_TOKENS` tokens are stored as
+    `CachedContent` (kept for `GEMINI_CACHE_TTL_MINUTES`) and reused by every
+    call that starts with them. Shorter prefixes are sent inline, where
+    Gemini's implicit caching of repeated prompt prefixes still applies.
+    """
+
+    name = "gemini"
+
+    def __init__(self):
+        self._genai = None
+        self._models = {}
+        self._prefix_models = {}
+        self._lock = threading.Lock()
+        self._prefix_lock = threading.Lock()
+
+    def initialize(self) -> None:
+        """Loads API key and configures the Gemini client (once per process)."""
+        with self._lock:
+            if self._genai is not None:
+                return
+            import google.generativeai as genai
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise ValueError("GEMINI_API_KEY not found. Please check your .env file.")
+            genai.configure(api_key=api_key)
+            self._genai = genai
+        print("Gemini API initialized successfully.")
+
+    def model(self, model_name: str):
+        """Returns the shared `GenerativeModel` for `model_name`, creating it on first use."""
+        self.initialize()
+        with self._lock:
+            if model_name not in self._models:
+                self._models[model_name] = self._genai.GenerativeModel(model_name)
+            return self._models[model_name]
+
+    def cache_prefix(self, prefix: str, model_name: str) -> bool:
+        key = (model_name, hashlib.sha256(prefix.encode("utf-8")).hexdigest())
+        # Held while creating, so concurrent calls create each cache only once.
+        with self._prefix_lock:
+            if key not in self._prefix_models:
+                self._prefix_models[key] = self._create_prefix_model(prefix, model_name)
+            return self._prefix_models[key] is not None
+
+    def _create_prefix_model(self, prefix: str, model_name: str):
+        if estimate_tokens(prefix) < GEMINI_CACHE_MIN_TOKENS:
+            return None
+        self.initialize()
+        try:
+            from google.generativeai import caching
+
+            cached_content = caching.CachedContent.create(
+                model=model_name,
+                contents=[prefix],
+                ttl=datetime.timedelta(minutes=GEMINI_CACHE_TTL_MINUTES),
+            )
+            return self._genai.GenerativeModel.from_cached_content(cached_content=cached_content)
+        except Exception as e:
+            print(f"⚠️ Could not cache the prompt prefix ({e}); it will be sent with every request.")
+            return None
+
+    def _model_for(self, model_name: str, cached_prefix: Optional[str]):
+        if cached_prefix is None:
+            return self.model(model_name)
+        return self._prefix_models[model_name, hashlib.sha256(cached_prefix.encode("utf-8")).hexdigest()]
+
+    def generate(self, prompt: str, model_name: str, generation_config: Optional[dict] = None,
+                 cached_prefix: Optional[str] = None) -> str:
+        return self.complete(prompt, model_name, generation_config, cached_prefix=cached_prefix).text
+
+    def complete(self, prompt: str, model_name: str, generation_config: Optional[dict] = None,
+                 cached_prefix: Optional[str] = None) -> Completion:
+        model = self._model_for(model_name, cached_prefix)
+        response = model.generate_content(prompt, generation_config=generation_config)
+        return Completion(response.text, _finish_reason(response))
+
+    def stream(self, prompt: str, model_name: str, generation_config: Optional[dict] = None,
+               cached_prefix: Optional[str] = None) -> Iterator[str]:
+        model = self._model_for(model_name, cached_prefix)
+        response = model.generate_content(prompt, generation_config=generation_config, stream=True)
+        finish_reason = None
+        for chunk in response:
+            # Only the last chunk says why the model stopped.
+            finish_reason = _finish_reason(chunk) or finish_reason
+            yield chunk.text
+        return finish_reason
+
+
+def _finish_reason(response) -> Optional[str]:
+    """Returns the name of the first candidate's finish reason in a Gemini response, if it has one."""
+    candidates = getattr(response, "candidates", None)
+    reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+    if not reason:
+        return None
+    return getattr(reason, "name", str(reason))
+
+
+class StubError(RuntimeError):
+    """A simulated API error raised by the stub provider."""
+
+    def __init__(self, message: str, code: int):
+        super().__init__(message)
+        self.code = code
+
+
+class StubProvider(ModelProvider):
+    """
+    A deterministic, offline provider for local runs, CI and benchmarks.
+
+    The stub recognizes which agent sent a prompt and answers with templated
+    JSON in that agent's format, or with canned responses loaded from a JSON
+    file mapping "coordinator"/"frontend"/"backend" to response text (`{task}`
+    in a canned response is replaced with the task description).
+
+    Latency (the time to the first token) follows a log-normal distribution
+    around `latency_ms`; when streaming, the response is then delivered in
+    `chunk_chars`-sized chunks every `chunk_delay_ms`. Calls fail with
+    simulated rate-limit (429) or transient (503) errors at the given rates.
+    With `invalid_rate`, that share of frontend/backend answers contains code
+    that fails validation (a missing CSS class, an import above the package),
+    unless the prompt reports earlier validation errors. With
+    `plan_dependencies`, plans declare that every endpoint builds on the
+    first one and every view on its endpoint. Backend prompts of
+    the "performance" profile get an async, paginated SQLAlchemy resource
+    router instead of a plain endpoint. A prompt that offers the answer to the
+    very same task as a reference is answered by reusing it. With
+    `max_output_chars`, longer answers are cut off there with a
+    `FINISH_MAX_TOKENS` finish reason, and a continuation request gets the
+    next piece, starting with the end of the answer it already sent, as the
+    continuation prompt asks. All randomness is seeded from `seed`, the prompt and how many times
+    that prompt was seen, so a run is reproducible regardless of thread timing.
+
+    Prompt prefix caching is emulated: `cache_prefix` stores the prefix, and a
+    call naming a cached prefix that was never stored fails like an expired
+    cache would. Set `prefix_cache=False` (`STUB_PREFIX_CACHE=0`) to disable it.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        latency_sigma: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        seed: int = 0,
+        plan_size: int = 3,
+        padding_lines: int = 0,
+        responses_file: Optional[Path] = None,
+        chunk_chars: int = 64,
+        chunk_delay_ms: float = 0.0,
+        prefix_cache: bool = True,
+        invalid_rate: float = 0.0,
+        plan_dependencies: bool = False,
+        max_output_chars: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.seed = seed
+        self.plan_size = plan_size
+        self.padding_lines = padding_lines
+        self.chunk_chars = max(1, chunk_chars)
+        self.chunk_delay_ms = chunk_delay_ms
+        self.prefix_cache = prefix_cache
+        self.invalid_rate = invalid_rate
+        self.plan_dependencies = plan_dependencies
+        self.max_output_chars = max_output_chars
+        self.cached_prefixes = {}
+        self._full_answers = {}
+        self.canned = {}
+        if responses_file:
+            self.canned = json.loads(Path(responses_file).read_text(encoding="utf-8"))
+        self.calls = 0
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "StubProvider":
+        """
+        Builds a stub provider from the STUB_* environment variables.
+
+        Raises:
+            EnvConfigError: If a numeric setting is not a valid number.
+        """
+        provider = cls(
+            latency_ms=env_float("STUB_LATENCY_MS", 0.0),
+            latency_sigma=env_float("STUB_LATENCY_SIGMA", 0.0),
+            error_rate=env_float("STUB_ERROR_RATE", 0.0),
+            rate_limit_rate=env_float("STUB_RATE_LIMIT_RATE", 0.0),
+            seed=env_int("STUB_SEED", 0),
+            plan_size=env_int("STUB_PLAN_SIZE", 3),
+            padding_lines=env_int("STUB_PADDING_LINES", 0),
+            responses_file=os.getenv("STUB_RESPONSES_FILE") or None,
+            chunk_chars=env_int("STUB_CHUNK_CHARS", 64),
+            chunk_delay_ms=env_float("STUB_CHUNK_DELAY_MS", 0.0),
+            prefix_cache=os.getenv("STUB_PREFIX_CACHE", "1") != "0",
+            invalid_rate=env_float("STUB_INVALID_RATE", 0.0),
+            plan_dependencies=os.getenv("STUB_PLAN_DEPENDENCIES", "0") != "0",
+            max_output_chars=env_int("STUB_MAX_OUTPUT_CHARS", 0),
+        )
+        check_env()
+        return provider
+
+    def _rng(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        with self._lock:
+            self.calls += 1
+            attempt = self._seen.get(digest, 0)
+            self._seen[digest] = attempt + 1
+        return random.Random(f"{self.seed}:{digest}:{attempt}")
+
+    def cache_prefix(self, prefix: str, model_name: str) -> bool:
+        if not self.prefix_cache:
+            return False
+        with self._lock:
+            self.cached_prefixes.setdefault((model_name, _short_hash(prefix)), prefix)
+        return True
+
+    def _full_prompt(self, prompt: str, model_name: str, cached_prefix: Optional[str]) -> str:
+        if cached_prefix is None:
+            return prompt
+        with self._lock:
+            stored = self.cached_prefixes.get((model_name, _short_hash(cached_prefix)))
+        if stored is None:
+            raise StubError("400 Cached content not found (simulated).", code=400)
+        return stored + prompt
+
+    def generate(self, prompt: str, model_name: str, generation_config: Optional[dict] = None,
+                 cached_prefix: Optional[str] = None) -> str:
+        return self.complete(prompt, model_name, generation_config, cached_prefix=cached_prefix).text
+
+    def complete(self, prompt: str, model_name: str, generation_config: Optional[dict] = None,
+                 cached_prefix: Optional[str] = None) -> Completion:
+        completion = self._limit(self._full_prompt(prompt, model_name, cached_prefix))
+        if self.chunk_delay_ms > 0:
+            # A non-streaming call waits for the whole response to be produced.
+            time.sleep(self._chunk_count(completion.text) * self.chunk_delay_ms / 1000.0)
+        return completion
+
+    def stream(self, prompt: str, model_name: str, generation_config: Optional[dict] = None,
+               cached_prefix: Optional[str] = None) -> Iterator[str]:
+        text, finish_reason = self._limit(self._full_prompt(prompt, model_name, cached_prefix))
+        for start in range(0, len(text), self.chunk_chars):
+            if self.chunk_delay_ms > 0:
+                time.sleep(self.chunk_delay_ms / 1000.0)
+            yield text[start:start + self.chunk_chars]
+        return finish_reason
+
+    def _limit(self, prompt: str) -> Completion:
+        """Answers `prompt`, cut off at `max_output_chars` like a model that hit its output token limit."""
+        text = self._respond(prompt)
+        if not self.max_output_chars or len(text) <= self.max_output_chars:
+            return Completion(text, "STOP")
+        if _continued(prompt) is None:
+            with self._lock:
+                self._full_answers[_short_hash(prompt)] = text
+        return Completion(text[:self.max_output_chars], FINISH_MAX_TOKENS)
+
+    def _continuation(self, prompt: str) -> Optional[str]:
+        """Returns the next piece of an answer that was cut off, if `prompt` asks to continue one."""
+        continued = _continued(prompt)
+        if continued is None:
+            return None
+        original, partial, marker = continued
+        with self._lock:
+            full = self._full_answers.get(_short_hash(original))
+        if full is None or not full.startswith(partial):
+            raise StubError("400 Unknown response to continue (simulated).", code=400)
+        return marker + full[len(partial):]
+
+    def _chunk_count(self, text: str) -> int:
+        return math.ceil(len(text) / self.chunk_chars)
+
+    def _respond(self, prompt: str) -> str:
+        rng = self._rng(prompt)
+        if self.latency_ms > 0:
+            # Log-normal latency with the configured median.
+            time.sleep(self.latency_ms * math.exp(rng.gauss(0, self.latency_sigma)) / 1000.0)
+        roll = rng.random()
+        if roll < self.rate_limit_rate:
+            raise StubError("429 Resource has been exhausted (simulated).", code=429)
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise StubError("503 The service is currently unavailable (simulated).", code=503)
+
+        continuation = self._continuation(prompt)
+        if continuation is not None:
+            return continuation
+        kind = detect_agent(prompt)
+        task = extract_task(prompt)
+        broken = self.invalid_rate > 0 and rng.random() < self.invalid_rate and "failed validation" not in prompt
+        if kind in self.canned:
+            return self.canned[kind].replace("{task}", task)
+        if kind in ("frontend", "backend") and task.startswith("["):
+            # A batched prompt: answer with one object per task, in order.
+            respond = self._component if kind == "frontend" else partial(self._router, prompt=prompt)
+            data = [respond(item, broken) for item in json.loads(task)]
+        elif kind in ("frontend", "backend") and _reference_task(prompt) == task:
+            data = {"reuse_reference": True}
+        elif kind == "coordinator":
+            data = self._plan(task)
+        elif kind == "frontend":
+            data = self._component(task, broken)
+        elif kind == "backend":
+            data = self._router(task, broken, prompt)
+        else:
+            data = {"text": task}
+        return "```json\n" + json.dumps(data, indent=2) + "\n```"
+
+    def _plan(self, brief: str) -> dict:
+        topic = [word for word in _words(brief) if len(word) > 3][:3] or ["item"]
+        subject = " ".join(topic)
+        plan = {
+            "frontend_tasks": [
+                f"Create a '{_pascal(topic)}View{i}' component that displays part {i} of the {subject} UI."
+                for i in range(1, self.plan_size + 1)
+            ],
+            "backend_tasks": [
+                f"Create a REST API endpoint: `GET /api/{_snake(topic)}/{i}` that returns part {i} of the {subject} data."
+                for i in range(1, self.plan_size + 1)
+            ],
+        }
+        if self.plan_dependencies:
+            # Every endpoint builds on the first one, and every view calls its endpoint.
+            plan["dependencies"] = {f"F{i}": [f"B{i}"] for i in range(1, self.plan_size + 1)}
+            plan["dependencies"].update({f"B{i}": ["B1"] for i in range(2, self.plan_size + 1)})
+        return plan
+
+    def _component(self, task: str, broken: bool = False) -> dict:
+        quoted = re.search(r"'([A-Z][A-Za-z0-9]+)'", task)
+        name = quoted.group(1) if quoted else _pascal(_words(task)[:3]) + _short_hash(task)
+        padding = "".join(f"// {task} ({i})\n" for i in range(self.padding_lines))
+        tsx = (
+            "import React from 'react';\n"
+            f"import styles from './{name}.module.css';\n\n"
+            f"{padding}"
+            "interface Props {}\n\n"
+            f"export const {name}: React.FC<Props> = () => {{\n"
+            f"  return <div className={{styles.{'missing' if broken else 'container'}}}>{{{json.dumps(task)}}}</div>;\n"
+            "};\n\n"
+            f"export default {name};\n"
+        )
+        css = ".container {\n  padding: 1rem;\n}\n"
+        return {"component_name": name, "tsx_code": tsx, "css_code": css}
+
+    def _router(self, task: str, broken: bool = False, prompt: str = "") -> dict:
+        slug = _snake(_words(task)[2:5] or ["task"]) + "_" + _short_hash(task)
+        padding = "".join(f"# {task} ({i})\n" for i in range(self.padding_lines))
+        if "from database import Base, get_session" in prompt:
+            code = _resource_router(slug, task, padding, broken)
+            return {"filename": f"{slug}_routes.py", "python_code": code}
+        code = (
+            "from fastapi import APIRouter\n"
+            f"{'from .. import schemas' + chr(10) if broken else ''}\n"
+            f"{padding}"
+            "router = APIRouter()\n\n\n"
+            f"@router.get({json.dumps('/' + slug)})\n"
+            f"def get_{slug}() -> dict:\n"
+            f"    \"\"\"{task.replace(chr(34), chr(39))}\"\"\"\n"
+            f"    return {{\"task\": {json.dumps(task)}}}\n"
+        )
+        return {"filename": f"{slug}_routes.py", "python_code": code}
+
+
+def _resource_router(slug: str, task: str, padding: str, broken: bool) -> str:
+    """Returns the code of an async CRUD router for one indexed table, as the performance profile asks for."""
+    model = _pascal(slug.split("_"))
+    doc = task.replace(chr(34), chr(39))
+    return (
+        "from fastapi import APIRouter, Depends, HTTPException, Query, status\n"
+        "from pydantic import BaseModel, ConfigDict\n"
+        "from sqlalchemy import insert, select\n"
+        "from sqlalchemy.ext.asyncio import AsyncSession\n"
+        "from sqlalchemy.orm import Mapped, mapped_column\n\n"
+        "from database import Base, get_session\n"
+        f"{'from .. import schemas' + chr(10) if broken else ''}\n"
+        f"{padding}"
+        f"router = APIRouter(prefix={json.dumps('/' + slug)})\n\n\n"
+        f"class {model}(Base):\n"
+        f"    \"\"\"{doc}\"\"\"\n\n"
+        f"    __tablename__ = {json.dumps(slug)}\n\n"
+        "    id: Mapped[int] = mapped_column(primary_key=True)\n"
+        "    name: Mapped[str] = mapped_column(index=True)\n"
+        "    done: Mapped[bool] = mapped_column(default=False, index=True)\n\n\n"
+        f"class {model}Create(BaseModel):\n"
+        "    name: str\n"
+        "    done: bool = False\n\n\n"
+        f"class {model}Read({model}Create):\n"
+        "    model_config = ConfigDict(from_attributes=True)\n\n"
+        "    id: int\n\n\n"
+        f"@router.get(\"\", response_model=list[{model}Read])\n"
+        f"async def list_{slug}(\n"
+        "    limit: int = Query(50, ge=1, le=500),\n"
+        "    offset: int = Query(0, ge=0),\n"
+        "    session: AsyncSession = Depends(get_session),\n"
+        f") -> list:\n"
+        "    \"\"\"Returns one page of rows, oldest first.\"\"\"\n"
+        f"    rows = await session.scalars(select({model}).order_by({model}.id).limit(limit).offset(offset))\n"
+        "    return list(rows)\n\n\n"
+        f"@router.get(\"/{{item_id}}\", response_model={model}Read)\n"
+        f"async def get_{slug}(item_id: int, session: AsyncSession = Depends(get_session)) -> {model}:\n"
+        "    \"\"\"Returns one row by id.\"\"\"\n"
+        f"    row = await session.get({model}, item_id)\n"
+        "    if row is None:\n"
+        "        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=\"Not found\")\n"
+        "    return row\n\n\n"
+        f"@router.post(\"\", response_model={model}Read, status_code=status.HTTP_201_CREATED)\n"
+        f"async def create_{slug}(item: {model}Create, session: AsyncSession = Depends(get_session)) -> {model}:\n"
+        "    \"\"\"Creates one row.\"\"\"\n"
+        f"    row = {model}(**item.model_dump())\n"
+        "    session.add(row)\n"
+        "    await session.commit()\n"
+        "    return row\n\n\n"
+        "@router.post(\"/bulk\", status_code=status.HTTP_201_CREATED)\n"
+        f"async def create_{slug}_bulk(items: list[{model}Create], session: AsyncSession = Depends(get_session)) -> dict:\n"
+        "    \"\"\"Creates many rows with a single INSERT statement.\"\"\"\n"
+        "    if items:\n"
+        f"        await session.execute(insert({model}), [item.model_dump() for item in items])\n"
+        "        await session.commit()\n"
+        "    return {\"inserted\": len(items)}\n"
+    )
+
+
+def detect_agent(prompt: str) -> str:
+    """Tells which agent a prompt came from by its role line."""
+    if "AI Product Manager" in prompt:
+        return "coordinator"
+    if "Frontend Developer" in prompt:
+        return "frontend"
+    if "Backend Developer" in prompt:
+        return "backend"
+    return "unknown"
+
+
+def extract_task(prompt: str) -> str:
+    """Returns the text between the first pair of `---` separators, or the whole prompt."""
+    parts = prompt.split("---")
+    return parts[1].strip() if len(parts) >= 3 else prompt.strip()
+
+
+def _continued(prompt: str) -> Optional[tuple]:
+    """
+    Returns `(original_prompt, partial_answer, resume_marker)` for a continuation prompt (see `model_client`), or None.
+    """
+    found = re.match(r"(.*)\n\n {4}Your previous response to this prompt was cut off.*?<partial_response>\n(.*)\n"
+                     r"</partial_response>.*?<resume_from>\n(.*)\n</resume_from>", prompt, re.S)
+    return found.groups() if found else None
+
+
+def _reference_task(prompt: str) -> Optional[str]:
+    """Returns the task of the earlier answer a prompt offers for reuse, if any."""
+    found = re.search(r"^\s*Task: (.*)$", prompt, re.M) if '{"reuse_reference": true}' in prompt else None
+    return found.group(1).strip() if found else None
+
+
+def _words(text: str) -> list:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _pascal(words: list) -> str:
+    return "".join(word.capitalize() for word in words) or "Component"
+
+
+def _snake(words: list) -> str:
+    return "_".join(words)
+
+
+def _short_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:6]
+
+
+PROVIDERS = {
+    "gemini": GeminiProvider,
+    "stub": StubProvider.from_env,
+}
+DEFAULT_PROVIDER = env_choice("MODEL_PROVIDER", "gemini", PROVIDERS)
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def configure_provider(provider) -> ModelProvider:
+    """Selects the process-wide provider, either by name or as an instance."""
+    global _provider
+    if isinstance(provider, str):
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unknown model provider '{provider}'. Expected one of: {', '.join(PROVIDERS)}.")
+        provider = PROVIDERS[provider]()
+    with _provider_lock:
+        _provider = provider
+    return provider
+
+
+def get_provider() -> ModelProvider:
+    """Returns the process-wide provider, chosen by MODEL_PROVIDER on first use."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = PROVIDERS[DEFAULT_PROVIDER]()
+        return _provider
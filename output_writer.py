@@ -0,0 +1,226 @@
+import hashlib
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path, PurePosixPath
+from typing import Optional
+
+from stage_timer import get_stage_timer
+from telemetry import current_span
+
+_UNSAFE_CHARS = re.compile(r'[<>:"|?*\x00-\x1f]')
+# The most queued write jobs handled (and their directories created) in one pass.
+MAX_JOBS_PER_PASS = 64
+
+
+def safe_relative_path(name: str) -> PurePosixPath:
+    """
+    Turns a model-supplied file name into a safe path relative to the output directory.
+
+    Backslashes become separators, absolute prefixes and `.`/`..` segments are
+    dropped (so the path can never escape the output directory), and
+    characters that are invalid on common filesystems become underscores.
+
+    Raises:
+        ValueError: If nothing usable is left of the name.
+    """
+    parts = []
+    for part in str(name).replace("\\", "/").split("/"):
+        part = _UNSAFE_CHARS.sub("_", part).strip().strip(".")
+        if part:
+            parts.append(part)
+    if not parts:
+        raise ValueError(f"'{name}' is not a usable file name.")
+    return PurePosixPath(*parts)
+
+
+def safe_name(name: str) -> str:
+    """Like `safe_relative_path`, but for a single path segment such as a component name."""
+    return "_".join(safe_relative_path(name).parts)
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class OutputWriter:
+    """
+    Writes generated files on a background thread, atomically and only when they change.
+
+    Workers hand over whole tasks' files with `write` and carry on generating;
+    the returned future completes once every file is on disk. Each file is
+    written to a temporary file beside the target and moved into place with
+    `os.replace`, so a crash never leaves half-written code, and a file whose
+    content hash matches what is already on disk is not touched at all, so
+    downstream watchers do not rebuild needlessly. The writer thread takes all
+    queued jobs at once and creates their directories in a single pass.
+
+    `claim` keeps two tasks from writing to the same path in one run.
+    """
+
+    def __init__(self):
+        self.written = 0
+        self.unchanged = 0
+        self._queue = queue.Queue()
+        self._hashes = {}
+        self._created_dirs = set()
+        self._claims = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def claim(self, path: Path, owner: Optional[str]) -> Path:
+        """
+        Reserves `path` for `owner` and returns the path it should actually use.
+
+        If another owner already holds the path (compared case-insensitively,
+        since case-insensitive filesystems would merge them), a numbered
+        variant such as `tasks_2.py` is claimed instead. The same owner always
+        gets the same path back. Without an owner, `path` is returned as is.
+        """
+        if owner is None:
+            return path
+        with self._lock:
+            candidate = path
+            number = 2
+            while True:
+                key = os.path.normcase(os.path.abspath(candidate)).casefold()
+                holder = self._claims.setdefault(key, owner)
+                if holder == owner:
+                    if candidate != path:
+                        print(f"⚠️ '{path.name}' is already used by another task; writing '{candidate.name}' instead.")
+                    return candidate
+                candidate = path.with_name(f"{path.stem}_{number}{path.suffix}")
+                number += 1
+
+    def write(self, files: dict) -> Future:
+        """
+        Queues `{path: text}` for writing and returns a future that completes when all are written.
+
+        The time spent writing the files is added to the caller's current span as `write_s`.
+        """
+        future = Future()
+        self._ensure_started()
+        self._queue.put((future, {Path(path): text for path, text in files.items()}, current_span()))
+        return future
+
+    def replace(self, temp_path: Path, path: Path) -> bool:
+        """
+        Moves a finished temporary file (e.g. a streamed `.part` file) into place, synchronously.
+
+        If the target already has the same content, the temporary file is
+        deleted instead and the target is left untouched.
+
+        Returns:
+            True if the target was replaced.
+        """
+        data = temp_path.read_bytes()
+        if self._matches(path, _digest(data)):
+            temp_path.unlink()
+            with self._lock:
+                self.unchanged += 1
+            return False
+        os.replace(temp_path, path)
+        with self._lock:
+            self._hashes[path] = _digest(data)
+            self.written += 1
+        return True
+
+    def flush(self) -> None:
+        """Blocks until every queued file has been written."""
+        self._queue.join()
+
+    def report(self) -> str:
+        return f"Output writer: {self.written} file(s) written, {self.unchanged} unchanged file(s) left untouched."
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="output-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            jobs = [self._queue.get()]
+            while len(jobs) < MAX_JOBS_PER_PASS:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            start = time.perf_counter()
+            try:
+                self._make_dirs(path.parent for _, files, _ in jobs for path in files)
+                for future, files, span in jobs:
+                    job_start = time.perf_counter()
+                    try:
+                        for path, text in files.items():
+                            self._write_file(path, text)
+                    except Exception as e:
+                        future.set_exception(e)
+                    else:
+                        future.set_result(list(files))
+                    finally:
+                        if span is not None:
+                            span.add("write_s", time.perf_counter() - job_start)
+            except Exception as e:
+                for future, _, _ in jobs:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                get_stage_timer().record("writing", time.perf_counter() - start)
+                for _ in jobs:
+                    self._queue.task_done()
+
+    def _make_dirs(self, directories) -> None:
+        for directory in set(directories) - self._created_dirs:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(directory)
+
+    def _matches(self, path: Path, digest: str) -> bool:
+        if not path.exists():
+            return False
+        # `replace` runs on the worker threads, alongside the writer thread.
+        with self._lock:
+            known = self._hashes.get(path)
+        if known is None:
+            known = _digest(path.read_bytes())
+        return known == digest
+
+    def _write_file(self, path: Path, text: str) -> None:
+        data = text.encode("utf-8")
+        digest = _digest(data)
+        if self._matches(path, digest):
+            with self._lock:
+                self._hashes[path] = digest
+                self.unchanged += 1
+            return
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            try:
+                temp_path.write_bytes(data)
+            except FileNotFoundError:
+                # The directory was removed since it was created (e.g. by pruning).
+                path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path.write_bytes(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        with self._lock:
+            self._hashes[path] = digest
+            self.written += 1
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_output_writer() -> OutputWriter:
+    """Returns the process-wide output writer, creating it on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = OutputWriter()
+        return _writer
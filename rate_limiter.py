@@ -0,0 +1,198 @@
+import random
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+from env_config import env_float, env_int
+
+T = TypeVar("T")
+
+DEFAULT_RPM = env_float("GEMINI_RPM", 60.0)
+DEFAULT_TPM = env_float("GEMINI_TPM", 1000000.0)
+DEFAULT_MAX_RETRIES = env_int("GEMINI_MAX_RETRIES", 5)
+
+# gRPC/HTTP status codes and exception names that are worth retrying.
+RATE_LIMIT_CODES = {429}
+TRANSIENT_CODES = {500, 502, 503, 504}
+RATE_LIMIT_ERRORS = {"ResourceExhausted", "TooManyRequests"}
+TRANSIENT_ERRORS = {"ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "GatewayTimeout", "BadGateway"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimates the token count of a text (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def classify_error(error: Exception) -> Optional[str]:
+    """
+    Decides whether an API error should be retried.
+
+    Returns:
+        "rate_limit" for quota errors, "transient" for temporary server errors,
+        or None if the error should be raised straight away.
+    """
+    name = type(error).__name__
+    code = getattr(error, "code", None)
+    code = code() if callable(code) else code
+    code = getattr(code, "value", code)
+    if isinstance(code, tuple):
+        code = code[0]
+    if name in RATE_LIMIT_ERRORS or code in RATE_LIMIT_CODES or "429" in str(error):
+        return "rate_limit"
+    if name in TRANSIENT_ERRORS or code in TRANSIENT_CODES or isinstance(error, (TimeoutError, ConnectionError)):
+        return "transient"
+    return None
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket refilled continuously at `per_minute` tokens per minute.
+
+    A request larger than the bucket's capacity waits for a full bucket and then
+    drives the balance negative, so oversized requests still pay their way.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = 10.0):
+        self.per_minute = per_minute
+        self.capacity = max(1.0, per_minute * burst_seconds / 60.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float, factor: float) -> None:
+        rate = self.per_minute * factor / 60.0
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float, factor: float) -> float:
+        """Returns how long to wait before `amount` tokens can be taken (0 if available now)."""
+        self._refill(now, factor)
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / (self.per_minute * factor / 60.0)
+
+    def take(self, amount: float) -> None:
+        self.tokens -= amount
+
+
+class RateLimiter:
+    """
+    A shared limiter enforcing both a requests-per-minute and a tokens-per-minute budget.
+
+    The limiter adapts to the quota actually available: every rate-limit error
+    halves the allowed rate, and each successful call slowly restores it
+    (additive increase, multiplicative decrease).
+    """
+
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM, max_retries: int = DEFAULT_MAX_RETRIES):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.factor = 1.0
+        self.min_factor = 0.05
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.request_count = 0
+        self.token_count = 0
+        self.retry_count = 0
+        self.throttled_seconds = 0.0
+
+    def acquire(self, tokens: int) -> None:
+        """Blocks until one request carrying `tokens` tokens fits in both budgets."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                delay = max(
+                    self.requests.wait_time(1, now, self.factor),
+                    self.tokens.wait_time(tokens, now, self.factor),
+                )
+                if delay <= 0:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    self.request_count += 1
+                    self.token_count += tokens
+                    return
+                self.throttled_seconds += delay
+            time.sleep(delay)
+
+    def charge(self, tokens: int) -> None:
+        """Charges tokens that are only known after the call, e.g. the response."""
+        with self._lock:
+            self.tokens.take(tokens)
+            self.token_count += tokens
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.factor = min(1.0, self.factor + 0.05)
+
+    def record_rate_limited(self) -> None:
+        with self._lock:
+            self.factor = max(self.min_factor, self.factor / 2)
+
+    def call(self, fn: Callable[[], T], prompt_tokens: int) -> T:
+        """
+        Runs `fn` under the limiter, retrying rate-limit and transient errors.
+
+        Retries use exponential backoff with full jitter, capped at 60 seconds.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire(prompt_tokens)
+            try:
+                result = fn()
+            except Exception as e:
+                kind = classify_error(e)
+                if kind is None or attempt == self.max_retries:
+                    raise
+                if kind == "rate_limit":
+                    self.record_rate_limited()
+                with self._lock:
+                    self.retry_count += 1
+                delay = random.uniform(0, min(60.0, 2.0 ** attempt))
+                print(f"⚠️ {kind.replace('_', ' ').capitalize()} error ({e}); retrying in {delay:.1f}s "
+                      f"(attempt {attempt + 1}/{self.max_retries}).")
+                time.sleep(delay)
+            else:
+                self.record_success()
+                return result
+
+    def stats(self) -> dict:
+        """Returns the achieved request and token rates since the limiter was created."""
+        with self._lock:
+            minutes = max(time.monotonic() - self.started, 1e-9) / 60.0
+            return {
+                "requests": self.request_count,
+                "retries": self.retry_count,
+                "requests_per_minute": self.request_count / minutes,
+                "tokens_per_minute": self.token_count / minutes,
+                "throttled_seconds": self.throttled_seconds,
+                "rate_factor": self.factor,
+            }
+
+    def report(self) -> str:
+        stats = self.stats()
+        return (
+            f"Rate limiter: {stats['requests']} request(s), {stats['retries']} retry(ies), "
+            f"{stats['requests_per_minute']:.1f} req/min, {stats['tokens_per_minute']:.0f} tokens/min, "
+            f"{stats['throttled_seconds']:.1f}s throttled."
+        )
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def configure_rate_limiter(**kwargs) -> RateLimiter:
+    """Replaces the process-wide limiter, e.g. to apply command-line options."""
+    global _limiter
+    with _limiter_lock:
+        _limiter = RateLimiter(**kwargs)
+    return _limiter
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Returns the process-wide limiter, creating it from the environment on first use."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
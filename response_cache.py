@@ -0,0 +1,178 @@
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from env_config import env_choice, env_float
+
+# Cache modes:
+#   "on"     - serve hits from disk, call the API on a miss and store the result.
+#   "off"    - always call the API, never read or write the cache.
+#   "replay" - serve hits from disk and fail on a miss instead of calling the API.
+CACHE_MODES = ("on", "off", "replay")
+
+DEFAULT_CACHE_DIR = Path(os.getenv("RESPONSE_CACHE_DIR", ".cache"))
+DEFAULT_CACHE_MODE = env_choice("RESPONSE_CACHE", "on", CACHE_MODES)
+DEFAULT_MAX_MB = env_float("RESPONSE_CACHE_MAX_MB", 256.0)
+DEFAULT_MAX_AGE_DAYS = env_float("RESPONSE_CACHE_MAX_AGE_DAYS", 30.0)
+
+
+class CacheMissError(RuntimeError):
+    """Raised in replay mode when a response is not in the cache."""
+
+
+class ResponseCache:
+    """
+    A persistent, content-addressed cache of model responses.
+
+    Entries are stored in a SQLite database so several processes can share the
+    same cache directory safely; SQLite's own file locking serializes writers.
+    Entries older than `max_age_days` are dropped, and once the cache grows past
+    `max_mb` the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = DEFAULT_CACHE_DIR,
+        mode: str = DEFAULT_CACHE_MODE,
+        max_mb: float = DEFAULT_MAX_MB,
+        max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+    ):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}'. Expected one of: {', '.join(CACHE_MODES)}.")
+        self.mode = mode
+        self.path = Path(cache_dir) / "responses.sqlite3"
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_age_seconds = max_age_days * 24 * 60 * 60
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        if self.enabled:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with contextlib.closing(self._connect()) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS responses (
+                        key TEXT PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )
+                    """
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def replay_only(self) -> bool:
+        return self.mode == "replay"
+
+    def _connect(self) -> sqlite3.Connection:
+        # A short-lived connection per operation keeps the cache safe to use from
+        # worker threads; the timeout lets writers from other processes finish.
+        # Callers close it with `contextlib.closing`: a connection's own context
+        # manager only ends the transaction, and with autocommit there is none.
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str, settings: Optional[dict] = None) -> str:
+        """Returns the content hash identifying a model call."""
+        payload = json.dumps(
+            {"model": model_name, "prompt": prompt, "settings": settings or {}},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached response for `key`, or None on a miss."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with contextlib.closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.max_age_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        with self._stats_lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if row is None else row[0]
+
+    def put(self, key: str, model_name: str, value: str) -> None:
+        """Stores a response and evicts old or least recently used entries."""
+        if not self.enabled:
+            return
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, value, size, created, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model_name, value, size, now, now),
+                )
+                self._evict(conn, now)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, key: str) -> None:
+        """Removes a single entry, e.g. a response that turned out to be unusable."""
+        if not self.enabled:
+            return
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Walk entries from least to most recently used until we are under budget.
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def configure_response_cache(**kwargs) -> ResponseCache:
+    """Replaces the process-wide cache, e.g. to apply command-line options."""
+    global _cache
+    with _cache_lock:
+        _cache = ResponseCache(**kwargs)
+    return _cache
+
+
+def get_response_cache() -> ResponseCache:
+    """Returns the process-wide cache, creating it from the environment on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
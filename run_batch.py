@@ -0,0 +1,248 @@
+import argparse
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from artifact_index import get_artifact_index, reuse_report
+from brief_sections import PLAN_SECTION_CHARS
+from env_config import EnvConfigError, check_env
+from fair_scheduler import FairScheduler
+from json_extract import parse_report
+from main import DEFAULT_CONCURRENCY, OUTPUT_ROOT, VALIDATION_ROUNDS
+from main import add_generation_arguments, configure_run, generate_project, plan_project
+from model_client import continuation_report, continuation_stats, prompt_report
+from model_providers import configure_provider
+from output_writer import get_output_writer
+from task_dedup import DEDUPE_THRESHOLD
+from task_templates import template_report
+
+BRIEF_SUFFIXES = (".txt", ".md")
+
+
+def _project_name(name: str, taken: set) -> str:
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "-", name).strip("-") or "project"
+    unique = slug
+    suffix = 2
+    while unique in taken:
+        unique = f"{slug}-{suffix}"
+        suffix += 1
+    taken.add(unique)
+    return unique
+
+
+def load_briefs(source: Path) -> list:
+    """
+    Reads the project briefs to generate.
+
+    `source` is either a directory, where every `.txt` or `.md` file is one
+    brief named after the file, or a JSONL file with one brief per line: a JSON
+    object with a `brief` and an optional `name`, or a plain JSON string.
+    Names are made filesystem-safe and unique, since each one becomes a
+    project's output directory.
+
+    Returns:
+        A list of `(name, brief)` tuples, in input order.
+
+    Raises:
+        ValueError: If a line of the JSONL file is not a valid brief.
+    """
+    taken = set()
+    if source.is_dir():
+        files = sorted(path for path in source.iterdir() if path.suffix in BRIEF_SUFFIXES)
+        return [(_project_name(path.stem, taken), path.read_text(encoding="utf-8")) for path in files]
+
+    briefs = []
+    with open(source, encoding="utf-8") as handle:
+        for line_number, line in enumerate(handle, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{source}:{line_number}: invalid JSON ({e}).") from e
+            if isinstance(entry, str):
+                entry = {"brief": entry}
+            if not isinstance(entry, dict) or not isinstance(entry.get("brief"), str):
+                raise ValueError(f"{source}:{line_number}: expected a string or an object with a 'brief' string.")
+            name = str(entry.get("name") or f"project-{len(briefs) + 1}")
+            briefs.append((_project_name(name, taken), entry["brief"]))
+    return briefs
+
+
+def run_project(name: str, brief: str, output_root: Path, scheduler: FairScheduler, stream: bool = False,
+                batch_size: int = 1, incremental: bool = True, section_chars: int = PLAN_SECTION_CHARS,
+                validation_rounds: Optional[int] = VALIDATION_ROUNDS,
+                dedupe_threshold: Optional[float] = DEDUPE_THRESHOLD) -> dict:
+    """
+    Plans and generates one project, running all of its model calls on the shared scheduler.
+
+    `section_chars`, `validation_rounds` and `dedupe_threshold` are passed on
+    to `plan_project` and `generate_project`.
+
+    Returns:
+        A dict with the project's task counts, wall time and throughput.
+    """
+    executor = scheduler.executor_for(name)
+    start = time.perf_counter()
+    plan_data = plan_project(brief, section_chars=section_chars, concurrency=scheduler.concurrency,
+                             dedupe_threshold=dedupe_threshold, executor=executor)
+    results = {}
+    if plan_data is not None:
+        results = generate_project(plan_data, output_root=output_root, concurrency=scheduler.concurrency,
+                                   stream=stream, batch_size=batch_size, incremental=incremental, executor=executor,
+                                   validation_rounds=validation_rounds, dedupe_threshold=dedupe_threshold)
+    elapsed = time.perf_counter() - start
+
+    outcomes = [error is None for group in results.values() for _, _, error in group]
+    return {
+        "name": name,
+        "output_root": str(output_root),
+        "planned": plan_data is not None,
+        "tasks": len(outcomes),
+        "succeeded": sum(outcomes),
+        "failed": len(outcomes) - sum(outcomes),
+        "wall_time_s": elapsed,
+        "tasks_per_s": len(outcomes) / elapsed if elapsed else 0.0,
+    }
+
+
+def run_batch(briefs: list, output_dir: Path = OUTPUT_ROOT, concurrency: int = DEFAULT_CONCURRENCY,
+              stream: bool = False, batch_size: int = 1, incremental: bool = True,
+              section_chars: int = PLAN_SECTION_CHARS, validation_rounds: Optional[int] = VALIDATION_ROUNDS,
+              dedupe_threshold: Optional[float] = DEDUPE_THRESHOLD) -> dict:
+    """
+    Generates every project at once through one shared, fair worker pool.
+
+    Each project is driven by its own lightweight thread, but every
+    coordinator and agent call goes through a single `FairScheduler` with
+    `concurrency` workers, which serves the projects round-robin. Together with
+    the process-wide rate limiter, the whole batch shares one concurrency and
+    API budget, and no project waits for another to finish.
+
+    Args:
+        briefs: `(name, brief)` tuples, e.g. from `load_briefs`.
+        output_dir: Each project is written to `output_dir / name`.
+        concurrency: The maximum number of model calls in flight across all projects.
+        stream: Whether to stream generated code to disk while it is produced.
+        batch_size: The most tasks to pack into one agent call.
+        incremental: Whether to skip unchanged tasks using each project's build manifest.
+        section_chars: The longest brief planned in one call (see `main.plan_project`).
+        validation_rounds: How many times to regenerate tasks whose code fails
+            validation, or None to skip validation.
+        dedupe_threshold: The similarity above which tasks are merged, or None to keep every task.
+
+    Returns:
+        A dict with per-project results and aggregate totals.
+    """
+    start = time.perf_counter()
+    with FairScheduler(concurrency) as scheduler, ThreadPoolExecutor(max_workers=max(1, len(briefs))) as drivers:
+        futures = [
+            drivers.submit(run_project, name, brief, output_dir / name, scheduler,
+                           stream=stream, batch_size=batch_size, incremental=incremental,
+                           section_chars=section_chars, validation_rounds=validation_rounds,
+                           dedupe_threshold=dedupe_threshold)
+            for name, brief in briefs
+        ]
+        projects = []
+        for (name, _), future in zip(briefs, futures):
+            try:
+                projects.append(future.result())
+            except Exception as e:
+                print(f"❌ Error generating project '{name}': {e}")
+                projects.append({"name": name, "output_root": str(output_dir / name), "planned": False,
+                                 "tasks": 0, "succeeded": 0, "failed": 0, "wall_time_s": 0.0,
+                                 "tasks_per_s": 0.0, "error": str(e)})
+    elapsed = time.perf_counter() - start
+
+    tasks = sum(project["tasks"] for project in projects)
+    return {
+        "projects": projects,
+        "total": {
+            "projects": len(projects),
+            "planned": sum(project["planned"] for project in projects),
+            "tasks": tasks,
+            "succeeded": sum(project["succeeded"] for project in projects),
+            "failed": sum(project["failed"] for project in projects),
+            "wall_time_s": elapsed,
+            "tasks_per_s": tasks / elapsed if elapsed else 0.0,
+        },
+    }
+
+
+def print_batch_report(report: dict) -> None:
+    print(f"\n  {'project':<28}{'tasks':>7}{'failed':>8}{'wall s':>9}{'tasks/s':>9}")
+    for project in report["projects"]:
+        name = project["name"] if project["planned"] else f"{project['name']} (no plan)"
+        print(f"  {name[:28]:<28}{project['tasks']:>7}{project['failed']:>8}"
+              f"{project['wall_time_s']:>9.2f}{project['tasks_per_s']:>9.2f}")
+    total = report["total"]
+    print(f"  {'TOTAL':<28}{total['tasks']:>7}{total['failed']:>8}"
+          f"{total['wall_time_s']:>9.2f}{total['tasks_per_s']:>9.2f}")
+
+
+def parse_args(argv=None):
+    """Parses the command-line options for batch generation."""
+    parser = argparse.ArgumentParser(description="Generate many projects from a file or directory of briefs.")
+    parser.add_argument("source", type=Path,
+                        help="A JSONL file with one brief per line, or a directory of .txt/.md brief files.")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_ROOT,
+                        help="Each project is written to a subdirectory named after it (default: output).")
+    add_generation_arguments(parser)
+    parser.add_argument("--report", type=Path, help="Also write the throughput report as JSON to this file.")
+    args = parser.parse_args(argv)
+    try:
+        check_env()
+    except EnvConfigError as e:
+        parser.error(str(e))
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        briefs = load_briefs(args.source)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: Could not read briefs: {e}")
+        return
+    if not briefs:
+        print(f"No briefs found in {args.source}.")
+        return
+
+    cache, limiter, hedging = configure_run(args)
+    try:
+        configure_provider(args.provider).initialize()
+    except ValueError as e:
+        print(e)
+        return
+
+    print(f"--- 🚀 Generating {len(briefs)} project(s) with a shared concurrency limit of {max(1, args.concurrency)} ---")
+    report = run_batch(briefs, output_dir=args.output_dir, concurrency=args.concurrency, stream=args.stream,
+                       batch_size=args.batch_size, incremental=not args.rebuild,
+                       section_chars=args.plan_section_chars,
+                       validation_rounds=None if args.no_validate else max(0, args.validation_rounds),
+                       dedupe_threshold=None if args.no_dedupe else args.dedupe_threshold)
+
+    print_batch_report(report)
+    if cache.enabled:
+        print(f"\nResponse cache: {cache.hits} hit(s), {cache.misses} miss(es).")
+    print(limiter.report())
+    print(prompt_report())
+    if continuation_stats.truncated:
+        print(continuation_report())
+    print(template_report())
+    if get_artifact_index().enabled:
+        print(reuse_report())
+    if hedging.enabled:
+        print(hedging.report())
+    print(parse_report())
+    print(get_output_writer().report())
+    if args.report:
+        args.report.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\n✅ Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
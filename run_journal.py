@@ -0,0 +1,118 @@
+import json
+import os
+import secrets
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_JOURNAL_DIR = Path(os.getenv("RUN_JOURNAL_DIR", ".runs"))
+
+
+class RunJournal:
+    """
+    An append-only, crash-safe record of one pipeline run.
+
+    Every event is written as one JSON line and flushed to disk before the
+    pipeline moves on, so after a crash or an exhausted quota the journal still
+    holds the brief, the parsed plan and every task that finished. A torn last
+    line (from a crash mid-write) is ignored when the journal is read back.
+    """
+
+    def __init__(self, run_id: str, journal_dir: Path = DEFAULT_JOURNAL_DIR):
+        self.run_id = run_id
+        self.path = Path(journal_dir) / f"{run_id}.jsonl"
+        self.brief = None
+        self.options = {}
+        self.plan = None
+        self.completed = {}
+        self.finished = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, project_brief: str, options: Optional[dict] = None,
+               journal_dir: Path = DEFAULT_JOURNAL_DIR) -> "RunJournal":
+        """Starts the journal for a new run with a fresh run id."""
+        run_id = f"{datetime.now():%Y%m%d-%H%M%S}-{secrets.token_hex(3)}"
+        journal = cls(run_id, journal_dir)
+        journal.path.parent.mkdir(parents=True, exist_ok=True)
+        journal.brief = project_brief
+        journal.options = options or {}
+        journal._append({"type": "start", "brief": project_brief, "options": journal.options})
+        return journal
+
+    @classmethod
+    def open(cls, run_id: str, journal_dir: Path = DEFAULT_JOURNAL_DIR) -> "RunJournal":
+        """
+        Loads an existing run so it can be resumed.
+
+        Raises:
+            FileNotFoundError: If there is no journal for `run_id`.
+        """
+        journal = cls(run_id, journal_dir)
+        with open(journal.path, encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                journal._apply(event)
+        return journal
+
+    def _apply(self, event: dict) -> None:
+        kind = event.get("type")
+        if kind == "start":
+            self.brief = event["brief"]
+            self.options = event.get("options", {})
+        elif kind == "plan":
+            self.plan = event["plan"]
+        elif kind == "task":
+            self.completed[event["kind"], event["task"]] = event
+        elif kind == "task_invalid":
+            self.completed.pop((event["kind"], event["task"]), None)
+        elif kind == "finish":
+            self.finished = True
+
+    def _append(self, event: dict) -> None:
+        event = dict(event, time=time.time())
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(line)
+                handle.flush()
+                os.fsync(handle.fileno())
+            self._apply(event)
+
+    def record_plan(self, plan_data: dict) -> None:
+        self._append({"type": "plan", "plan": plan_data})
+
+    def record_task(self, kind: str, task: str, message: str, files: list) -> None:
+        """Records a task that finished successfully, with the files it wrote."""
+        self._append({
+            "type": "task",
+            "kind": kind,
+            "task": task,
+            "message": message,
+            "files": [str(path) for path in files],
+        })
+
+    def record_task_invalid(self, kind: str, task: str) -> None:
+        """Withdraws an earlier `record_task` whose files then failed validation."""
+        self._append({"type": "task_invalid", "kind": kind, "task": task})
+
+    def record_finish(self) -> None:
+        self._append({"type": "finish"})
+
+    def completed_tasks(self) -> dict:
+        """
+        Returns the finished tasks whose files are all still on disk.
+
+        Returns:
+            A dict mapping `(kind, task)` to the list of files the task wrote.
+        """
+        return {
+            key: [Path(name) for name in event["files"]]
+            for key, event in self.completed.items()
+            if all(Path(name).exists() for name in event["files"])
+        }
@@ -0,0 +1,76 @@
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+def percentile(values: list, pct: float) -> float:
+    """Returns the `pct` percentile (0-100) of `values` using nearest-rank."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class StageTimer:
+    """Collects wall-clock durations for named pipeline stages from any thread."""
+
+    def __init__(self):
+        self._samples = defaultdict(list)
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener) -> None:
+        """Registers `listener(name, seconds)`, called (on the recording thread) for every sample."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Times the enclosed block and records it under `name`, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[name].append(seconds)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(name, seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self) -> dict:
+        """Returns count, total, p50, p95 and p99 (in seconds) for every recorded stage."""
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+        return {
+            name: {
+                "count": len(values),
+                "total_s": sum(values),
+                "p50_s": percentile(values, 50),
+                "p95_s": percentile(values, 95),
+                "p99_s": percentile(values, 99),
+            }
+            for name, values in samples.items()
+        }
+
+
+_timer = StageTimer()
+
+
+def get_stage_timer() -> StageTimer:
+    """Returns the process-wide stage timer used by the pipeline."""
+    return _timer
+
+
+def stage(name: str):
+    """Shortcut for `get_stage_timer().stage(name)`."""
+    return _timer.stage(name)
@@ -0,0 +1,270 @@
+import json
+
+# Parser states.
+_SEEK_OBJECT = "seek_object"
+_EXPECT_KEY = "expect_key"
+_KEY = "key"
+_EXPECT_COLON = "expect_colon"
+_EXPECT_VALUE = "expect_value"
+_STRING = "string"
+_RAW = "raw"
+_SCALAR = "scalar"
+_EXPECT_ITEM = "expect_item"
+_DONE = "done"
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_SCALAR_END = set(",}] \t\r\n")
+
+
+class StreamingJSONError(ValueError):
+    """Raised when streamed text cannot be a valid JSON object."""
+
+
+class _StringDecoder:
+    """Decodes the inside of a JSON string incrementally, across chunk boundaries."""
+
+    def __init__(self):
+        self.escape = False
+        self.hex = None
+        self.high_surrogate = None
+
+    def decode(self, text: str, start: int):
+        """
+        Decodes `text` from `start` until the closing quote or the end of the chunk.
+
+        Returns:
+            A `(decoded, position, closed)` tuple, where `position` is just past
+            the consumed input and `closed` tells whether the string ended.
+        """
+        out = []
+        i = start
+        n = len(text)
+        while i < n:
+            if self.hex is not None:
+                take = min(4 - len(self.hex), n - i)
+                self.hex += text[i:i + take]
+                i += take
+                if len(self.hex) == 4:
+                    out.append(self._code_point(int(self.hex, 16)))
+                    self.hex = None
+                continue
+            if self.escape:
+                self.escape = False
+                char = text[i]
+                i += 1
+                if char == "u":
+                    self.hex = ""
+                elif char in _ESCAPES:
+                    out.append(self._flush_surrogate() + _ESCAPES[char])
+                else:
+                    raise StreamingJSONError(f"Invalid escape sequence '\\{char}' in string.")
+                continue
+            # Fast path: copy everything up to the next quote or backslash in one go.
+            quote = text.find('"', i)
+            backslash = text.find("\\", i)
+            stop = min(p for p in (quote, backslash, n) if p != -1)
+            if stop > i:
+                out.append(self._flush_surrogate() + text[i:stop])
+                i = stop
+            if i == n:
+                break
+            if text[i] == "\\":
+                self.escape = True
+                i += 1
+            else:
+                out.append(self._flush_surrogate())
+                return "".join(out), i + 1, True
+        return "".join(out), i, False
+
+    def _code_point(self, value: int) -> str:
+        if 0xD800 <= value <= 0xDBFF:
+            pending = self._flush_surrogate()
+            self.high_surrogate = value
+            return pending
+        if 0xDC00 <= value <= 0xDFFF and self.high_surrogate is not None:
+            high, self.high_surrogate = self.high_surrogate, None
+            return chr(0x10000 + ((high - 0xD800) << 10) + (value - 0xDC00))
+        return self._flush_surrogate() + chr(value)
+
+    def _flush_surrogate(self) -> str:
+        if self.high_surrogate is None:
+            return ""
+        value, self.high_surrogate = self.high_surrogate, None
+        return chr(value)
+
+
+class StreamingJSONParser:
+    """
+    An incremental parser for the top-level JSON object an agent returns.
+
+    Text is fed in arbitrary chunks (any prose or markdown fence before the
+    opening brace is skipped) and the parser reports what it has learned so far
+    as a list of events:
+
+    - `("value_start", key)` when the value of a top-level key begins.
+    - `("string_chunk", key, text)` with decoded text of a top-level string
+      value, as it arrives.
+    - `("item", key, value)` for each completed element of a top-level array.
+    - `("value", key, value)` when a top-level value is complete. For keys in
+      `stream_keys` the string is not buffered and `value` is None, so large
+      code strings never have to be held in memory.
+    - `("end",)` once the top-level object is closed.
+
+    Each character is examined once, so parsing is linear in the response size.
+    """
+
+    def __init__(self, stream_keys=()):
+        self.stream_keys = set(stream_keys)
+        self.state = _SEEK_OBJECT
+        self.key = None
+        self._key_parts = []
+        self._decoder = None
+        self._parts = []
+        self._in_array = False
+        self._array = []
+        self._raw_depth = 0
+        self._raw_in_string = False
+        self._raw_escape = False
+
+    @property
+    def done(self) -> bool:
+        return self.state == _DONE
+
+    def feed(self, chunk: str) -> list:
+        """Consumes the next chunk of text and returns the events it produced."""
+        events = []
+        i = 0
+        n = len(chunk)
+        while i < n:
+            state = self.state
+            char = chunk[i]
+            if state == _DONE:
+                break
+            if state == _SEEK_OBJECT:
+                start = chunk.find("{", i)
+                if start == -1:
+                    break
+                self.state = _EXPECT_KEY
+                i = start + 1
+            elif state == _EXPECT_KEY:
+                if char == '"':
+                    self.state = _KEY
+                    self._decoder = _StringDecoder()
+                    self._key_parts = []
+                elif char == "}":
+                    self.state = _DONE
+                    events.append(("end",))
+                elif char not in ", \t\r\n":
+                    raise StreamingJSONError(f"Expected a key but found '{char}'.")
+                i += 1
+            elif state == _KEY:
+                text, i, closed = self._decoder.decode(chunk, i)
+                self._key_parts.append(text)
+                if closed:
+                    self.key = "".join(self._key_parts)
+                    self.state = _EXPECT_COLON
+            elif state == _EXPECT_COLON:
+                if char == ":":
+                    self.state = _EXPECT_VALUE
+                elif char not in " \t\r\n":
+                    raise StreamingJSONError(f"Expected ':' after key '{self.key}' but found '{char}'.")
+                i += 1
+            elif state in (_EXPECT_VALUE, _EXPECT_ITEM):
+                if char in " \t\r\n" or (state == _EXPECT_ITEM and char == ","):
+                    i += 1
+                    continue
+                if state == _EXPECT_VALUE:
+                    events.append(("value_start", self.key))
+                    if char == "[":
+                        self._in_array = True
+                        self._array = []
+                        self.state = _EXPECT_ITEM
+                        i += 1
+                        continue
+                elif char == "]":
+                    self._in_array = False
+                    self._finish_value(self._array, events)
+                    i += 1
+                    continue
+                i = self._begin_value(chunk, i)
+            elif state == _STRING:
+                text, i, closed = self._decoder.decode(chunk, i)
+                if self._streams_string():
+                    if text:
+                        events.append(("string_chunk", self.key, text))
+                else:
+                    self._parts.append(text)
+                if closed:
+                    self._finish_value(None if self._streams_string() else "".join(self._parts), events)
+            elif state == _RAW:
+                i = self._consume_raw(chunk, i, events)
+            elif state == _SCALAR:
+                if char in _SCALAR_END:
+                    self._finish_value(self._load("".join(self._parts)), events)
+                else:
+                    self._parts.append(char)
+                    i += 1
+        return events
+
+    def _streams_string(self) -> bool:
+        return not self._in_array and self.key in self.stream_keys
+
+    def _begin_value(self, chunk: str, i: int) -> int:
+        char = chunk[i]
+        self._parts = []
+        if char == '"':
+            self.state = _STRING
+            self._decoder = _StringDecoder()
+        elif char in "{[":
+            self.state = _RAW
+            self._raw_depth = 1
+            self._raw_in_string = False
+            self._raw_escape = False
+            self._parts.append(char)
+        else:
+            self.state = _SCALAR
+            self._parts.append(char)
+        return i + 1
+
+    def _consume_raw(self, chunk: str, i: int, events: list) -> int:
+        start = i
+        n = len(chunk)
+        while i < n:
+            char = chunk[i]
+            i += 1
+            if self._raw_in_string:
+                if self._raw_escape:
+                    self._raw_escape = False
+                elif char == "\\":
+                    self._raw_escape = True
+                elif char == '"':
+                    self._raw_in_string = False
+            elif char == '"':
+                self._raw_in_string = True
+            elif char in "{[":
+                self._raw_depth += 1
+            elif char in "}]":
+                self._raw_depth -= 1
+                if self._raw_depth == 0:
+                    self._parts.append(chunk[start:i])
+                    self._finish_value(self._load("".join(self._parts)), events)
+                    return i
+        self._parts.append(chunk[start:i])
+        return i
+
+    def _finish_value(self, value, events: list) -> None:
+        self._parts = []
+        if self._in_array:
+            self._array.append(value)
+            events.append(("item", self.key, value))
+            self.state = _EXPECT_ITEM
+        else:
+            events.append(("value", self.key, value))
+            self.state = _EXPECT_KEY
+
+    @staticmethod
+    def _load(text: str):
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as e:
+            raise StreamingJSONError(f"Invalid JSON value '{text[:40]}': {e}") from e
@@ -0,0 +1,241 @@
+import hashlib
+import random
+import re
+from typing import NamedTuple, Optional
+
+from env_config import env_float
+
+# Tasks whose shingle sets are at least this similar (Jaccard) are treated as duplicates. Merging two tasks
+# that only looked alike loses one of them, so only near-identical wording is merged by default.
+DEDUPE_THRESHOLD = env_float("TASK_DEDUP_THRESHOLD", 0.8)
+# MinHash signature size, as bands x rows for locality-sensitive hashing.
+MINHASH_BANDS = 16
+MINHASH_ROWS = 4
+
+# Instruction words every task uses; they say nothing about what the task covers.
+_STOPWORDS = """
+    a an the to of for and or with that which this these in on at by as is are be it its from into
+    create implement build add make write new use should must will can so each one single
+    contain include has have component file py tsx ts jsx
+"""
+# Words the coordinator uses interchangeably, mapped to one spelling.
+_SYNONYMS = {
+    "router": "route", "routes": "route", "routers": "route", "endpoint": "route", "endpoints": "route",
+    "api": "route", "item": "", "items": "", "show": "display", "render": "display", "renders": "display",
+    "all": "list", "return": "get", "returns": "get", "fetch": "get", "fetches": "get", "fetched": "get",
+    "retrieve": "get", "retrieves": "get", "remove": "delete", "update": "edit",
+    "complete": "done", "completed": "done", "completion": "done", "finish": "done", "finished": "done",
+}
+_HTTP_METHOD = re.compile(r"\b(GET|POST|PUT|PATCH|DELETE)\b")
+_URL_PATH = re.compile(r"(?<![\w.])/[A-Za-z0-9_{}:.\-/]+")
+_PASCAL_NAME = re.compile(r"\b[A-Z][a-z0-9]+(?:[A-Z][a-z0-9]+)+\b")
+_FILENAME = re.compile(r"\b[\w\-]+\.(?:py|tsx|ts|jsx|js|css|scss|html)\b")
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "ed", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    return word[:-1] if word.endswith("e") and len(word) > 3 else word
+
+
+_STOPWORDS = frozenset(_stem(word) for word in _STOPWORDS.split())
+
+
+def normalize(task: str) -> list:
+    """
+    Turns a task description into comparable tokens.
+
+    Identifiers are split on camelCase, underscores and digits, instruction
+    words are dropped, synonyms are unified and words are crudely stemmed.
+    HTTP methods and URL paths are left out; they are compared exactly instead.
+    """
+    text = _HTTP_METHOD.sub(" ", _URL_PATH.sub(" ", task))
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    text = re.sub(r"([A-Za-z])(\d)", r"\1 \2", text)
+    tokens = []
+    for word in re.findall(r"[a-z]+|\d+", text.lower()):
+        word = _stem(_SYNONYMS.get(word, word))
+        if word and word not in _STOPWORDS:
+            tokens.append(word)
+    return tokens
+
+
+def shingles(task: str) -> frozenset:
+    """Returns the task's word unigrams and bigrams after `normalize`."""
+    tokens = normalize(task)
+    return frozenset(tokens) | frozenset(zip(tokens, tokens[1:]))
+
+
+def task_guards(task: str) -> tuple:
+    """
+    Returns what must match exactly for two tasks to be duplicates.
+
+    Numbers, HTTP methods, URL paths, component names and filenames tell
+    apart tasks that otherwise read the same, such as `GET /api/tasks` and
+    `POST /api/tasks`, part 1 and part 2 of a page, or a `LoginForm` and a
+    `SignupForm` with the same inputs.
+
+    Returns:
+        A `(methods, paths, numbers, names, filenames)` tuple of frozensets.
+    """
+    paths = frozenset(path.rstrip("/.").lower() for path in _URL_PATH.findall(task))
+    text = _URL_PATH.sub(" ", task)
+    filenames = frozenset(filename.lower() for filename in _FILENAME.findall(text))
+    return (
+        frozenset(_HTTP_METHOD.findall(task)),
+        paths,
+        frozenset(re.findall(r"\d+", _FILENAME.sub(" ", text))),
+        frozenset(_PASCAL_NAME.findall(_FILENAME.sub(" ", text))),
+        filenames,
+    )
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class _MinHasher:
+    """Computes MinHash signatures and buckets them into LSH bands."""
+
+    def __init__(self, bands: int = MINHASH_BANDS, rows: int = MINHASH_ROWS, seed: int = 0):
+        rng = random.Random(seed)
+        self.bands = bands
+        self.rows = rows
+        self.params = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(_MERSENNE_PRIME))
+                       for _ in range(bands * rows)]
+
+    def signature(self, items: frozenset) -> tuple:
+        hashes = [int.from_bytes(hashlib.blake2b(repr(item).encode("utf-8"), digest_size=8).digest(), "big")
+                  for item in items] or [0]
+        return tuple(min((a * value + b) % _MERSENNE_PRIME for value in hashes) for a, b in self.params)
+
+    def band_keys(self, signature: tuple) -> list:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+
+class Duplicate(NamedTuple):
+    """A task that was folded into an earlier, similar one."""
+
+    kind: str
+    task: str
+    kept: str
+    similarity: float
+    # "same endpoint" or "similar wording".
+    reason: str
+
+
+class TaskDeduplicator:
+    """
+    Finds near-duplicate tasks as they arrive, in plan order.
+
+    Each task is reduced to shingles of its normalized words; a MinHash
+    signature with locality-sensitive hashing finds earlier tasks that are
+    likely similar, and the exact Jaccard similarity of the shingles decides.
+    Tasks only match tasks of the same kind, and never when their numbers,
+    HTTP methods, URL paths, component names or filenames differ (see
+    `task_guards`); two tasks naming exactly the same endpoints (method and
+    path) always match, however they are worded. The
+    first task of a cluster is kept.
+    Because tasks are checked one by one, this also works while a plan is
+    still streaming in.
+    """
+
+    def __init__(self, threshold: float = DEDUPE_THRESHOLD):
+        self.threshold = threshold
+        self.duplicates = []
+        self._hasher = _MinHasher()
+        self._tasks = []
+        self._buckets = {}
+        self._endpoints = {}
+
+    def check(self, kind: str, task: str) -> Optional[Duplicate]:
+        """
+        Registers `task` and returns the `Duplicate` it is, or None if it is new.
+        """
+        items = shingles(task)
+        guards = task_guards(task)
+        signature = self._hasher.signature(items)
+        keys = [(kind, key) for key in self._hasher.band_keys(signature)]
+
+        methods, paths, *_ = guards
+        endpoint = (kind, guards) if methods and paths else None
+        if endpoint in self._endpoints:
+            other_task, other_items, _ = self._tasks[self._endpoints[endpoint]]
+            return self._found(Duplicate(kind, task, other_task, jaccard(items, other_items), "same endpoint"))
+
+        candidates = {index for key in keys for index in self._buckets.get(key, ())}
+        best = None
+        for index in sorted(candidates):
+            other_task, other_items, other_guards = self._tasks[index]
+            if other_guards != guards:
+                continue
+            similarity = jaccard(items, other_items)
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (other_task, similarity)
+        if best is not None:
+            return self._found(Duplicate(kind, task, best[0], best[1], "similar wording"))
+
+        index = len(self._tasks)
+        self._tasks.append((task, items, guards))
+        for key in keys:
+            self._buckets.setdefault(key, []).append(index)
+        if endpoint is not None:
+            self._endpoints[endpoint] = index
+        return None
+
+    def _found(self, duplicate: Duplicate) -> Duplicate:
+        self.duplicates.append(duplicate)
+        return duplicate
+
+    def report(self) -> list:
+        """Returns one log line per merged task."""
+        return [describe(duplicate) for duplicate in self.duplicates]
+
+
+def describe(duplicate: Duplicate) -> str:
+    return (f"'{duplicate.task}' -> '{duplicate.kept}' "
+            f"({duplicate.kind}, {duplicate.reason}, similarity {duplicate.similarity:.2f})")
+
+
+def dedupe_plan(plan_data: dict, threshold: float = DEDUPE_THRESHOLD, keys=("frontend_tasks", "backend_tasks")) -> tuple:
+    """
+    Merges near-duplicate tasks of a parsed plan into the first task of their cluster.
+
+    A dropped task that mentions something the kept task does not is appended
+    to it ("Also cover: ..."), so no requirement is lost; one that adds
+    nothing is simply dropped. Tasks that are not strings are passed through
+    unchanged.
+
+    Returns:
+        A `(plan, duplicates)` tuple: a copy of the plan with the merged
+        tasks, and the `Duplicate`s that were folded in, in plan order.
+    """
+    deduplicator = TaskDeduplicator(threshold)
+    plan = dict(plan_data)
+    for key in keys:
+        if key not in plan_data:
+            continue
+        kind = key.rsplit("_", 1)[0]
+        # `(task, extras)` pairs in plan order; tasks may be unhashable, so kept tasks are found by position.
+        kept = []
+        positions = {}
+        for task in plan_data[key]:
+            if not isinstance(task, str):
+                kept.append((task, []))
+                continue
+            duplicate = deduplicator.check(kind, task)
+            if duplicate is None:
+                positions[task] = len(kept)
+                kept.append((task, []))
+            elif set(normalize(task)) - set(normalize(duplicate.kept)):
+                kept[positions[duplicate.kept]][1].append(task)
+        plan[key] = [
+            task if not extras else "\n".join([task] + [f"Also cover: {extra}" for extra in extras])
+            for task, extras in kept
+        ]
+    return plan, deduplicator.duplicates
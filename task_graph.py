@@ -0,0 +1,269 @@
+import heapq
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from telemetry import get_telemetry
+
+# Task IDs are positional: F1 is the plan's first frontend task, B2 its second backend task, and so on.
+ID_PREFIXES = {"frontend": "F", "backend": "B"}
+
+
+class TaskGraph:
+    """
+    The tasks of a plan and the tasks each one builds on.
+
+    Nodes are `(kind, task)` pairs. The coordinator names dependencies by task
+    ID in the plan's optional `dependencies` object, e.g. `{"F1": ["B1"]}`
+    when the first component calls the endpoint of the first backend task.
+    """
+
+    def __init__(self, nodes: list, dependencies: Optional[dict] = None):
+        self.nodes = list(dict.fromkeys(nodes))
+        self.dependencies = {node: [] for node in self.nodes}
+        for node, upstream in (dependencies or {}).items():
+            for dependency in upstream:
+                if dependency != node and dependency not in self.dependencies[node]:
+                    self.dependencies[node].append(dependency)
+        self.dependents = {node: [] for node in self.nodes}
+        for node, upstream in self.dependencies.items():
+            for dependency in upstream:
+                self.dependents[dependency].append(node)
+
+    @classmethod
+    def from_plan(cls, plan_data: dict) -> "TaskGraph":
+        """
+        Builds the graph of a parsed plan.
+
+        References to unknown IDs are ignored and cycles are broken by
+        dropping the edge that closes them; both are logged.
+        """
+        ids = {}
+        nodes = []
+        for kind, prefix in ID_PREFIXES.items():
+            for position, task in enumerate(plan_data.get(f"{kind}_tasks", []), 1):
+                if isinstance(task, str):
+                    ids[f"{prefix}{position}"] = (kind, task)
+                    nodes.append((kind, task))
+        dependencies = {}
+        declared = plan_data.get("dependencies") or {}
+        if not isinstance(declared, dict):
+            print("⚠️ Ignoring the plan's dependencies: expected an object mapping task IDs to lists of IDs.")
+            declared = {}
+        for task_id, upstream in declared.items():
+            upstream = [upstream] if isinstance(upstream, str) else upstream
+            if task_id not in ids or not isinstance(upstream, list):
+                print(f"⚠️ Ignoring the dependencies of unknown task '{task_id}'.")
+                continue
+            for dependency in upstream:
+                if dependency in ids:
+                    dependencies.setdefault(ids[task_id], []).append(ids[dependency])
+                else:
+                    print(f"⚠️ Ignoring the dependency of '{task_id}' on unknown task '{dependency}'.")
+        return cls(nodes, _break_cycles(nodes, dependencies))
+
+    @property
+    def edge_count(self) -> int:
+        return sum(len(upstream) for upstream in self.dependencies.values())
+
+    def renamed(self, renames: dict) -> "TaskGraph":
+        """
+        Returns the graph with nodes renamed (or merged) by `renames`, e.g. after near-duplicate tasks were merged.
+        """
+        def rename(node: tuple) -> tuple:
+            return renames.get(node, node)
+
+        dependencies = {}
+        for node, upstream in self.dependencies.items():
+            dependencies.setdefault(rename(node), []).extend(rename(dependency) for dependency in upstream)
+        nodes = [rename(node) for node in self.nodes]
+        return TaskGraph(nodes, _break_cycles(list(dict.fromkeys(nodes)), dependencies))
+
+    def dependency_ids(self, plan_data: dict) -> dict:
+        """
+        Returns the graph's edges as a plan's `dependencies` object, naming tasks by their IDs in `plan_data`.
+
+        Tasks that are not in `plan_data` are left out.
+        """
+        ids = {}
+        for kind, prefix in ID_PREFIXES.items():
+            for position, task in enumerate(plan_data.get(f"{kind}_tasks", []), 1):
+                if isinstance(task, str):
+                    ids.setdefault((kind, task), f"{prefix}{position}")
+        dependencies = {}
+        for node in self.nodes:
+            upstream = [ids[dependency] for dependency in self.dependencies[node] if dependency in ids]
+            if node in ids and upstream:
+                dependencies[ids[node]] = upstream
+        return dependencies
+
+    def critical_paths(self, weights: dict) -> dict:
+        """
+        Returns, for every node, the weighted length of the longest chain that starts at it.
+
+        Args:
+            weights: The expected cost of one task of each kind.
+        """
+        lengths = {}
+        for node in reversed(self.topological_order()):
+            downstream = max((lengths[dependent] for dependent in self.dependents[node]), default=0.0)
+            lengths[node] = weights.get(node[0], 1.0) + downstream
+        return lengths
+
+    def critical_path(self, weights: dict) -> list:
+        """Returns the longest weighted chain of tasks, from first to last."""
+        lengths = self.critical_paths(weights)
+        if not lengths:
+            return []
+        node = max(self.nodes, key=lambda candidate: lengths[candidate])
+        path = [node]
+        while self.dependents[node]:
+            node = max(self.dependents[node], key=lambda candidate: lengths[candidate])
+            path.append(node)
+        return path
+
+    def topological_order(self) -> list:
+        remaining = {node: len(upstream) for node, upstream in self.dependencies.items()}
+        ready = [node for node in self.nodes if not remaining[node]]
+        order = []
+        while ready:
+            node = ready.pop(0)
+            order.append(node)
+            for dependent in self.dependents[node]:
+                remaining[dependent] -= 1
+                if not remaining[dependent]:
+                    ready.append(dependent)
+        return order
+
+
+def _break_cycles(nodes: list, dependencies: dict) -> dict:
+    """Drops, in plan order, every dependency that would close a cycle."""
+    kept = {}
+    state = {}
+
+    def visit(node) -> None:
+        state[node] = "visiting"
+        for dependency in dependencies.get(node, ()):
+            if state.get(dependency) == "visiting":
+                print(f"⚠️ Ignoring the dependency of '{node[1]}' on '{dependency[1]}': it would form a cycle.")
+                continue
+            if dependency not in state:
+                visit(dependency)
+            kept.setdefault(node, []).append(dependency)
+        state[node] = "done"
+
+    for node in nodes:
+        if node not in state:
+            visit(node)
+    return kept
+
+
+def dedupe_renames(plan_data: dict, deduped: dict, duplicates: list) -> dict:
+    """
+    Maps each task of `plan_data` to the task it became in `deduped` (see `task_dedup.dedupe_plan`).
+
+    Merged tasks map to the task they were folded into, whose text may have
+    grown an "Also cover: ..." line.
+    """
+    renames = {}
+    for kind in ID_PREFIXES:
+        folded = {duplicate.task: duplicate.kept for duplicate in duplicates
+                  if duplicate.kind == kind and duplicate.task != duplicate.kept}
+        kept = [task for task in dict.fromkeys(task for task in plan_data.get(f"{kind}_tasks", [])
+                                               if isinstance(task, str))
+                if task not in folded]
+        final = {original: new for original, new in zip(kept, [task for task in deduped.get(f"{kind}_tasks", [])
+                                                               if isinstance(task, str)])}
+        for original, new in final.items():
+            renames[kind, original] = (kind, new)
+        for task, target in folded.items():
+            renames[kind, task] = (kind, final.get(target, target))
+    return renames
+
+
+class GraphScheduler:
+    """
+    Runs a task as soon as every task it depends on has finished, longest critical path first.
+
+    At most `concurrency` tasks run at once. Whenever a slot frees up, the
+    ready task with the longest weighted chain of dependents starts next, so
+    the chain that bounds the run's wall-clock time is never left waiting
+    behind tasks that could run later. A task whose dependency failed still
+    runs, without that dependency's output. Each task is traced as a "task"
+    span whose queue wait counts from the moment it became ready.
+    """
+
+    def __init__(self, graph: TaskGraph, weights: dict):
+        self.graph = graph
+        self.priorities = graph.critical_paths(weights)
+
+    def submit_all(self, executor, nodes: list, run: Callable[[tuple, list], object], concurrency: int,
+                   finished: Optional[dict] = None) -> list:
+        """
+        Schedules `nodes` on `executor` and returns one future per node, in order.
+
+        Args:
+            executor: The executor to run tasks on.
+            nodes: The `(kind, task)` pairs to run.
+            run: Runs one node; it receives the node and a list of
+                `(dependency, result)` pairs for its successful dependencies.
+            concurrency: The most tasks running at once.
+            finished: Results of dependencies that are not run, e.g. tasks
+                skipped as unchanged, keyed by node.
+
+        Returns:
+            One future per node, with `run`'s result or exception.
+        """
+        futures = {node: Future() for node in nodes}
+        results = dict(finished or {})
+        waiting = {node: sum(1 for dependency in self.graph.dependencies.get(node, ()) if dependency in futures)
+                   for node in futures}
+        order = {node: position for position, node in enumerate(nodes)}
+        ready = [(-self.priorities.get(node, 0.0), order[node], node) for node in nodes if not waiting[node]]
+        heapq.heapify(ready)
+        lock = threading.Lock()
+        running = 0
+        telemetry = get_telemetry()
+        parent = telemetry.current_span()
+        queued = {node: time.time() for _, _, node in ready}
+
+        def launch() -> None:
+            nonlocal running
+            with lock:
+                starting = []
+                while ready and running < max(1, concurrency):
+                    starting.append(heapq.heappop(ready)[2])
+                    running += 1
+            for node in starting:
+                executor.submit(execute, node)
+
+        def execute(node) -> None:
+            nonlocal running
+            with lock:
+                upstream = [(dependency, results[dependency])
+                            for dependency in self.graph.dependencies.get(node, ()) if dependency in results]
+            try:
+                with telemetry.span("task", parent=parent, kind=node[0], task=node[1]) as span:
+                    span.set("queue_wait_s", span.start - queued[node])
+                    result, error = run(node, upstream), None
+            except Exception as e:
+                result, error = None, e
+            with lock:
+                running -= 1
+                if error is None:
+                    results[node] = result
+                for dependent in self.graph.dependents.get(node, ()):
+                    if dependent in waiting:
+                        waiting[dependent] -= 1
+                        if not waiting[dependent]:
+                            queued[dependent] = time.time()
+                            heapq.heappush(ready, (-self.priorities.get(dependent, 0.0), order[dependent], dependent))
+            if error is None:
+                futures[node].set_result(result)
+            else:
+                futures[node].set_exception(error)
+            launch()
+
+        launch()
+        return [futures[node] for node in nodes]
@@ -0,0 +1,939 @@
+import os
+import re
+import threading
+from typing import NamedTuple, Optional
+
+from backend_agent import get_profile
+from task_dedup import normalize
+
+# Whether standard CRUD/list/form/checkbox tasks are rendered locally instead of by the model.
+TEMPLATES_ENABLED = os.getenv("TASK_TEMPLATES", "1") != "0"
+
+_ENDPOINT = re.compile(r"\b(GET|POST|PUT|PATCH|DELETE)\s+`?(/[\w/{}:.\-]*)")
+_PATH_PARAM = re.compile(r"^(?:\{\w+\}|:\w+)$")
+_PASCAL_NAME = re.compile(r"\b([A-Z][a-z0-9]+(?:[A-Z][a-z0-9]+)+)\b")
+_NAME_LIST = r"([`\w]+(?:\s*,\s*[`\w]+)*(?:,?\s+and\s+[`\w]+)?)"
+_FIELD_LISTS = (
+    re.compile(r"\bwith\s+(?:the\s+|a\s+|an\s+)?" + _NAME_LIST + r"\s+(?:fields?|columns?|properties|attributes)\b", re.I),
+    re.compile(r"\b(?:fields?|columns?|properties|attributes)\s*(?:like|such as|including|:)?\s+" + _NAME_LIST, re.I),
+)
+_INIT_DB = re.compile(r"\b(initiali[sz]e|create|set\s*up|setup)\b.*\b(database|db)\b.*\btables?\b"
+                      r"|\b(initiali[sz]e|set\s*up|setup)\b.*\b(database|db)\b", re.I)
+_COMPLETION = re.compile(r"\b(complet\w*|done|finish\w*|toggl\w*|check\w*|status)\b", re.I)
+
+# The words a task may use for each template, besides its resource, fields, path and component name. A task
+# is only rendered from a template when every word of it (see `task_dedup.normalize`) is covered, so any
+# requirement the template would not implement sends the task to the model instead.
+_COMMON_WORDS = """
+    rest api endpoint route fastapi sqlalchemy pydantic json http request response body payload status code
+    return returns id ids given specific specified using via database db record records row rows field fields
+    column columns property properties attribute attributes required optional string text boolean integer number
+    schema schemas model models
+"""
+_PATTERN_WORDS = {
+    ("backend", "create"): "add insert store save accept accepts post",
+    ("backend", "list"): "list get all every retrieve fetch",
+    ("backend", "get"): "get retrieve fetch one detail details by 404 found not",
+    ("backend", "update"): "update edit modify change replace put patch by 404 found not",
+    ("backend", "toggle"): "mark toggle complete done status update patch as not incomplete by 404 found",
+    ("backend", "delete"): "delete remove destroy by 404 found not 204",
+    ("backend", "init_db"): "initialize set up setup table tables metadata startup",
+    ("frontend", "list"): "list display show render view fetch get all every load react ui table",
+    ("frontend", "form"): "form add new submit input button enter post send clear reset after react ui",
+    ("frontend", "checkbox"): "checkbox check box toggle mark complete done click status update patch react ui row as",
+}
+# The method each frontend template calls its endpoint with.
+_FRONTEND_METHODS = {"list": "GET", "form": "POST", "checkbox": "PATCH"}
+_RESOURCE_WORD = re.compile(
+    r"\b(?:list of|all(?: the)?|every|new|add(?:s|ing)?(?: a| an| new)?|creat(?:e|es|ing)(?: a| an| new)?|"
+    r"mark(?:s|ing)?(?: a| an| the| each)?|each|single)\s+([a-z][a-z_]+)",
+    re.I,
+)
+_NOT_RESOURCES = {
+    "a", "an", "the", "new", "component", "form", "list", "button", "checkbox", "input", "field", "fields",
+    "react", "rest", "api", "endpoint", "page", "ui", "view", "item", "items", "data", "entry", "entries",
+    "their", "its", "of", "completed", "complete",
+}
+
+
+class TemplateMatch(NamedTuple):
+    """A task the classifier recognized, with the parameters its template needs."""
+
+    kind: str
+    # e.g. "create", "list", "get", "update", "toggle", "delete", "init_db", "form", "checkbox".
+    pattern: str
+    # The resource in singular snake case, e.g. "task" or "todo_item".
+    resource: str
+    # The collection path, e.g. "/api/tasks".
+    path: str
+    # `(name, python_type)` pairs, e.g. ("title", "str").
+    fields: tuple
+    # The frontend component's name, if the task named one.
+    component: Optional[str] = None
+    # A backend task's endpoint as the task names it, with the id parameter renamed to match the template,
+    # e.g. "patch" and "/api/tasks/{task_id}/complete".
+    method: str = ""
+    route: str = ""
+
+
+def singular(word: str) -> str:
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "xes", "ches", "shes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def plural(word: str) -> str:
+    if word.endswith("y") and word[-2:-1] not in ("a", "e", "o", "u"):
+        return word[:-1] + "ies"
+    if word.endswith(("s", "x", "ch", "sh")):
+        return word + "es"
+    return word + "s"
+
+
+def _pascal(snake: str) -> str:
+    return "".join(part.capitalize() for part in snake.split("_"))
+
+
+def _snake(name: str) -> str:
+    return re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", name).lower()
+
+
+def _fields(task: str) -> tuple:
+    """
+    Returns the fields a task lists ("with title and description fields"), or () if it lists none.
+
+    `is_`/`has_` names and completion words are typed as booleans, counts and
+    ids as integers, prices and amounts as floats, and anything else (including
+    ISO dates) as strings. Returns () if no field can serve as the display text.
+    """
+    names = []
+    for pattern in _FIELD_LISTS:
+        match = pattern.search(task)
+        if match:
+            names = [_snake(name) for name in re.split(r"\s*,\s*(?:and\s+)?|\s+and\s+", match.group(1).replace("`", ""))
+                     if name.lower() not in ("", "id", "the", "a", "an")]
+            break
+    if not names:
+        return ()
+    fields = []
+    for name in dict.fromkeys(names):
+        if name.startswith(("is_", "has_")) or name in ("completed", "done", "finished", "active", "archived"):
+            fields.append((name, "bool"))
+        elif name.endswith(("_count", "_id")) or name in ("count", "quantity", "priority", "position"):
+            fields.append((name, "int"))
+        elif name.endswith(("_price", "_amount")) or name in ("price", "amount", "cost", "total", "rating"):
+            fields.append((name, "float"))
+        else:
+            fields.append((name, "str"))
+    if not any(kind == "str" for _, kind in fields):
+        return ()
+    return tuple(fields)
+
+
+def _classify_backend(task: str) -> Optional[TemplateMatch]:
+    endpoints = _ENDPOINT.findall(task)
+    if not endpoints:
+        if _INIT_DB.search(task) and not re.search(r"\b(seed|sample|populate)\w*", task, re.I):
+            return TemplateMatch("backend", "init_db", "database", "/admin/database/initialize", ())
+        return None
+    if len({endpoint for endpoint in endpoints}) != 1:
+        return None
+    method, path = endpoints[0]
+    segments = [segment for segment in path.rstrip("/").split("/") if segment]
+    has_id = bool(segments) and bool(_PATH_PARAM.match(segments[-1]))
+    action = None
+    suffix = ""
+    if len(segments) >= 2 and _PATH_PARAM.match(segments[-2]) and _COMPLETION.search(segments[-1]):
+        # e.g. PATCH /api/tasks/{id}/complete, which keeps its last segment in the rendered route.
+        if not re.fullmatch(r"[a-z][a-z0-9_\-]*", segments[-1]):
+            return None
+        action, suffix, segments, has_id = "toggle", "/" + segments[-1], segments[:-1], True
+    collection = segments[:-1] if has_id else segments
+    if not collection or any(not re.fullmatch(r"[a-z][a-z0-9_\-]*", segment) for segment in collection):
+        return None
+    resource = singular(collection[-1].replace("-", "_"))
+    collection_path = "/" + "/".join(collection)
+
+    if method == "POST" and not has_id:
+        pattern = "create"
+    elif method == "GET":
+        pattern = "get" if has_id else "list"
+    elif method in ("PUT", "PATCH") and has_id:
+        pattern = action or ("toggle" if method == "PATCH" and _COMPLETION.search(task) else "update")
+    elif method == "DELETE" and has_id:
+        pattern = "delete"
+    else:
+        return None
+    fields = _fields(task)
+    if not fields or (pattern == "toggle" and not any(kind == "bool" for _, kind in fields)):
+        return None
+    route = f"{collection_path}/{{{resource}_id}}{suffix}" if has_id else collection_path
+    return TemplateMatch("backend", pattern, resource, collection_path, fields, method=method.lower(), route=route)
+
+
+def _classify_frontend(task: str) -> Optional[TemplateMatch]:
+    words = task.lower()
+    patterns = []
+    if re.search(r"\bcheck\s*box\w*|\btoggl\w*", words) and _COMPLETION.search(words):
+        patterns.append("checkbox")
+    if re.search(r"\bform\b", words) and re.search(r"\b(add|create|new|submit)\w*", words):
+        patterns.append("form")
+    if re.search(r"\b(list|display|show|render)\w*", words) and not re.search(r"\bform\b", words) and \
+            not patterns:
+        patterns.append("list")
+    if len(patterns) != 1:
+        return None
+    pattern = patterns[0]
+
+    named = _PASCAL_NAME.search(task)
+    component = named.group(1) if named else None
+    resource = None
+    if component:
+        stem = re.sub(r"^(Add|Create|New)|(List|Form|Item|Row|Card|Checkbox|Toggle|View)$", "", component)
+        if stem and stem != component:
+            resource = _snake(stem)
+    if resource is None:
+        for candidate in _RESOURCE_WORD.findall(task):
+            if candidate.lower() not in _NOT_RESOURCES:
+                resource = singular(candidate.lower())
+                break
+    if resource is None:
+        return None
+    endpoints = set(_ENDPOINT.findall(task))
+    if len(endpoints) > 1:
+        return None
+    path = f"/api/{plural(resource)}"
+    if endpoints:
+        # The templates call `GET path`, `POST path` and `PATCH path/{id}`; a task naming any other endpoint
+        # is left to the model rather than calling an API it did not ask for.
+        method, named = endpoints.pop()
+        segments = [segment for segment in named.split("/") if segment]
+        if pattern == "checkbox":
+            if not segments or not _PATH_PARAM.match(segments[-1]):
+                return None
+            segments = segments[:-1]
+        if method != _FRONTEND_METHODS[pattern] or not segments or any(map(_PATH_PARAM.match, segments)):
+            return None
+        path = "/" + "/".join(segments)
+    fields = _fields(task)
+    if not fields:
+        return None
+    if component is None:
+        component = {"list": "{}List", "form": "Add{}Form", "checkbox": "{}Item"}[pattern].format(_pascal(resource))
+    return TemplateMatch("frontend", pattern, resource, path, fields, component)
+
+
+def classify(kind: str, task: str) -> Optional[TemplateMatch]:
+    """
+    Recognizes a standard task that a template can render, or returns None.
+
+    The rules are deliberately strict: a backend task must name exactly one
+    endpoint (`POST /api/tasks`, `PATCH /api/tasks/{id}`, ...) or ask to
+    initialize the database tables, and a frontend task must be a plain list,
+    "add" form or completion checkbox. Tasks other than "initialize the
+    database" must list their fields. Every word of the task must then be
+    one the template accounts for (see `_PATTERN_WORDS`); a task that asks
+    for anything more, such as a soft delete or related records, is left to
+    the model.
+    """
+    if kind == "backend":
+        match = _classify_backend(task)
+    elif kind == "frontend":
+        match = _classify_frontend(task)
+    else:
+        return None
+    return match if match is not None and _covered(task, match) else None
+
+
+def _covered(task: str, match: TemplateMatch) -> bool:
+    """Tells whether every word of `task` is one the matched template accounts for."""
+    allowed = " ".join([
+        _COMMON_WORDS, _PATTERN_WORDS[match.kind, match.pattern], match.resource, plural(match.resource),
+        " ".join(name for name, _ in match.fields), match.path.replace("/", " "), match.route.replace("/", " "),
+        match.component or "",
+    ])
+    return set(normalize(task)) <= set(normalize(allowed))
+
+
+# --- Rendering ------------------------------------------------------------
+
+_TS_TYPES = {"str": "string", "bool": "boolean", "int": "number", "float": "number"}
+_PY_DEFAULTS = {"str": '""', "bool": "False", "int": "0", "float": "0.0"}
+
+
+def _substitute(template: str, values: dict) -> str:
+    for key, value in values.items():
+        template = template.replace(key, value)
+    return template
+
+
+def _names(match: TemplateMatch) -> dict:
+    resource = match.resource
+    return {
+        "__Model__": _pascal(resource),
+        "__model__": resource,
+        "__models__": plural(resource),
+        "__Label__": resource.replace("_", " ").capitalize(),
+        "__label__": resource.replace("_", " "),
+        "__labels__": plural(resource).replace("_", " "),
+        "__path__": match.path,
+        "__tag__": _pascal(plural(resource)),
+    }
+
+
+_SYNC_HEADER = '''from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+from database import get_db
+
+router = APIRouter(tags=["__tag__"])
+'''
+
+_SYNC_ROUTES = {
+    "create": '''
+
+@router.post("__path__", response_model=schemas.__Model__Read, status_code=status.HTTP_201_CREATED)
+def create___model__(__model___in: schemas.__Model__Create, db: Session = Depends(get_db)) -> models.__Model__:
+    """Creates a new __label__."""
+    __model__ = models.__Model__(**__model___in.model_dump())
+    db.add(__model__)
+    db.commit()
+    db.refresh(__model__)
+    return __model__
+''',
+    "list": '''
+
+@router.get("__path__", response_model=list[schemas.__Model__Read])
+def list___models__(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)) -> list:
+    """Returns a page of __labels__, oldest first."""
+    return db.query(models.__Model__).order_by(models.__Model__.id).offset(skip).limit(limit).all()
+''',
+    "get": '''
+
+@router.get("__path__/{__model___id}", response_model=schemas.__Model__Read)
+def get___model__(__model___id: int, db: Session = Depends(get_db)) -> models.__Model__:
+    """Returns one __label__ by id."""
+    __model__ = db.get(models.__Model__, __model___id)
+    if __model__ is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="__Label__ not found")
+    return __model__
+''',
+    "update": '''
+
+@router.__method__("__route__", response_model=schemas.__Model__Read)
+def update___model__(
+    __model___id: int, __model___in: schemas.__Model__Update, db: Session = Depends(get_db)
+) -> models.__Model__:
+    """Updates the fields of a __label__ that are present in the request."""
+    __model__ = db.get(models.__Model__, __model___id)
+    if __model__ is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="__Label__ not found")
+    for field, value in __model___in.model_dump(exclude_unset=True).items():
+        setattr(__model__, field, value)
+    db.commit()
+    db.refresh(__model__)
+    return __model__
+''',
+    "toggle": '''
+
+class __Model____Flag__Update(BaseModel):
+    """The new __flag_label__ status of a __label__."""
+
+    __flag__: bool
+
+
+@router.__method__("__route__", response_model=schemas.__Model__Read)
+def set___model_____flag__(
+    __model___id: int, update: __Model____Flag__Update, db: Session = Depends(get_db)
+) -> models.__Model__:
+    """Sets whether a __label__ is __flag_label__."""
+    __model__ = db.get(models.__Model__, __model___id)
+    if __model__ is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="__Label__ not found")
+    __model__.__flag__ = update.__flag__
+    db.commit()
+    db.refresh(__model__)
+    return __model__
+''',
+    "delete": '''
+
+@router.delete("__path__/{__model___id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete___model__(__model___id: int, db: Session = Depends(get_db)) -> None:
+    """Deletes a __label__."""
+    __model__ = db.get(models.__Model__, __model___id)
+    if __model__ is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="__Label__ not found")
+    db.delete(__model__)
+    db.commit()
+''',
+}
+
+_SYNC_INIT_DB = '''from fastapi import APIRouter, status
+
+import models  # noqa: F401  (registers the models on Base)
+from database import Base, engine
+
+router = APIRouter(tags=["Database"])
+
+
+@router.post("__path__", status_code=status.HTTP_201_CREATED)
+def initialize_database() -> dict:
+    """Creates every table that does not exist yet; safe to call more than once."""
+    Base.metadata.create_all(bind=engine)
+    return {"message": "Database tables created"}
+'''
+
+_ASYNC_HEADER = '''from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base, get_session
+
+router = APIRouter(tags=["__tag__"])
+
+
+class __Model__(Base):
+    """A __label__. Every templated __label__ router declares this table; the first declaration is kept."""
+
+    __tablename__ = "__models__"
+    __table_args__ = {"keep_existing": True}
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+__columns__
+
+class __Model__Create(BaseModel):
+__schema_fields__
+__update_schema__
+class __Model__Read(__Model__Create):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+'''
+
+_ASYNC_ROUTES = {
+    "create": '''
+
+@router.post("__path__", response_model=__Model__Read, status_code=status.HTTP_201_CREATED)
+async def create___model__(__model___in: __Model__Create, session: AsyncSession = Depends(get_session)) -> __Model__:
+    """Creates a new __label__."""
+    __model__ = __Model__(**__model___in.model_dump())
+    session.add(__model__)
+    await session.commit()
+    return __model__
+
+
+@router.post("__path__/bulk", status_code=status.HTTP_201_CREATED)
+async def create___models___bulk(items: list[__Model__Create], session: AsyncSession = Depends(get_session)) -> dict:
+    """Creates many __labels__ with a single INSERT statement."""
+    if items:
+        await session.execute(insert(__Model__), [item.model_dump() for item in items])
+        await session.commit()
+    return {"inserted": len(items)}
+''',
+    "list": '''
+
+@router.get("__path__", response_model=list[__Model__Read])
+async def list___models__(
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_session),
+) -> list:
+    """Returns a page of __labels__, oldest first."""
+    rows = await session.scalars(select(__Model__).order_by(__Model__.id).limit(limit).offset(offset))
+    return list(rows)
+''',
+    "get": '''
+
+@router.get("__path__/{__model___id}", response_model=__Model__Read)
+async def get___model__(__model___id: int, session: AsyncSession = Depends(get_session)) -> __Model__:
+    """Returns one __label__ by id."""
+    __model__ = await session.get(__Model__, __model___id)
+    if __model__ is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="__Label__ not found")
+    return __model__
+''',
+    "update": '''
+
+@router.__method__("__route__", response_model=__Model__Read)
+async def update___model__(
+    __model___id: int, __model___in: __Model__Update, session: AsyncSession = Depends(get_session)
+) -> __Model__:
+    """Updates the fields of a __label__ that are present in the request."""
+    __model__ = await session.get(__Model__, __model___id)
+    if __model__ is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="__Label__ not found")
+    for field, value in __model___in.model_dump(exclude_unset=True).items():
+        setattr(__model__, field, value)
+    await session.commit()
+    return __model__
+''',
+    "toggle": '''
+
+class __Model____Flag__Update(BaseModel):
+    """The new __flag_label__ status of a __label__."""
+
+    __flag__: bool
+
+
+@router.__method__("__route__", response_model=__Model__Read)
+async def set___model_____flag__(
+    __model___id: int, update: __Model____Flag__Update, session: AsyncSession = Depends(get_session)
+) -> __Model__:
+    """Sets whether a __label__ is __flag_label__."""
+    __model__ = await session.get(__Model__, __model___id)
+    if __model__ is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="__Label__ not found")
+    __model__.__flag__ = update.__flag__
+    await session.commit()
+    return __model__
+''',
+    "delete": '''
+
+@router.delete("__path__/{__model___id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete___model__(__model___id: int, session: AsyncSession = Depends(get_session)) -> None:
+    """Deletes a __label__."""
+    __model__ = await session.get(__Model__, __model___id)
+    if __model__ is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="__Label__ not found")
+    await session.delete(__model__)
+    await session.commit()
+''',
+}
+
+_ASYNC_INIT_DB = '''from fastapi import APIRouter, status
+
+from database import Base, engine
+
+router = APIRouter(tags=["Database"])
+
+
+@router.post("__path__", status_code=status.HTTP_201_CREATED)
+async def initialize_database() -> dict:
+    """Creates every table that does not exist yet; safe to call more than once."""
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    return {"message": "Database tables created"}
+'''
+
+
+def _prune_imports(code: str) -> str:
+    """Drops the names of `from ... import ...` lines that the rest of the code does not use."""
+    lines = code.split("\n")
+    body = "\n".join(line for line in lines if not line.startswith("from "))
+    kept = []
+    for line in lines:
+        match = re.match(r"from (\S+) import (.+)$", line)
+        if match and "#" not in line:
+            names = [name for name in match.group(2).split(", ") if re.search(rf"\b{name}\b", body)]
+            if not names:
+                continue
+            line = f"from {match.group(1)} import {', '.join(names)}"
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def _flag(fields: tuple) -> str:
+    return next(name for name, kind in fields if kind == "bool")
+
+
+def render_backend(match: TemplateMatch, profile: str = "default") -> dict:
+    """Renders a backend match as a backend agent response (`filename`, `python_code`)."""
+    performance = profile == "performance"
+    if match.pattern == "init_db":
+        code = _substitute(_ASYNC_INIT_DB if performance else _SYNC_INIT_DB, {"__path__": match.path})
+        return {"filename": "database_routes.py", "python_code": code}
+
+    values = {"__method__": match.method, "__route__": match.route, **_names(match)}
+    if match.pattern == "toggle":
+        flag = _flag(match.fields)
+        values = {"__Flag__": _pascal(flag), "__flag_label__": flag.replace("_", " "), "__flag__": flag, **values}
+    if performance:
+        # The display field and the flags are what lists are filtered and ordered by.
+        columns = "".join(
+            f"    {name}: Mapped[{kind}] = mapped_column(index=True)\n" if kind == "bool" or i == 0
+            else f"    {name}: Mapped[Optional[str]]\n" if kind == "str"
+            else f"    {name}: Mapped[{kind}]\n"
+            for i, (name, kind) in enumerate(match.fields)
+        )
+        first = match.fields[0][0]
+        schema_fields = "".join(
+            f"    {name}: {kind}\n" if name == first else
+            f"    {name}: {kind} = {_PY_DEFAULTS[kind]}\n" if kind != "str" else f"    {name}: Optional[str] = None\n"
+            for name, kind in match.fields
+        )
+        update_schema = ""
+        if match.pattern == "update":
+            update_schema = "\nclass __Model__Update(BaseModel):\n" + "".join(
+                f"    {name}: Optional[{kind}] = None\n" for name, kind in match.fields
+            ) + "\n"
+        header = _substitute(_ASYNC_HEADER, {
+            "__columns__": columns, "__schema_fields__": schema_fields, "__update_schema__": update_schema,
+        })
+        code = header + _ASYNC_ROUTES[match.pattern]
+    else:
+        code = _SYNC_HEADER + _SYNC_ROUTES[match.pattern]
+    code = _prune_imports(_substitute(code, values))
+    return {"filename": f"{values['__models__']}_{match.pattern}_routes.py", "python_code": code}
+
+
+_TSX_LIST = """import React, { useEffect, useState } from 'react';
+import styles from './__Component__.module.css';
+
+interface __Model__ {
+  id: number;
+__ts_fields__}
+
+interface Props {
+  /** The endpoint that returns the __labels__. */
+  apiUrl?: string;
+}
+
+const __Component__: React.FC<Props> = ({ apiUrl = '__path__' }) => {
+  const [__models__, set__Models__] = useState<__Model__[]>([]);
+  const [loading, setLoading] = useState(true);
+  const [error, setError] = useState<string | null>(null);
+
+  useEffect(() => {
+    const controller = new AbortController();
+    fetch(apiUrl, { signal: controller.signal })
+      .then((response) => {
+        if (!response.ok) {
+          throw new Error(`Could not load __labels__ (${response.status})`);
+        }
+        return response.json();
+      })
+      .then((data: __Model__[]) => set__Models__(data))
+      .catch((e: Error) => {
+        if (e.name !== 'AbortError') {
+          setError(e.message);
+        }
+      })
+      .finally(() => setLoading(false));
+    return () => controller.abort();
+  }, [apiUrl]);
+
+  if (loading) {
+    return <p className={styles.status}>Loading __labels__...</p>;
+  }
+  if (error) {
+    return <p className={styles.error}>{error}</p>;
+  }
+  if (__models__.length === 0) {
+    return <p className={styles.status}>No __labels__ yet.</p>;
+  }
+  return (
+    <ul className={styles.list}>
+      {__models__.map((__model__) => (
+        <li key={__model__.id} className={__item_class__}>
+          {__model__.__display__}
+        </li>
+      ))}
+    </ul>
+  );
+};
+
+export default __Component__;
+"""
+
+_CSS_LIST = """.list {
+  list-style: none;
+  margin: 0;
+  padding: 0;
+}
+
+.item {
+  padding: 0.5rem 0.75rem;
+  border-bottom: 1px solid #e5e7eb;
+}
+
+.done {
+  padding: 0.5rem 0.75rem;
+  border-bottom: 1px solid #e5e7eb;
+  color: #9ca3af;
+  text-decoration: line-through;
+}
+
+.status {
+  color: #6b7280;
+}
+
+.error {
+  color: #b91c1c;
+}
+"""
+
+_TSX_FORM = """import React, { FormEvent, useState } from 'react';
+import styles from './__Component__.module.css';
+
+interface __Model__ {
+  id: number;
+__ts_fields__}
+
+interface Props {
+  /** The endpoint new __labels__ are posted to. */
+  apiUrl?: string;
+  /** Called with the created __label__. */
+  onCreated?: (__model__: __Model__) => void;
+}
+
+const __Component__: React.FC<Props> = ({ apiUrl = '__path__', onCreated }) => {
+  const [__display__, set__Display__] = useState('');
+  const [submitting, setSubmitting] = useState(false);
+  const [error, setError] = useState<string | null>(null);
+
+  const handleSubmit = async (event: FormEvent<HTMLFormElement>) => {
+    event.preventDefault();
+    if (!__display__.trim()) {
+      return;
+    }
+    setSubmitting(true);
+    setError(null);
+    try {
+      const response = await fetch(apiUrl, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ __display__: __display__.trim() }),
+      });
+      if (!response.ok) {
+        throw new Error(`Could not add the __label__ (${response.status})`);
+      }
+      const created: __Model__ = await response.json();
+      set__Display__('');
+      onCreated?.(created);
+    } catch (e) {
+      setError((e as Error).message);
+    } finally {
+      setSubmitting(false);
+    }
+  };
+
+  return (
+    <form className={styles.form} onSubmit={handleSubmit}>
+      <input
+        className={styles.input}
+        type="text"
+        placeholder="New __label__ __display_label__"
+        value={__display__}
+        onChange={(event) => set__Display__(event.target.value)}
+        disabled={submitting}
+      />
+      <button className={styles.button} type="submit" disabled={submitting || !__display__.trim()}>
+        Add
+      </button>
+      {error && <p className={styles.error}>{error}</p>}
+    </form>
+  );
+};
+
+export default __Component__;
+"""
+
+_CSS_FORM = """.form {
+  display: flex;
+  flex-wrap: wrap;
+  gap: 0.5rem;
+}
+
+.input {
+  flex: 1;
+  padding: 0.5rem;
+  border: 1px solid #d1d5db;
+  border-radius: 4px;
+}
+
+.button {
+  padding: 0.5rem 1rem;
+  border: none;
+  border-radius: 4px;
+  background-color: #2563eb;
+  color: #fff;
+  cursor: pointer;
+}
+
+.button:disabled {
+  opacity: 0.6;
+  cursor: default;
+}
+
+.error {
+  width: 100%;
+  color: #b91c1c;
+}
+"""
+
+_TSX_CHECKBOX = """import React, { useState } from 'react';
+import styles from './__Component__.module.css';
+
+interface __Model__ {
+  id: number;
+__ts_fields__}
+
+interface Props {
+  __model__: __Model__;
+  /** The collection endpoint; the __label__ is patched at `${apiUrl}/${id}`. */
+  apiUrl?: string;
+  /** Called with the updated __label__. */
+  onChange?: (__model__: __Model__) => void;
+}
+
+const __Component__: React.FC<Props> = ({ __model__, apiUrl = '__path__', onChange }) => {
+  const [__flag__, set__Flag__] = useState(__model__.__flag__);
+  const [saving, setSaving] = useState(false);
+
+  const handleToggle = async () => {
+    const next = !__flag__;
+    set__Flag__(next);
+    setSaving(true);
+    try {
+      const response = await fetch(`${apiUrl}/${__model__.id}`, {
+        method: 'PATCH',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ __flag__: next }),
+      });
+      if (!response.ok) {
+        throw new Error(`Could not update the __label__ (${response.status})`);
+      }
+      onChange?.(await response.json());
+    } catch {
+      set__Flag__(!next);
+    } finally {
+      setSaving(false);
+    }
+  };
+
+  return (
+    <label className={styles.item}>
+      <input type="checkbox" checked={__flag__} onChange={handleToggle} disabled={saving} />
+      <span className={__flag__ ? styles.done : styles.text}>{__model__.__display__}</span>
+    </label>
+  );
+};
+
+export default __Component__;
+"""
+
+_CSS_CHECKBOX = """.item {
+  display: flex;
+  align-items: center;
+  gap: 0.5rem;
+  padding: 0.5rem 0;
+  cursor: pointer;
+}
+
+.text {
+  color: inherit;
+}
+
+.done {
+  color: #9ca3af;
+  text-decoration: line-through;
+}
+"""
+
+_FRONTEND = {"list": (_TSX_LIST, _CSS_LIST), "form": (_TSX_FORM, _CSS_FORM), "checkbox": (_TSX_CHECKBOX, _CSS_CHECKBOX)}
+
+
+def render_frontend(match: TemplateMatch) -> dict:
+    """Renders a frontend match as a frontend agent response (`component_name`, `tsx_code`, `css_code`)."""
+    display = next(name for name, kind in match.fields if kind == "str")
+    flags = [name for name, kind in match.fields if kind == "bool"]
+    values = {
+        "__Component__": match.component,
+        "__ts_fields__": "".join(f"  {name}: {_TS_TYPES[kind]};\n" for name, kind in match.fields),
+        "__item_class__": f"{match.resource}.{flags[0]} ? styles.done : styles.item" if flags else "styles.item",
+        "__Display__": _pascal(display),
+        "__display_label__": display.replace("_", " "),
+        "__display__": display,
+        **_names(match),
+    }
+    values["__Models__"] = _pascal(values["__models__"])
+    if match.pattern == "checkbox":
+        if not flags:
+            raise ValueError("A checkbox template needs a boolean field.")
+        values = {"__Flag__": _pascal(flags[0]), "__flag__": flags[0], **values}
+    tsx, css = _FRONTEND[match.pattern]
+    return {"component_name": match.component, "tsx_code": _substitute(tsx, values), "css_code": css}
+
+
+def render(kind: str, task: str) -> Optional[tuple]:
+    """
+    Renders `task` from a template if the classifier recognizes it.
+
+    Backend code follows the selected backend profile (see
+    `backend_agent.configure_profile`).
+
+    Returns:
+        A `(pattern, code_data)` tuple, where `code_data` has the same keys as
+        the agent's response, or None if the task needs the model (or the fast
+        path is disabled).
+    """
+    if not _enabled:
+        return None
+    match = classify(kind, task)
+    if match is None:
+        return None
+    if kind == "backend":
+        return match.pattern, render_backend(match, get_profile())
+    return match.pattern, render_frontend(match)
+
+
+class _TemplateStats:
+    """Thread-safe counts of the tasks that took the template fast path."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.tasks = 0
+        self.templated = {}
+
+    def record(self, kind: str, pattern: Optional[str]) -> None:
+        """Records one task; `pattern` is None when it went to the model."""
+        with self._lock:
+            self.tasks += 1
+            if pattern is not None:
+                key = f"{kind}:{pattern}"
+                self.templated[key] = self.templated.get(key, 0) + 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            templated = sum(self.templated.values())
+            return {
+                "tasks": self.tasks,
+                "templated": templated,
+                "templated_rate": templated / self.tasks if self.tasks else 0.0,
+                "patterns": dict(sorted(self.templated.items())),
+            }
+
+
+template_stats = _TemplateStats()
+
+
+def template_report() -> str:
+    stats = template_stats.as_dict()
+    patterns = ", ".join(f"{key} {count}" for key, count in stats["patterns"].items())
+    return (
+        f"Template fast path: {stats['templated']} of {stats['tasks']} task(s) "
+        f"({stats['templated_rate']:.0%}) rendered locally" + (f" ({patterns})." if patterns else ".")
+    )
+
+
+_enabled = TEMPLATES_ENABLED
+
+
+def configure_templates(enabled: bool) -> None:
+    """Turns the template fast path on or off for the whole process."""
+    global _enabled
+    _enabled = enabled
@@ -0,0 +1,345 @@
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional
+
+from env_config import env_float
+from stage_timer import get_stage_timer, percentile
+
+# Span attributes summarized in the run report, with their Prometheus metric names.
+DURATION_METRICS = {
+    "duration_s": "duration_seconds",
+    "queue_wait_s": "queue_wait_seconds",
+    "rate_limit_wait_s": "rate_limit_wait_seconds",
+    "latency_s": "model_latency_seconds",
+    "ttft_s": "time_to_first_token_seconds",
+    "parsing_s": "parse_seconds",
+    "write_s": "write_seconds",
+}
+COUNTER_METRICS = {
+    "prompt_tokens": "prompt_tokens_total",
+    "response_tokens": "response_tokens_total",
+    "retries": "retries_total",
+    "cost_usd": "cost_usd_total",
+}
+# Optional USD prices per million prompt / response tokens, used to estimate each call's cost.
+PROMPT_PRICE_PER_MTOK = env_float("PROMPT_PRICE_PER_MTOK", 0.0)
+RESPONSE_PRICE_PER_MTOK = env_float("RESPONSE_PRICE_PER_MTOK", 0.0)
+
+
+class Span:
+    """
+    One timed operation (a task, a batch or a model call) and its attributes.
+
+    Times are wall-clock epoch seconds so spans can be exported as-is. Numeric
+    attributes may be accumulated with `add` from any thread, e.g. the write
+    time of a task's files, which the background writer reports after the
+    task itself has returned.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, **attributes):
+        self.name = name
+        self.span_id = next(Span._ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start = time.time()
+        self.end = None
+        self.outcome = None
+        self.attributes = dict(attributes)
+        self._lock = threading.Lock()
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self.attributes[key] = value
+
+    def add(self, key: str, amount: float) -> None:
+        with self._lock:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def finish(self, outcome: str = "ok") -> None:
+        self.outcome = outcome
+        self.end = time.time()
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.time()) - self.start
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            attributes = dict(self.attributes)
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "end": self.end,
+            "duration_s": self.duration,
+            "outcome": self.outcome,
+            **attributes,
+        }
+
+
+class Telemetry:
+    """Collects the spans of a run and turns them into reports."""
+
+    def __init__(self):
+        self._spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def current_span(self) -> Optional[Span]:
+        """Returns the innermost open span of the calling thread, if any."""
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    def open_span(self, name: str, parent: Optional[Span] = None, **attributes) -> Span:
+        """
+        Starts a span under `parent` (default: the thread's current span) without making it current.
+
+        For work that cannot be a `with` block, such as a generator that yields
+        to its caller; the caller must call `finish` on it.
+        """
+        span = Span(name, parent=parent or self.current_span(), **attributes)
+        with self._lock:
+            self._spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attributes):
+        """
+        Opens a span for the enclosed block, nested under `parent` or the thread's current span.
+
+        The outcome is "ok", or the exception's class name if the block raises.
+        """
+        span = self.open_span(name, parent=parent, **attributes)
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.finish(type(e).__name__)
+            raise
+        else:
+            span.finish()
+        finally:
+            stack.pop()
+
+    def traced(self, name: str, fn: Callable, **attributes) -> Callable:
+        """
+        Wraps `fn` to run in its own span, measuring how long it waited to start.
+
+        Call this when the work is queued (e.g. submitted to a thread pool): the
+        time until the wrapper actually runs is recorded as `queue_wait_s`, and
+        the span is nested under the span that was current when it was queued.
+        """
+        queued = time.time()
+        parent = self.current_span()
+
+        def run(*args, **kwargs):
+            with self.span(name, parent=parent, **attributes) as span:
+                span.set("queue_wait_s", span.start - queued)
+                return fn(*args, **kwargs)
+        return run
+
+    def spans(self) -> list:
+        with self._lock:
+            return list(self._spans)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+    def summary(self) -> dict:
+        """
+        Aggregates finished spans by name (and by `kind`, when spans have one).
+
+        Returns:
+            A dict mapping e.g. "task/frontend" or "model_call" to counts, an
+            outcome breakdown, p50/p95/total of every duration attribute and the
+            totals of the token and retry counters.
+        """
+        groups = {}
+        for span in self.spans():
+            if span.end is None:
+                continue
+            data = span.as_dict()
+            key = f"{span.name}/{data['kind']}" if data.get("kind") else span.name
+            groups.setdefault(key, []).append(data)
+
+        summary = {}
+        for key, spans in sorted(groups.items()):
+            outcomes = {}
+            for data in spans:
+                outcomes[data["outcome"]] = outcomes.get(data["outcome"], 0) + 1
+            entry = {"count": len(spans), "outcomes": outcomes}
+            for attribute in DURATION_METRICS:
+                values = [data[attribute] for data in spans if attribute in data]
+                if values:
+                    entry[attribute] = {
+                        "p50": percentile(values, 50),
+                        "p95": percentile(values, 95),
+                        "total": sum(values),
+                    }
+            for attribute in COUNTER_METRICS:
+                values = [data[attribute] for data in spans if attribute in data]
+                if values:
+                    entry[attribute] = sum(values)
+            summary[key] = entry
+        return summary
+
+    def report(self, run_id: Optional[str] = None, slowest: int = 10) -> dict:
+        """Returns the JSON run report: the summary, the slowest tasks and every span."""
+        spans = [span.as_dict() for span in self.spans()]
+        tasks = sorted((span for span in spans if span["name"] == "task"), key=lambda span: -span["duration_s"])
+        return {
+            "run_id": run_id,
+            "summary": self.summary(),
+            "slowest_tasks": tasks[:slowest],
+            "spans": spans,
+        }
+
+    def prometheus(self, prefix: str = "agent") -> str:
+        """Renders the summary in the Prometheus text exposition format."""
+        lines = []
+        summary = self.summary()
+
+        def labels_for(key: str) -> dict:
+            name, _, kind = key.partition("/")
+            return {"span": name, **({"kind": kind} if kind else {})}
+
+        def render(labels: dict) -> str:
+            return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+        metric = f"{prefix}_spans_total"
+        lines += [f"# HELP {metric} Finished spans by outcome.", f"# TYPE {metric} counter"]
+        for key, entry in summary.items():
+            for outcome, count in entry["outcomes"].items():
+                lines.append(f"{metric}{render({**labels_for(key), 'outcome': outcome})} {count}")
+
+        for attribute, suffix in DURATION_METRICS.items():
+            metric = f"{prefix}_{suffix}"
+            rows = [(key, entry[attribute]) for key, entry in summary.items() if attribute in entry]
+            if not rows:
+                continue
+            lines += [f"# HELP {metric} Span {attribute[:-2].replace('_', ' ')} in seconds.",
+                      f"# TYPE {metric} summary"]
+            for key, stats in rows:
+                labels = labels_for(key)
+                lines.append(f"{metric}{render({**labels, 'quantile': '0.5'})} {stats['p50']:.6f}")
+                lines.append(f"{metric}{render({**labels, 'quantile': '0.95'})} {stats['p95']:.6f}")
+                lines.append(f"{metric}_sum{render(labels)} {stats['total']:.6f}")
+                lines.append(f"{metric}_count{render(labels)} {summary[key]['count']}")
+
+        for attribute, suffix in COUNTER_METRICS.items():
+            metric = f"{prefix}_{suffix}"
+            rows = [(key, entry[attribute]) for key, entry in summary.items() if attribute in entry]
+            if not rows:
+                continue
+            lines += [f"# HELP {metric} Total {attribute.replace('_', ' ')}.", f"# TYPE {metric} counter"]
+            for key, total in rows:
+                lines.append(f"{metric}{render(labels_for(key))} {total}")
+        return "\n".join(lines) + "\n"
+
+    def write_reports(self, directory: Path, run_id: str) -> tuple:
+        """
+        Writes `<run_id>.metrics.json` and `<run_id>.prom` to `directory`.
+
+        Returns:
+            The paths of the JSON report and the Prometheus file.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        json_path = directory / f"{run_id}.metrics.json"
+        prom_path = directory / f"{run_id}.prom"
+        json_path.write_text(json.dumps(self.report(run_id), indent=2, default=str), encoding="utf-8")
+        prom_path.write_text(self.prometheus(), encoding="utf-8")
+        return json_path, prom_path
+
+    def export_otel(self, service_name: str = "ai-product-manager") -> int:
+        """
+        Sends every finished span to an OTLP endpoint through the OpenTelemetry SDK.
+
+        The endpoint and headers come from the standard `OTEL_EXPORTER_OTLP_*`
+        environment variables. The SDK is imported only here, so it stays an
+        optional dependency.
+
+        Returns:
+            The number of spans exported.
+
+        Raises:
+            RuntimeError: If the OpenTelemetry SDK or OTLP exporter is not installed.
+        """
+        try:
+            from opentelemetry import trace
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        except ImportError as e:
+            raise RuntimeError(
+                "OpenTelemetry export needs `pip install opentelemetry-sdk opentelemetry-exporter-otlp-proto-http`."
+            ) from e
+
+        provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", service_name)}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        tracer = provider.get_tracer(__name__)
+
+        finished = sorted((span for span in self.spans() if span.end is not None), key=lambda span: span.start)
+        exported = {}
+        for span in finished:
+            parent = exported.get(span.parent_id)
+            context = trace.set_span_in_context(parent) if parent is not None else None
+            attributes = {
+                key: value for key, value in span.as_dict().items()
+                if key not in ("name", "start", "end") and isinstance(value, (str, bool, int, float))
+            }
+            exported[span.span_id] = tracer.start_span(
+                span.name, context=context, start_time=int(span.start * 1e9), attributes=attributes
+            )
+        for span in finished:
+            exported[span.span_id].end(end_time=int(span.end * 1e9))
+        provider.shutdown()
+        return len(finished)
+
+
+_telemetry = Telemetry()
+
+
+def get_telemetry() -> Telemetry:
+    """Returns the process-wide telemetry collector."""
+    return _telemetry
+
+
+def current_span() -> Optional[Span]:
+    """Shortcut for `get_telemetry().current_span()`."""
+    return _telemetry.current_span()
+
+
+def span(name: str, **attributes):
+    """Shortcut for `get_telemetry().span(name, ...)`."""
+    return _telemetry.span(name, **attributes)
+
+
+def traced(name: str, fn: Callable, **attributes) -> Callable:
+    """Shortcut for `get_telemetry().traced(name, fn, ...)`."""
+    return _telemetry.traced(name, fn, **attributes)
+
+
+def estimate_cost(prompt_tokens: int, response_tokens: int) -> float:
+    """Returns the estimated USD cost of a call, or 0.0 if no token prices are configured."""
+    return (prompt_tokens * PROMPT_PRICE_PER_MTOK + response_tokens * RESPONSE_PRICE_PER_MTOK) / 1e6
+
+
+def _record_stage(name: str, seconds: float) -> None:
+    # Pipeline stages (generation, parsing, ...) also count towards the current span.
+    current = _telemetry.current_span()
+    if current is not None:
+        current.add(f"{name}_s", seconds)
+
+
+get_stage_timer().add_listener(_record_stage)
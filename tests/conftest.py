@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The modules under test live at the top level of the repository.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def offline(tmp_path, monkeypatch):
+    """
+    Sends model calls to a fresh stub provider, with a response cache under `tmp_path`, no rate limit and no
+    artifact index.
+
+    Returns:
+        The stub provider; tests may change its settings.
+    """
+    import artifact_index
+    import model_providers
+    import rate_limiter
+    import response_cache
+
+    provider = model_providers.StubProvider()
+    monkeypatch.setattr(model_providers, "_provider", provider)
+    monkeypatch.setattr(response_cache, "_cache", response_cache.ResponseCache(tmp_path / "cache"))
+    monkeypatch.setattr(rate_limiter, "_limiter", rate_limiter.RateLimiter(rpm=1e6, tpm=1e9, max_retries=0))
+    monkeypatch.setattr(artifact_index, "_index", artifact_index.ArtifactIndex(tmp_path / "artifacts", enabled=False))
+    return provider
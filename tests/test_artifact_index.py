@@ -0,0 +1,65 @@
+from artifact_index import ArtifactIndex, identifiers
+
+MODEL = "stub:test"
+TASK = "Create a `GET /api/tasks` endpoint that lists all tasks."
+CODE = {"filename": "routes/tasks.py", "python_code": "def list_tasks():\n    return []\n"}
+OTHER_TASK = "Create a `POST /api/notes` endpoint that stores a note."
+OTHER_CODE = {"filename": "routes/notes.py", "python_code": "def create_note(note):\n    return note\n"}
+
+
+def make_index(tmp_path, **kwargs):
+    index = ArtifactIndex(tmp_path / "artifacts.sqlite3", enabled=True, **kwargs)
+    index.add("backend", TASK, CODE, "default", MODEL)
+    index.add("backend", OTHER_TASK, OTHER_CODE, "default", MODEL)
+    return index
+
+
+def test_identical_task_is_reused(tmp_path):
+    match = make_index(tmp_path).lookup("backend", TASK, "default", MODEL)
+    assert match.task == TASK and match.reusable
+    assert match.code == CODE
+
+
+def test_index_persists_across_instances(tmp_path):
+    make_index(tmp_path)
+    reopened = ArtifactIndex(tmp_path / "artifacts.sqlite3", enabled=True)
+    assert len(reopened) == 2
+    assert reopened.lookup("backend", TASK, "default", MODEL).reusable
+
+
+def test_different_method_or_path_is_never_reused(tmp_path):
+    index = make_index(tmp_path, reference_threshold=0.0)
+    for task in ("Create a `DELETE /api/tasks` endpoint that lists all tasks.",
+                 "Create a `GET /api/todos` endpoint that lists all tasks."):
+        match = index.lookup("backend", task, "default", MODEL)
+        assert match is None or not match.reusable
+
+
+def test_matches_are_scoped_by_kind_model_and_profile(tmp_path):
+    index = make_index(tmp_path)
+    assert index.lookup("frontend", TASK, "", MODEL) is None
+    assert index.lookup("backend", TASK, "default", "gemini:other") is None
+    assert index.lookup("backend", TASK, "performance", MODEL) is None
+
+
+def test_rebuild_never_reuses_or_offers_the_task_itself(tmp_path):
+    make_index(tmp_path)
+    index = ArtifactIndex(tmp_path / "artifacts.sqlite3", enabled=True, rebuild=True, reference_threshold=0.0)
+    match = index.lookup("backend", TASK, "default", MODEL)
+    assert match is None or (match.task != TASK and not match.reusable)
+    similar = index.lookup("backend", "Create a `GET /api/tasks` endpoint that lists every task.", "default", MODEL)
+    assert similar is not None and similar.task == TASK and not similar.reusable
+
+
+def test_disabled_index_finds_nothing(tmp_path):
+    index = ArtifactIndex(tmp_path / "artifacts.sqlite3", enabled=False)
+    index.add("backend", TASK, CODE, "default", MODEL)
+    assert index.lookup("backend", TASK, "default", MODEL) is None
+    assert not (tmp_path / "artifacts.sqlite3").exists()
+
+
+def test_identifiers():
+    code = {"component_name": "TaskList", "tsx_code": "interface Props {}\nconst TaskList = () => null;",
+            "css_code": ""}
+    assert identifiers("frontend", code) == ["TaskList", "Props"]
+    assert identifiers("backend", CODE) == ["tasks", "list_tasks"]
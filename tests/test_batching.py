@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from batching import BatchedWorker, BatchSizer
+
+
+def test_batches_fit_the_output_limit():
+    sizer = BatchSizer(max_batch_size=10, initial_tokens_per_task=1000, max_output_tokens=8192, headroom=0.8)
+    assert sizer.next_size() == 6
+    assert BatchSizer(4, 1000, 8192).next_size() == 4
+    assert BatchSizer(10, 20000, 8192).next_size() == 1
+
+
+def test_sizer_learns_from_responses():
+    sizer = BatchSizer(max_batch_size=10, initial_tokens_per_task=1000, max_output_tokens=8192, headroom=0.8)
+    sizer.record(output_tokens=12000, task_count=4)
+    assert sizer.tokens_per_task == pytest.approx(0.7 * 1000 + 0.3 * 3000)
+    assert sizer.next_size() == 4
+    sizer.record(output_tokens=100, task_count=0)
+    assert sizer.tokens_per_task == pytest.approx(1600)
+
+
+def run(worker, tasks, concurrency=1):
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = worker.submit_all(executor, tasks, concurrency)
+        return [future.exception(timeout=5) or future.result() for future in futures]
+
+
+def test_tasks_are_packed_into_batches():
+    batches, singles = [], []
+
+    def batch_fn(tasks):
+        batches.append(list(tasks))
+        return [task.upper() for task in tasks]
+
+    worker = BatchedWorker(batch_fn, lambda task: singles.append(task) or task.upper(), BatchSizer(2, 1))
+    assert run(worker, ["a", "b", "c", "d", "e"]) == ["A", "B", "C", "D", "E"]
+    assert batches == [["a", "b"], ["c", "d"]]
+    # A batch of one is sent as a single call.
+    assert singles == ["e"]
+
+
+def test_failed_items_are_retried_on_their_own():
+    singles = []
+
+    def batch_fn(tasks):
+        return [ValueError("bad item") if task == "b" else task.upper() for task in tasks]
+
+    worker = BatchedWorker(batch_fn, lambda task: singles.append(task) or f"single {task}", BatchSizer(3, 1))
+    assert run(worker, ["a", "b", "c"]) == ["A", "single b", "C"]
+    assert singles == ["b"]
+
+
+def test_a_failed_batch_is_split_into_single_calls(capsys):
+    def batch_fn(tasks):
+        raise RuntimeError("response was not an array")
+
+    def single_fn(task):
+        if task == "b":
+            raise KeyError(task)
+        return task.upper()
+
+    outcomes = run(BatchedWorker(batch_fn, single_fn, BatchSizer(3, 1)), ["a", "b", "c"])
+    assert outcomes[0] == "A" and outcomes[2] == "C"
+    assert isinstance(outcomes[1], KeyError)
+    assert "splitting it into single calls" in capsys.readouterr().out
+
+
+def test_every_task_gets_an_outcome_with_several_workers():
+    worker = BatchedWorker(lambda tasks: [task * 2 for task in tasks], lambda task: task * 2, BatchSizer(3, 1))
+    tasks = [str(number) for number in range(20)]
+    assert run(worker, tasks, concurrency=4) == [task * 2 for task in tasks]
@@ -0,0 +1,63 @@
+from brief_sections import brief_overview, merge_plans, split_brief
+
+BRIEF = """\
+# Task tracker
+
+A small app for tracking tasks.
+
+## Backend
+
+Store tasks in SQLite. Expose a REST API.
+
+## Frontend
+
+Show the tasks in a list. Add a form for new tasks.
+"""
+
+
+def test_short_briefs_are_planned_whole():
+    assert split_brief(BRIEF, max_chars=10000) == [BRIEF]
+    assert split_brief(BRIEF, max_chars=0) == [BRIEF]
+
+
+def test_briefs_are_split_at_headings_and_packed():
+    sections = split_brief(BRIEF, max_chars=80)
+    assert sections == [
+        "# Task tracker\n\nA small app for tracking tasks.",
+        "## Backend\n\nStore tasks in SQLite. Expose a REST API.",
+        "## Frontend\n\nShow the tasks in a list. Add a form for new tasks.",
+    ]
+    assert split_brief(BRIEF, max_chars=120) == [
+        "# Task tracker\n\nA small app for tracking tasks.\n\n## Backend\n\nStore tasks in SQLite. Expose a REST API.",
+        "## Frontend\n\nShow the tasks in a list. Add a form for new tasks.",
+    ]
+
+
+def test_long_blocks_are_cut_at_finer_boundaries():
+    brief = "First paragraph here.\n\nSecond one. It has two sentences."
+    assert split_brief(brief, max_chars=25) == ["First paragraph here.", "Second one.", "It has two sentences."]
+    assert split_brief("x" * 25, max_chars=10) == ["x" * 10, "x" * 10, "x" * 5]
+    for section in split_brief(BRIEF * 20, max_chars=100):
+        assert len(section) <= 100
+
+
+def test_overview_keeps_the_title_with_its_first_paragraph():
+    assert brief_overview(BRIEF) == "# Task tracker\n\nA small app for tracking tasks."
+    assert brief_overview("Just a paragraph.\n\nMore.") == "Just a paragraph."
+    assert brief_overview("one two three four five", max_chars=12) == "one two ..."
+
+
+def test_merged_plans_renumber_dependencies():
+    first = {"frontend_tasks": ["list"], "backend_tasks": ["model", "api"], "dependencies": {"F1": ["B2"], "B2": ["B1"]}}
+    second = {"frontend_tasks": ["form", "page"], "backend_tasks": ["auth"], "dependencies": {"F2": ["F1", "B1"]}}
+    assert merge_plans([first, second]) == {
+        "frontend_tasks": ["list", "form", "page"],
+        "backend_tasks": ["model", "api", "auth"],
+        "dependencies": {"F1": ["B2"], "B2": ["B1"], "F3": ["F2", "B3"]},
+    }
+
+
+def test_merged_plans_without_dependencies():
+    assert merge_plans([{"frontend_tasks": ["a"]}, {"backend_tasks": ["b"]}]) == {
+        "frontend_tasks": ["a"], "backend_tasks": ["b"],
+    }
@@ -0,0 +1,80 @@
+import main
+from build_manifest import MANIFEST_FILENAME, BuildManifest, task_fingerprint
+from response_cache import get_response_cache
+
+
+def test_fingerprint_covers_every_input():
+    base = task_fingerprint("backend", "prompt", "stub:model")
+    assert base == task_fingerprint("backend", "prompt", "stub:model", ())
+    assert len({
+        base,
+        task_fingerprint("frontend", "prompt", "stub:model"),
+        task_fingerprint("backend", "prompt 2", "stub:model"),
+        task_fingerprint("backend", "prompt", "gemini:model"),
+        task_fingerprint("backend", "prompt", "stub:model", ("upstream",)),
+    }) == 5
+    assert task_fingerprint("backend", "p", "m", ("a", "b")) == task_fingerprint("backend", "p", "m", ("b", "a"))
+
+
+def write(root, name):
+    path = root / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(name, encoding="utf-8")
+    return path
+
+
+def test_record_save_and_reload(tmp_path):
+    manifest = BuildManifest(tmp_path)
+    manifest.record("f1", "frontend", "task", [write(tmp_path, "frontend/A.tsx"), write(tmp_path, "frontend/A.css")])
+    manifest.save()
+    reloaded = BuildManifest(tmp_path)
+    assert reloaded.entries["f1"]["files"] == ["frontend/A.css", "frontend/A.tsx"]
+    assert reloaded.is_up_to_date("f1")
+    assert not reloaded.is_up_to_date("f2")
+    (tmp_path / "frontend/A.css").unlink()
+    assert not reloaded.is_up_to_date("f1")
+
+
+def test_unreadable_manifest_is_ignored(tmp_path, capsys):
+    (tmp_path / MANIFEST_FILENAME).write_text("{not json", encoding="utf-8")
+    assert BuildManifest(tmp_path).entries == {}
+    assert "Ignoring unreadable build manifest" in capsys.readouterr().out
+
+
+def test_prune_deletes_only_files_of_tasks_that_left_the_plan(tmp_path):
+    manifest = BuildManifest(tmp_path)
+    manifest.record("old", "backend", "old task", [write(tmp_path, "backend/routes/old.py"),
+                                                   write(tmp_path, "backend/shared.py")])
+    manifest.record("new", "backend", "new task", [write(tmp_path, "backend/new.py"), tmp_path / "backend/shared.py"])
+    assert manifest.prune({"new"}) == ["backend/routes/old.py"]
+    assert list(manifest.entries) == ["new"]
+    assert not (tmp_path / "backend/routes").exists()
+    assert (tmp_path / "backend/shared.py").exists() and (tmp_path / "backend/new.py").exists()
+    assert manifest.prune(set()) and not (tmp_path / "backend").exists()
+    assert tmp_path.exists()
+
+
+PLAN = {
+    "frontend_tasks": ["Create a TaskList component that displays tasks."],
+    "backend_tasks": ["Create a `GET /api/tasks` endpoint that lists tasks."],
+}
+
+
+def test_unchanged_tasks_are_skipped_and_removed_ones_pruned(offline, tmp_path, capsys):
+    output = tmp_path / "output"
+    main.generate_project(PLAN, output_root=output, incremental=True, validation_rounds=None)
+    manifest = BuildManifest(output)
+    backend_files = [name for entry in manifest.entries.values() if entry["kind"] == "backend" for name in entry["files"]]
+    assert backend_files and all((output / name).exists() for name in backend_files)
+    calls = offline.calls
+    lookups = get_response_cache().hits + get_response_cache().misses
+
+    capsys.readouterr()
+    main.generate_project(PLAN, output_root=output, incremental=True, validation_rounds=None)
+    assert "Skipping 1 frontend task(s)" in capsys.readouterr().out
+    assert offline.calls == calls
+    assert get_response_cache().hits + get_response_cache().misses == lookups
+
+    main.generate_project({**PLAN, "backend_tasks": []}, output_root=output, incremental=True, validation_rounds=None)
+    assert not any((output / name).exists() for name in backend_files)
+    assert all(entry["kind"] == "frontend" for entry in BuildManifest(output).entries.values())
@@ -0,0 +1,94 @@
+from code_validator import check_css, check_python, check_script, css_classes, module_index, validate_files
+
+
+def backend(tmp_path, files):
+    root = tmp_path / "backend"
+    for name, text in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return root
+
+
+def test_module_index_covers_modules_and_packages(tmp_path):
+    root = backend(tmp_path, {"main.py": "", "routers/__init__.py": "", "routers/tasks.py": "", "core/config.py": ""})
+    assert set(module_index(root)) == {"main", "routers", "routers.tasks", "core", "core.config"}
+
+
+def test_valid_imports_pass(tmp_path):
+    root = backend(tmp_path, {
+        "crud.py": "import os\n\ndef get_task(): pass\n",
+        "routers/tasks.py": (
+            "import json\nimport crud\nfrom fastapi import APIRouter\nfrom database import get_db\n"
+            "from ..crud import get_task\ntry:\n    import not_installed_anywhere\nexcept ImportError:\n    pass\n"
+            "router = APIRouter()\ncrud.get_task()\n"
+        ),
+    })
+    assert check_python(root / "routers/tasks.py", root, module_index(root)) == []
+
+
+def test_broken_imports_are_reported(tmp_path):
+    root = backend(tmp_path, {
+        "crud.py": "def get_task(): pass\n",
+        "main.py": (
+            "import crud\nfrom crud import delete_task\nfrom routers import tasks\n"
+            "import not_installed_anywhere\nfrom .. import x\ncrud.list_tasks()\n"
+        ),
+    })
+    errors = check_python(root / "main.py", root, module_index(root))
+    assert errors == [
+        "line 2: 'delete_task' is not defined in module 'crud'.",
+        "line 3: module 'routers' is neither in the generated code nor a known dependency.",
+        "line 4: module 'not_installed_anywhere' is neither in the generated code nor a known dependency.",
+        "line 5: relative import '..' goes above the top of the generated code.",
+        "line 6: module 'crud' has no attribute 'list_tasks'.",
+    ]
+
+
+def test_syntax_errors_are_reported(tmp_path):
+    root = backend(tmp_path, {"main.py": "def broken(:\n"})
+    [error] = check_python(root / "main.py", root, module_index(root))
+    assert error.startswith("SyntaxError") and "line 1" in error
+
+
+def test_scripts_need_balanced_brackets_exports_and_real_imports(tmp_path):
+    (tmp_path / "TaskList.module.css").write_text(".list { color: red }\n/* .ghost {} */\n")
+    good = tmp_path / "TaskList.tsx"
+    good.write_text(
+        "import styles from './TaskList.module.css';\n"
+        "// don't count this apostrophe\n"
+        "export default function TaskList() { return <ul className={styles.list}>{`${1}`}</ul>; }\n"
+    )
+    assert check_script(good) == []
+
+    bad = tmp_path / "Bad.tsx"
+    bad.write_text(
+        "import styles from './TaskList.module.css';\nimport Missing from './Missing';\n"
+        "function Bad() { return <div className={styles.ghost}>; \n"
+    )
+    assert check_script(bad) == [
+        "Unbalanced brackets: '{' opened on line 3 is never closed.",
+        "The file does not export anything.",
+        "Import './Missing' does not match any generated file.",
+        "Class '.ghost' is used but not defined in './TaskList.module.css'.",
+    ]
+
+
+def test_css_checks(tmp_path):
+    assert css_classes(".a, .b:hover { color: #fff } @media (x) { .c-d { margin: 0.5em } }") == {"a", "b", "c-d"}
+    good, bad = tmp_path / "good.css", tmp_path / "bad.css"
+    good.write_text(".a { content: '}'; }\n")
+    bad.write_text(".a { color: red;\n")
+    assert check_css(good) == []
+    assert check_css(bad) == ["Unbalanced CSS: '{' opened on line 1 is never closed."]
+
+
+def test_validate_files_reports_only_failures(tmp_path):
+    backend(tmp_path, {"crud.py": "def get_task(): pass\n", "main.py": "from crud import nope\n"})
+    (tmp_path / "frontend").mkdir()
+    (tmp_path / "frontend" / "App.tsx").write_text("export default function App() { return null; }\n")
+    files = [tmp_path / "backend/crud.py", tmp_path / "backend/main.py", tmp_path / "frontend/App.tsx",
+             tmp_path / "missing.py"]
+    assert validate_files(files, tmp_path, workers=2) == {
+        tmp_path / "backend/main.py": ["line 1: 'nope' is not defined in module 'crud'."],
+    }
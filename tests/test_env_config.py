@@ -0,0 +1,33 @@
+import pytest
+
+import env_config
+from env_config import EnvConfigError, check_env, env_choice, env_float, env_int
+
+
+@pytest.fixture(autouse=True)
+def fresh_settings(monkeypatch):
+    monkeypatch.setattr(env_config, "_invalid", {})
+
+
+def test_valid_and_missing_settings(monkeypatch):
+    monkeypatch.setenv("TEST_INT", "7")
+    monkeypatch.setenv("TEST_FLOAT", "0.25")
+    monkeypatch.setenv("TEST_CHOICE", "off")
+    monkeypatch.setenv("TEST_EMPTY", " ")
+    assert env_int("TEST_INT", 1) == 7
+    assert env_float("TEST_FLOAT", 1.0) == 0.25
+    assert env_choice("TEST_CHOICE", "on", ("on", "off")) == "off"
+    assert env_int("TEST_EMPTY", 3) == 3
+    assert env_choice("TEST_MISSING", "on", ("on", "off")) == "on"
+    check_env()
+
+
+def test_invalid_settings_fall_back_and_are_reported(monkeypatch):
+    monkeypatch.setenv("TEST_INT", "many")
+    monkeypatch.setenv("TEST_CHOICE", "maybe")
+    assert env_int("TEST_INT", 1) == 1
+    assert env_choice("TEST_CHOICE", "on", ("on", "off", "replay")) == "on"
+    with pytest.raises(EnvConfigError) as error:
+        check_env()
+    assert "TEST_INT='many' is not an integer" in str(error.value)
+    assert "TEST_CHOICE='maybe' is not one of: on, off, replay" in str(error.value)
@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+from fair_scheduler import FairScheduler
+
+
+def test_projects_are_served_in_turn():
+    order = []
+    gate = threading.Event()
+    with FairScheduler(1) as scheduler:
+        # Hold the only worker so both queues fill up before anything runs.
+        blocker = scheduler.submit("setup", gate.wait)
+        big = [scheduler.submit("big", order.append, f"big-{i}") for i in range(4)]
+        small = [scheduler.submit("small", order.append, f"small-{i}") for i in range(2)]
+        gate.set()
+        for future in [blocker, *big, *small]:
+            future.result(timeout=5)
+    assert order == ["big-0", "small-0", "big-1", "small-1", "big-2", "big-3"]
+
+
+def test_results_and_errors_reach_the_futures():
+    with FairScheduler(2) as scheduler:
+        executor = scheduler.executor_for("app")
+        ok = executor.submit(lambda a, b=0: a + b, 1, b=2)
+        failed = executor.submit(lambda: 1 / 0)
+        assert ok.result(timeout=5) == 3
+        assert isinstance(failed.exception(timeout=5), ZeroDivisionError)
+    assert executor.project == "app"
+
+
+def test_cancelled_jobs_are_skipped():
+    ran = []
+    gate = threading.Event()
+    with FairScheduler(1) as scheduler:
+        blocker = scheduler.submit("a", gate.wait)
+        cancelled = scheduler.submit("a", ran.append, "cancelled")
+        kept = scheduler.submit("a", ran.append, "kept")
+        assert cancelled.cancel()
+        gate.set()
+        blocker.result(timeout=5)
+        kept.result(timeout=5)
+    assert ran == ["kept"]
+
+
+def test_shutdown_runs_queued_work_and_refuses_more():
+    ran = []
+    scheduler = FairScheduler(2)
+    for i in range(5):
+        scheduler.submit(f"p{i % 2}", ran.append, i)
+    scheduler.shutdown()
+    assert sorted(ran) == [0, 1, 2, 3, 4]
+    assert not any(thread.is_alive() for thread in scheduler._threads)
+    with pytest.raises(RuntimeError, match="shut down"):
+        scheduler.submit("p0", ran.append, 5)
+
+
+def test_concurrency_is_at_least_one():
+    with FairScheduler(0) as scheduler:
+        assert scheduler.concurrency == 1
+        assert scheduler.submit("a", lambda: "done").result(timeout=5) == "done"
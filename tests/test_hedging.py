@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+from hedging import HedgingPolicy
+
+
+class SlowThenFast:
+    """The first request hangs until it is cancelled; later ones answer at once."""
+
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, cancel):
+        with self.lock:
+            self.calls += 1
+            number = self.calls
+        if number == 1:
+            assert cancel.wait(5)
+            return "slow"
+        return "fast"
+
+
+def warmed_up(**kwargs) -> HedgingPolicy:
+    policy = HedgingPolicy(enabled=True, min_samples=2, **kwargs)
+    policy.record("agent", 0.01)
+    policy.record("agent", 0.02)
+    return policy
+
+
+def test_no_hedging_when_disabled_or_still_learning():
+    policy = HedgingPolicy(enabled=True, min_samples=2)
+    policy.record("agent", 0.01)
+    assert policy.delay("agent") is None
+    assert policy.call("agent", lambda cancel: "answer") == "answer"
+    assert policy.delay("agent") is not None
+    assert HedgingPolicy().call("agent", lambda cancel: "answer") == "answer"
+    assert policy.stats()["hedges"] == 0
+
+
+def test_a_slow_call_is_hedged_and_the_loser_discarded():
+    discarded = []
+    done = threading.Event()
+    policy = warmed_up(budget=1.0)
+    fn = SlowThenFast()
+
+    result = policy.call("agent", fn, discard=lambda late: discarded.append(late) or done.set())
+
+    assert result == "fast"
+    assert done.wait(5)
+    assert discarded == ["slow"]
+    assert policy.stats() == {"calls": 1, "hedges": 1, "hedge_wins": 1, "over_budget": 0,
+                              "extra_request_rate": 1.0}
+
+
+def test_hedges_stay_within_the_budget():
+    policy = warmed_up(budget=0.5)
+    # The first slow call would exceed the budget (1 hedge > 0.5 * 1 call) and just waits.
+    assert policy.call("agent", lambda cancel: cancel.wait(0.1) and "never" or "primary") == "primary"
+    assert policy.call("agent", SlowThenFast()) == "fast"
+    stats = policy.stats()
+    assert (stats["calls"], stats["hedges"], stats["over_budget"]) == (2, 1, 1)
+    assert "1 skipped over budget" in policy.report()
+
+
+def test_an_error_in_one_request_does_not_beat_the_other():
+    attempts = []
+
+    def fn(cancel):
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            cancel.wait(0.2)
+            raise ConnectionError("primary dropped")
+        return "hedge"
+
+    assert warmed_up(budget=1.0).call("agent", fn) == "hedge"
+
+
+def test_the_first_error_is_raised_when_both_requests_fail():
+    attempts = []
+
+    def fn(cancel):
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            cancel.wait(0.2)
+            raise ConnectionError("primary dropped")
+        raise TimeoutError("hedge timed out")
+
+    with pytest.raises(TimeoutError, match="hedge timed out"):
+        warmed_up(budget=1.0).call("agent", fn)
+    assert len(attempts) == 2
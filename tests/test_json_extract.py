@@ -0,0 +1,84 @@
+import pytest
+
+from json_extract import (
+    JSONExtractionError, ListOf, extract_json, extract_json_array, json_state, parse_stats, repair_json,
+)
+
+SCHEMA = {"filename": str, "python_code": str}
+
+
+def test_prose_and_fences_around_the_object():
+    text = 'Sure!\n```json\n{"filename": "a.py", "python_code": "x = 1"}\n```\nDone.'
+    assert extract_json(text, SCHEMA) == {"filename": "a.py", "python_code": "x = 1"}
+
+
+def test_backticks_inside_code_strings():
+    text = '```json\n{"filename": "a.md", "python_code": "doc = \\"```python\\\\nx\\\\n```\\""}\n```'
+    assert extract_json(text, SCHEMA)["python_code"] == 'doc = "```python\\nx\\n```"'
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1,}', {"a": 1}),
+    ('{"a": [1, 2, ], }', {"a": [1, 2]}),
+    ('{"a": "one\ntwo\tthree"}', {"a": "one\ntwo\tthree"}),
+    ('{"a": "\\d+\\.\\w"}', {"a": "\\d+\\.\\w"}),
+    ('{"a": "it\\\'s"}', {"a": "it's"}),
+])
+def test_repairs(text, expected):
+    assert extract_json(text) == expected
+
+
+def test_trailing_comma_inside_a_string_is_kept():
+    assert repair_json('{"a": "x,}"}') == '{"a": "x,}"}'
+
+
+def test_surrogate_pair_escapes():
+    assert extract_json('{"a": "\\ud83d\\ude00"}') == {"a": "\U0001F600"}
+
+
+def test_first_object_matching_the_schema_wins():
+    text = '{"note": "not this"} then {"filename": "b.py", "python_code": ""}'
+    assert extract_json(text, SCHEMA)["filename"] == "b.py"
+
+
+def test_schema_mismatch_raises():
+    with pytest.raises(JSONExtractionError, match="python_code"):
+        extract_json('{"filename": "a.py"}', SCHEMA)
+
+
+def test_list_of_schema():
+    assert extract_json('{"tasks": ["a", "b"]}', {"tasks": ListOf(str)}) == {"tasks": ["a", "b"]}
+    with pytest.raises(JSONExtractionError):
+        extract_json('{"tasks": ["a", 2]}', {"tasks": ListOf(str)})
+
+
+def test_no_object_raises():
+    with pytest.raises(JSONExtractionError, match="No complete JSON object"):
+        extract_json("I cannot help with that.")
+
+
+def test_array_extraction():
+    text = 'Results:\n[{"filename": "a.py", "python_code": "1"}, {"filename": "b.py", "python_code": "2",},]'
+    assert [item["filename"] for item in extract_json_array(text, SCHEMA)] == ["a.py", "b.py"]
+
+
+@pytest.mark.parametrize("text, state", [
+    ('{"a": 1}', "complete"),
+    ('```json\n{"a": "}', "partial"),
+    ('[{"a": 1}, {"b"', "partial"),
+    ("no json here", "none"),
+])
+def test_json_state(text, state):
+    assert json_state(text) == state
+
+
+@pytest.mark.parametrize("text, rescued", [
+    ('{"a": 1}', 0),
+    ('```json\n{"a": 1}\n```', 0),
+    ('Here you go: {"a": 1}', 1),
+    ('{"a": 1,}', 1),
+])
+def test_rescued_counts_what_a_plain_parse_would_have_failed(text, rescued):
+    parse_stats.reset()
+    extract_json(text)
+    assert parse_stats.rescued == rescued
@@ -0,0 +1,73 @@
+import pytest
+
+from output_writer import OutputWriter, safe_name, safe_relative_path
+
+
+def test_model_file_names_stay_inside_the_output_directory():
+    assert safe_relative_path("../../etc/passwd").as_posix() == "etc/passwd"
+    assert safe_relative_path("/abs\\src/./app.py").as_posix() == "abs/src/app.py"
+    assert safe_relative_path('we<ird>:name?.py').as_posix() == "we_ird__name_.py"
+    assert safe_name("components/TaskList") == "components_TaskList"
+    with pytest.raises(ValueError):
+        safe_relative_path("../..")
+
+
+def test_claims_give_each_task_its_own_path(tmp_path, capsys):
+    writer = OutputWriter()
+    path = tmp_path / "tasks.py"
+    assert writer.claim(path, "task a") == path
+    assert writer.claim(path, "task a") == path
+    assert writer.claim(tmp_path / "Tasks.py", "task b") == tmp_path / "Tasks_2.py"
+    assert writer.claim(path, "task c") == tmp_path / "tasks_3.py"
+    # The same owner keeps its numbered variant.
+    assert writer.claim(path, "task b") == tmp_path / "tasks_2.py"
+    assert writer.claim(path, None) == path
+    assert "already used by another task" in capsys.readouterr().out
+
+
+def test_files_are_written_and_unchanged_ones_skipped(tmp_path):
+    writer = OutputWriter()
+    path = tmp_path / "pkg" / "app.py"
+    assert writer.write({path: "print(1)\n"}).result(timeout=5) == [path]
+    first_mtime = path.stat().st_mtime_ns
+
+    writer.write({path: "print(1)\n"}).result(timeout=5)
+    assert path.stat().st_mtime_ns == first_mtime
+    writer.write({path: "print(2)\n"}).result(timeout=5)
+    writer.flush()
+
+    assert path.read_text() == "print(2)\n"
+    assert (writer.written, writer.unchanged) == (2, 1)
+    # No temporary files are left beside the target.
+    assert sorted(p.name for p in path.parent.iterdir()) == ["app.py"]
+    assert "2 file(s) written, 1 unchanged" in writer.report()
+
+
+def test_files_already_on_disk_are_compared_by_content(tmp_path):
+    path = tmp_path / "app.py"
+    path.write_text("same\n")
+    writer = OutputWriter()
+    writer.write({path: "same\n"}).result(timeout=5)
+    assert (writer.written, writer.unchanged) == (0, 1)
+
+
+def test_replace_keeps_an_identical_target(tmp_path):
+    writer = OutputWriter()
+    path = tmp_path / "app.py"
+    part = tmp_path / "app.py.part"
+    part.write_text("v1")
+    assert writer.replace(part, path) is True
+    part.write_text("v1")
+    assert writer.replace(part, path) is False
+    assert not part.exists()
+    assert path.read_text() == "v1"
+
+
+def test_write_errors_reach_the_future(tmp_path):
+    blocker = tmp_path / "blocker"
+    blocker.write_text("a file, not a directory")
+    writer = OutputWriter()
+    future = writer.write({blocker / "app.py": "x"})
+    assert future.exception(timeout=5) is not None
+    # The writer keeps serving later jobs.
+    assert writer.write({tmp_path / "ok.py": "x"}).result(timeout=5) == [tmp_path / "ok.py"]
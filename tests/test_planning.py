@@ -0,0 +1,25 @@
+import pytest
+
+import main
+
+
+class ProviderError(RuntimeError):
+    pass
+
+
+def fail(*args, **kwargs):
+    raise ProviderError("503 The service is currently unavailable.")
+
+
+@pytest.mark.parametrize("section_chars", [0, 40])
+def test_provider_error_while_planning_is_reported(monkeypatch, capsys, section_chars):
+    monkeypatch.setattr(main, "coordinator_agent", fail)
+    brief = "# Todo\n\nA todo app.\n\n## Tasks\n\nAdd and list tasks.\n\n## Users\n\nSign up and log in."
+    assert main.plan_project(brief, section_chars=section_chars) is None
+    assert "503 The service is currently unavailable." in capsys.readouterr().out
+
+
+def test_plan_is_parsed(monkeypatch):
+    monkeypatch.setattr(main, "coordinator_agent",
+                        lambda brief, *args: '```json\n{"frontend_tasks": ["a"], "backend_tasks": ["b"]}\n```')
+    assert main.plan_project("A todo app.", section_chars=0) == {"frontend_tasks": ["a"], "backend_tasks": ["b"]}
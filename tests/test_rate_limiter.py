@@ -0,0 +1,149 @@
+from types import SimpleNamespace
+
+import pytest
+
+import rate_limiter
+from rate_limiter import RateLimiter, TokenBucket, classify_error
+
+
+class Clock:
+    """A fake `time` module whose `sleep` advances `monotonic` instead of waiting."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+class APIError(Exception):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+@pytest.mark.parametrize("error, kind", [
+    (APIError("quota", 429), "rate_limit"),
+    (ResourceExhausted("quota"), "rate_limit"),
+    (APIError("429 Too many requests"), "rate_limit"),
+    (APIError("unavailable", 503), "transient"),
+    (APIError("unavailable", lambda: SimpleNamespace(value=(503, "UNAVAILABLE"))), "transient"),
+    (TimeoutError("slow"), "transient"),
+    (ConnectionError("reset"), "transient"),
+    (APIError("bad request", 400), None),
+    (ValueError("bad key"), None),
+])
+def test_classify_error(error, kind):
+    assert classify_error(error) == kind
+
+
+def test_rate_limits_halve_the_rate_and_successes_restore_it_slowly():
+    limiter = RateLimiter(rpm=60, tpm=1e6)
+    limiter.record_rate_limited()
+    limiter.record_rate_limited()
+    assert limiter.factor == pytest.approx(0.25)
+    limiter.record_success()
+    assert limiter.factor == pytest.approx(0.30)
+    for _ in range(100):
+        limiter.record_rate_limited()
+    assert limiter.factor == limiter.min_factor
+    for _ in range(100):
+        limiter.record_success()
+    assert limiter.factor == 1.0
+
+
+def test_bucket_allows_a_burst_then_refills():
+    bucket = TokenBucket(per_minute=60, burst_seconds=10)
+    assert bucket.capacity == 10
+    assert bucket.wait_time(10, now=bucket.updated, factor=1.0) == 0
+    bucket.take(10)
+    assert bucket.wait_time(1, now=bucket.updated, factor=1.0) == pytest.approx(1.0)
+    # At half the rate, refilling takes twice as long.
+    assert bucket.wait_time(1, now=bucket.updated, factor=0.5) == pytest.approx(2.0)
+
+
+def test_requests_beyond_the_burst_are_throttled(clock):
+    limiter = RateLimiter(rpm=60, tpm=1e6)
+    for _ in range(10):
+        limiter.acquire(1)
+    assert clock.sleeps == []
+    limiter.acquire(1)
+    assert sum(clock.sleeps) == pytest.approx(1.0)
+    assert limiter.throttled_seconds == pytest.approx(1.0)
+
+
+def test_large_requests_wait_for_the_token_budget(clock):
+    limiter = RateLimiter(rpm=1e6, tpm=600)
+    limiter.acquire(100)
+    limiter.acquire(100)
+    assert sum(clock.sleeps) == pytest.approx(10.0)
+
+
+def test_transient_errors_are_retried_with_jittered_exponential_backoff(clock, monkeypatch):
+    bounds = []
+    monkeypatch.setattr(rate_limiter.random, "uniform", lambda low, high: bounds.append((low, high)) or high)
+    limiter = RateLimiter(rpm=1e6, tpm=1e9, max_retries=5)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 4:
+            raise APIError("unavailable", 503)
+        return "ok"
+
+    assert limiter.call(flaky, prompt_tokens=1) == "ok"
+    assert bounds == [(0, 1.0), (0, 2.0), (0, 4.0)]
+    assert clock.sleeps == [1.0, 2.0, 4.0]
+    assert limiter.retry_count == 3
+    assert limiter.factor == 1.0
+
+
+def test_rate_limit_errors_slow_the_limiter_down(clock):
+    limiter = RateLimiter(rpm=1e6, tpm=1e9, max_retries=3)
+    attempts = []
+
+    def limited():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise APIError("quota", 429)
+        return "ok"
+
+    assert limiter.call(limited, prompt_tokens=1) == "ok"
+    assert limiter.factor == pytest.approx(0.25 + 0.05)
+
+
+def test_permanent_errors_and_exhausted_retries_are_raised(clock):
+    limiter = RateLimiter(rpm=1e6, tpm=1e9, max_retries=2)
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise APIError("bad request", 400)
+
+    with pytest.raises(APIError, match="bad request"):
+        limiter.call(bad_request, prompt_tokens=1)
+    assert len(calls) == 1
+
+    def unavailable():
+        calls.append(1)
+        raise APIError("unavailable", 503)
+
+    with pytest.raises(APIError, match="unavailable"):
+        limiter.call(unavailable, prompt_tokens=1)
+    assert len(calls) == 1 + 3
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import pytest
+
+import main
+import response_cache
+from json_extract import JSONExtractionError
+from model_client import discard_response, generate_content, response_digest
+from response_cache import CacheMissError, ResponseCache, configure_response_cache, get_response_cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_round_trip_and_counts(tmp_path):
+    cache = ResponseCache(tmp_path)
+    key = cache.make_key("stub:model", "prompt", {"temperature": 0})
+    assert key != cache.make_key("stub:model", "prompt", {"temperature": 1})
+    assert cache.get(key) is None
+    cache.put(key, "stub:model", "answer")
+    assert cache.get(key) == "answer"
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert ResponseCache(tmp_path).get(key) == "answer"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = ResponseCache(tmp_path, max_mb=2500 / (1024 * 1024))
+    for key in ("a", "b"):
+        cache.put(key, "m", key * 1000)
+        clock[0] += 1
+    assert cache.get("a") is not None
+    clock[0] += 1
+    cache.put("c", "m", "c" * 1000)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_old_entries_expire(tmp_path, clock):
+    cache = ResponseCache(tmp_path, max_age_days=1)
+    cache.put("a", "m", "answer")
+    clock[0] += 2 * 24 * 60 * 60
+    assert cache.get("a") is None
+
+
+def test_off_mode_touches_nothing(tmp_path):
+    cache = ResponseCache(tmp_path, mode="off")
+    cache.put("a", "m", "answer")
+    assert cache.get("a") is None
+    assert (cache.hits, cache.misses) == (0, 0)
+    assert not (tmp_path / "responses.sqlite3").exists()
+
+
+def test_unknown_mode(tmp_path):
+    with pytest.raises(ValueError, match="Unknown cache mode"):
+        ResponseCache(tmp_path, mode="sometimes")
+
+
+def test_replay_serves_hits_and_fails_on_misses(offline, tmp_path):
+    answer = generate_content("Say hello.")
+    assert offline.calls == 1
+    configure_response_cache(cache_dir=tmp_path / "cache", mode="replay")
+    assert generate_content("Say hello.") == answer
+    assert offline.calls == 1
+    with pytest.raises(CacheMissError):
+        generate_content("Say goodbye.")
+    assert offline.calls == 1
+
+
+def test_discarded_responses_are_asked_again(offline, tmp_path):
+    answer = generate_content("Say hello.")
+    assert discard_response(response_digest(answer)) == 1
+    assert discard_response(response_digest(answer)) == 0
+    configure_response_cache(cache_dir=tmp_path / "cache", mode="replay")
+    with pytest.raises(CacheMissError):
+        generate_content("Say hello.")
+
+
+def test_a_plan_that_fails_to_parse_is_evicted(offline, tmp_path):
+    offline.canned = {"coordinator": '{"frontend_tasks": ["a", '}
+    raw = main.coordinator_agent("Build a todo app.")
+    with pytest.raises(JSONExtractionError):
+        main.parse_response(raw, main.extract_json, main.PLAN_SCHEMA)
+    configure_response_cache(cache_dir=tmp_path / "cache", mode="replay")
+    with pytest.raises(CacheMissError):
+        main.coordinator_agent("Build a todo app.")
+    assert get_response_cache().misses == 1
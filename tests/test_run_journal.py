@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+import main
+from run_journal import RunJournal
+
+PLAN = {"frontend_tasks": ["Create a TaskList component."], "backend_tasks": ["Create a `GET /api/tasks` endpoint."]}
+
+
+def test_events_are_read_back(tmp_path):
+    journal = RunJournal.create("Build a todo app.", options={"provider": "stub"}, journal_dir=tmp_path)
+    file = tmp_path / "TaskList.tsx"
+    file.write_text("", encoding="utf-8")
+    journal.record_plan(PLAN)
+    journal.record_task("frontend", PLAN["frontend_tasks"][0], "✅ Saved", [file])
+    journal.record_task("backend", PLAN["backend_tasks"][0], "✅ Saved", [tmp_path / "missing.py"])
+
+    reopened = RunJournal.open(journal.run_id, tmp_path)
+    assert reopened.brief == "Build a todo app."
+    assert reopened.options == {"provider": "stub"}
+    assert reopened.plan == PLAN
+    assert len(reopened.completed) == 2
+    # A task whose files are gone has to run again.
+    assert reopened.completed_tasks() == {("frontend", PLAN["frontend_tasks"][0]): [file]}
+    assert not reopened.finished
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    journal = RunJournal.create("Build a todo app.", journal_dir=tmp_path)
+    journal.record_plan(PLAN)
+    with open(journal.path, "a", encoding="utf-8") as handle:
+        handle.write('{"type": "task", "kind": "fronte')
+    assert RunJournal.open(journal.run_id, tmp_path).plan == PLAN
+
+
+def test_invalid_tasks_are_withdrawn_and_finish_is_recorded(tmp_path):
+    journal = RunJournal.create("Build a todo app.", journal_dir=tmp_path)
+    journal.record_task("backend", "task", "✅ Saved", [])
+    journal.record_task_invalid("backend", "task")
+    journal.record_finish()
+    reopened = RunJournal.open(journal.run_id, tmp_path)
+    assert reopened.completed == {} and reopened.finished
+    assert [json.loads(line)["type"] for line in journal.path.read_text(encoding="utf-8").splitlines()] == \
+        ["start", "task", "task_invalid", "finish"]
+
+
+def test_unknown_run(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        RunJournal.open("20000101-000000-000000", tmp_path)
+
+
+def test_resume_restores_options_and_skips_finished_tasks(offline, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    main.main(["--provider", "stub", "--cache", "off", "--no-reuse"])
+    run_id = next((tmp_path / ".runs").glob("*.jsonl")).stem
+    journal = RunJournal.open(run_id, tmp_path / ".runs")
+    assert journal.finished and journal.options["provider"] == "stub"
+    redo = next(key for key in journal.completed if key[0] == "backend")
+    for name in journal.completed[redo]["files"]:
+        (tmp_path / name).unlink()
+
+    capsys.readouterr()
+    # Without --provider, the stub the run was started with is restored rather than the Gemini default.
+    main.main(["--resume", run_id, "--cache", "off", "--no-reuse"])
+    output = capsys.readouterr().out
+    assert "Reusing the project plan from the run journal" in output
+    assert "finished by the interrupted run" in output
+    assert f"Processing Backend Task (1/1): {redo[1]}" in output
+
+    main.main(["--resume", run_id, "--provider", "gemini"])
+    assert "The run was started with --provider stub, not gemini." in capsys.readouterr().out
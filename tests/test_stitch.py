@@ -0,0 +1,49 @@
+import pytest
+
+from model_client import RESUME_MARKER_CHARS, is_truncated, resume_marker, stitch
+
+PARTIAL = (
+    "def add(item):\n"
+    "    session.add(item)\n"
+    "    session.commit()\n"
+    "\n"
+    "def add_all(items):\n"
+    "    for item in items:\n"
+)
+REST = "        session.add(item)\n    session.commit()\n"
+
+
+def test_marker_is_the_tail_of_the_partial_response():
+    assert resume_marker(PARTIAL) == PARTIAL[-RESUME_MARKER_CHARS:]
+    assert resume_marker("short") == "short"
+
+
+def test_echoed_marker_is_stripped():
+    assert stitch(PARTIAL, resume_marker(PARTIAL) + REST) == REST
+
+
+def test_fenced_echo_is_stripped():
+    assert stitch(PARTIAL, "```python\n" + resume_marker(PARTIAL) + REST) == REST
+
+
+def test_continuation_without_an_echo_is_kept_whole():
+    # The continuation legitimately repeats a line of the partial response; nothing may be dropped.
+    assert stitch(PARTIAL, REST) == REST
+
+
+def test_partial_echo_is_not_treated_as_a_marker():
+    continuation = resume_marker(PARTIAL)[5:] + REST
+    assert stitch(PARTIAL, continuation) == continuation
+
+
+@pytest.mark.parametrize("text, finish_reason, truncated", [
+    ('{"a": "cut', "MAX_TOKENS", True),
+    ('{"a": "cut', "STOP", False),
+    ('{"a": 1}', "MAX_TOKENS", False),
+    ('{"a": "cut', None, True),
+    ('{"a": 1}', None, False),
+    ('{"a": 1}', "STOP", False),
+    ("no json", "STOP", False),
+])
+def test_is_truncated(text, finish_reason, truncated):
+    assert is_truncated(text, finish_reason) == truncated
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from streaming_json import StreamingJSONError, StreamingJSONParser
+
+RESPONSE = (
+    'Here is the component:\n```json\n'
+    '{"component_name": "TaskList", "tags": ["ui", {"nested": [1, 2]}, "a,b"], "count": 3, '
+    '"ok": true, "tsx_code": "const a = \\"x\\";\\n\\tpath = \\"C:\\\\\\\\tmp\\" // caf\\u00e9 \\ud83d\\ude00"}\n```'
+)
+
+
+def collect(chunks, stream_keys=()):
+    """Feeds `chunks` and returns `(values, streamed, items, parser)`."""
+    parser = StreamingJSONParser(stream_keys=stream_keys)
+    values, streamed, items = {}, {}, {}
+    for chunk in chunks:
+        for event in parser.feed(chunk):
+            if event[0] == "value":
+                values[event[1]] = event[2]
+            elif event[0] == "string_chunk":
+                streamed[event[1]] = streamed.get(event[1], "") + event[2]
+            elif event[0] == "item":
+                items.setdefault(event[1], []).append(event[2])
+    return values, streamed, items, parser
+
+
+def expected():
+    start = RESPONSE.index("{")
+    return json.loads(RESPONSE[start:RESPONSE.rindex("}") + 1])
+
+
+def test_whole_response_matches_json_loads():
+    values, _, items, parser = collect([RESPONSE])
+    assert values == expected()
+    assert items["tags"] == expected()["tags"]
+    assert parser.done
+
+
+@pytest.mark.parametrize("split", range(1, len(RESPONSE)))
+def test_every_split_point_gives_the_same_values(split):
+    values, _, _, parser = collect([RESPONSE[:split], RESPONSE[split:]])
+    assert values == expected()
+    assert parser.done
+
+
+def test_character_by_character_decodes_escapes_and_surrogate_pairs():
+    values, _, _, _ = collect(list(RESPONSE))
+    code = values["tsx_code"]
+    assert code == expected()["tsx_code"]
+    assert "\U0001F600" in code
+    assert "café" in code
+    assert '"C:\\\\tmp"' in code
+
+
+def test_streamed_keys_are_not_buffered():
+    values, streamed, _, _ = collect(list(RESPONSE), stream_keys=("tsx_code",))
+    assert values["tsx_code"] is None
+    assert streamed["tsx_code"] == expected()["tsx_code"]
+
+
+def test_lone_high_surrogate_is_kept():
+    values, _, _, _ = collect(['{"a": "x\\ud83d', 'y"}'])
+    assert values["a"] == "x\ud83dy"
+
+
+def test_trailing_commas_are_tolerated():
+    values, _, items, parser = collect(['{"a": [1, 2,], "b": "c",}'])
+    assert values == {"a": [1, 2], "b": "c"}
+    assert items["a"] == [1, 2]
+    assert parser.done
+
+
+def test_nothing_after_the_object_is_parsed():
+    values, _, _, parser = collect(['{"a": 1}', ' and {"b": 2}'])
+    assert values == {"a": 1}
+    assert parser.done
+
+
+def test_incomplete_response_is_not_done():
+    _, _, _, parser = collect(['{"a": "unfinished'])
+    assert not parser.done
+
+
+@pytest.mark.parametrize("text", ['{"a": "bad \\d escape"}', '{"a" 1}', '{1: 2}', '{"a": tru }'])
+def test_invalid_json_raises(text):
+    with pytest.raises(StreamingJSONError):
+        collect([text])
@@ -0,0 +1,85 @@
+from task_dedup import TaskDeduplicator, dedupe_plan, task_guards
+from task_graph import dedupe_renames
+
+
+def test_similar_wording_is_a_duplicate():
+    deduplicator = TaskDeduplicator(0.5)
+    assert deduplicator.check("frontend", "Create a TaskList component that displays all tasks in a list.") is None
+    duplicate = deduplicator.check("frontend", "Create a TaskList component that displays all the tasks as a list.")
+    assert duplicate is not None
+    assert duplicate.kept == "Create a TaskList component that displays all tasks in a list."
+    assert duplicate.reason == "similar wording"
+    assert duplicate.similarity >= 0.5
+
+
+def test_same_endpoint_matches_however_it_is_worded():
+    deduplicator = TaskDeduplicator(0.9)
+    assert deduplicator.check("backend", "Create a `POST /api/tasks` endpoint to add a task.") is None
+    duplicate = deduplicator.check("backend", "Implement task creation: POST /api/tasks stores a new task in the database.")
+    assert duplicate is not None and duplicate.reason == "same endpoint"
+
+
+def test_different_numbers_methods_or_paths_never_match():
+    deduplicator = TaskDeduplicator(0.1)
+    assert deduplicator.check("backend", "Create a `GET /api/tasks/1` endpoint returning part 1.") is None
+    assert deduplicator.check("backend", "Create a `GET /api/tasks/2` endpoint returning part 2.") is None
+    assert deduplicator.check("backend", "Create a `DELETE /api/tasks/1` endpoint returning part 1.") is None
+    assert deduplicator.check("backend", "Create a `GET /api/users/1` endpoint returning part 1.") is None
+
+
+def test_kinds_are_kept_apart():
+    deduplicator = TaskDeduplicator(0.5)
+    assert deduplicator.check("frontend", "Build the task list view.") is None
+    assert deduplicator.check("backend", "Build the task list view.") is None
+
+
+def test_exact_repeat_is_a_duplicate_at_threshold_one():
+    deduplicator = TaskDeduplicator(1.0)
+    assert deduplicator.check("frontend", "Add a form to create tasks.") is None
+    assert deduplicator.check("frontend", "Add a form to create tasks.").similarity == 1.0
+    assert len(deduplicator.report()) == 1
+
+
+def test_dedupe_plan_keeps_the_extra_requirement_of_a_dropped_task():
+    plan = {
+        "frontend_tasks": [
+            "Create a TaskList component that displays all tasks in a list.",
+            "Create a TaskList component that displays all tasks in a list with pagination.",
+        ],
+        "backend_tasks": ["Create a `GET /api/tasks` endpoint."],
+    }
+    deduped, duplicates = dedupe_plan(plan, 0.5)
+    assert len(deduped["frontend_tasks"]) == 1
+    assert "pagination" in deduped["frontend_tasks"][0]
+    assert deduped["backend_tasks"] == plan["backend_tasks"]
+    assert [duplicate.task for duplicate in duplicates] == [plan["frontend_tasks"][1]]
+
+
+def test_different_component_names_or_filenames_never_match():
+    deduplicator = TaskDeduplicator(0.1)
+    assert deduplicator.check("frontend", "Create a LoginForm component with email and password inputs.") is None
+    assert deduplicator.check("frontend", "Create a SignupForm component with email and password inputs.") is None
+    assert deduplicator.check("backend", "Write the task routes in tasks.py.") is None
+    assert deduplicator.check("backend", "Write the task routes in users.py.") is None
+
+
+def test_default_threshold_only_merges_near_identical_wording():
+    deduplicator = TaskDeduplicator()
+    assert deduplicator.check("frontend", "Create a header component with the app title.") is None
+    assert deduplicator.check("frontend", "Create a footer component with the app title.") is None
+    assert deduplicator.check("frontend", "Create the header component with an app title.") is not None
+
+
+def test_trailing_punctuation_does_not_change_a_path():
+    assert task_guards("Create a `GET /api/tasks` endpoint.") == task_guards("Create a GET /api/tasks.")
+
+
+def test_tasks_that_are_not_strings_are_passed_through():
+    odd = {"task": "Create a TaskList component."}
+    plan = {"frontend_tasks": [odd, "Build the task list view.", ["nested"], "Build the task list view."],
+            "backend_tasks": []}
+    deduped, duplicates = dedupe_plan(plan)
+    assert deduped["frontend_tasks"] == [odd, "Build the task list view.", ["nested"]]
+    assert len(duplicates) == 1
+    renames = dedupe_renames(plan, deduped, duplicates)
+    assert renames[("frontend", "Build the task list view.")] == ("frontend", "Build the task list view.")
@@ -0,0 +1,108 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from task_graph import GraphScheduler, TaskGraph
+
+WEIGHTS = {"frontend": 1.0, "backend": 2.0}
+
+B1, B2, B3 = ("backend", "b1"), ("backend", "b2"), ("backend", "b3")
+F1, F2, F3 = ("frontend", "f1"), ("frontend", "f2"), ("frontend", "f3")
+
+
+def run_in_order(graph, nodes, fail=(), finished=None):
+    """Runs `nodes` one at a time and returns `(order, upstream seen per node, futures)`."""
+    order, seen = [], {}
+    lock = threading.Lock()
+
+    def run(node, upstream):
+        with lock:
+            order.append(node)
+            seen[node] = upstream
+        if node in fail:
+            raise RuntimeError(f"{node[1]} failed")
+        return f"code of {node[1]}"
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        futures = GraphScheduler(graph, WEIGHTS).submit_all(executor, nodes, run, 1, finished=finished)
+        for future in futures:
+            future.exception(timeout=5)
+    return order, seen, futures
+
+
+def test_dependencies_run_first_and_pass_their_results():
+    graph = TaskGraph([F1, B1], {F1: [B1]})
+    order, seen, futures = run_in_order(graph, [F1, B1])
+    assert order == [B1, F1]
+    assert seen[F1] == [(B1, "code of b1")]
+    assert [future.result() for future in futures] == ["code of f1", "code of b1"]
+
+
+def test_longest_critical_path_starts_first():
+    # B3 heads a chain of two tasks, so it runs before F3 and B2 despite coming later in the plan.
+    graph = TaskGraph([F3, B2, B3, F1], {F1: [B3]})
+    order, _, _ = run_in_order(graph, [F3, B2, B3, F1])
+    assert order == [B3, B2, F3, F1]
+
+
+def test_ties_keep_plan_order():
+    graph = TaskGraph([F1, F2, F3], {})
+    order, _, _ = run_in_order(graph, [F2, F1, F3])
+    assert order == [F2, F1, F3]
+
+
+def test_dependent_of_a_failed_task_still_runs():
+    graph = TaskGraph([B1, B2, F1], {F1: [B1, B2]})
+    order, seen, futures = run_in_order(graph, [B1, B2, F1], fail={B1})
+    assert order[-1] == F1
+    assert seen[F1] == [(B2, "code of b2")]
+    assert isinstance(futures[0].exception(), RuntimeError)
+    assert futures[2].result() == "code of f1"
+
+
+def test_finished_results_are_passed_to_dependents():
+    graph = TaskGraph([B1, F1], {F1: [B1]})
+    order, seen, _ = run_in_order(graph, [F1], finished={B1: "cached b1"})
+    assert order == [F1]
+    assert seen[F1] == [(B1, "cached b1")]
+
+
+def test_concurrency_is_bounded():
+    graph = TaskGraph([F1, F2, F3, B1], {})
+    lock = threading.Lock()
+    running, peak = 0, 0
+    release = threading.Event()
+
+    def run(node, upstream):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        release.wait(0.05)
+        with lock:
+            running -= 1
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = GraphScheduler(graph, WEIGHTS).submit_all(executor, [F1, F2, F3, B1], run, 2)
+        for future in futures:
+            future.result(timeout=5)
+    assert peak == 2
+
+
+def test_from_plan_ignores_unknown_ids_and_breaks_cycles(capsys):
+    plan = {
+        "frontend_tasks": ["f1"],
+        "backend_tasks": ["b1", "b2"],
+        "dependencies": {"F1": ["B1", "B9"], "B1": ["B2"], "B2": ["B1"], "X1": ["B1"]},
+    }
+    graph = TaskGraph.from_plan(plan)
+    assert graph.dependencies[F1] == [B1]
+    assert graph.edge_count == 2
+    assert len(graph.topological_order()) == 3
+    output = capsys.readouterr().out
+    assert "B9" in output and "X1" in output and "cycle" in output
+
+
+def test_critical_path():
+    graph = TaskGraph([F1, B1, B2], {F1: [B1]})
+    assert graph.critical_paths(WEIGHTS) == {B1: 3.0, F1: 1.0, B2: 2.0}
+    assert graph.critical_path(WEIGHTS) == [B1, F1]
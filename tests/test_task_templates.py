@@ -0,0 +1,77 @@
+import ast
+import re
+
+import pytest
+
+from task_templates import classify, render_backend, render_frontend
+
+FIELDS = "with title and completed fields"
+
+
+def routes(code: str) -> list:
+    return re.findall(r'@router\.(\w+)\("([^"]*)"', code)
+
+
+@pytest.mark.parametrize("task, pattern, route", [
+    (f"Create a `POST /api/tasks` endpoint to add a task {FIELDS}.", "create", ("post", "/api/tasks")),
+    (f"Create a `GET /api/tasks` endpoint to list all tasks {FIELDS}.", "list", ("get", "/api/tasks")),
+    (f"Create a `GET /api/tasks/{{id}}` endpoint to get a task {FIELDS}.", "get", ("get", "/api/tasks/{task_id}")),
+    (f"Create a `PUT /api/tasks/{{id}}` endpoint to update a task {FIELDS}.", "update",
+     ("put", "/api/tasks/{task_id}")),
+    ("Create a `PATCH /api/tasks/{id}` endpoint to update a task with title and description fields.", "update",
+     ("patch", "/api/tasks/{task_id}")),
+    (f"Create a `PATCH /api/tasks/{{id}}/complete` endpoint to mark a task as complete {FIELDS}.", "toggle",
+     ("patch", "/api/tasks/{task_id}/complete")),
+    (f"Create a `DELETE /api/tasks/{{id}}` endpoint to delete a task {FIELDS}.", "delete",
+     ("delete", "/api/tasks/{task_id}")),
+])
+@pytest.mark.parametrize("profile", ["default", "performance"])
+def test_backend_routes_keep_the_method_and_path_the_task_names(task, pattern, route, profile):
+    match = classify("backend", task)
+    assert match is not None and match.pattern == pattern
+    code = render_backend(match, profile)["python_code"]
+    ast.parse(code)
+    assert route in routes(code)
+
+
+@pytest.mark.parametrize("task", [
+    # Anything the template would not implement goes to the model.
+    f"Create a `DELETE /api/tasks/{{id}}` endpoint to soft delete a task and its subtasks {FIELDS}.",
+    f"Create a `GET /api/projects/{{pid}}/tasks` endpoint to list all tasks {FIELDS}.",
+    f"Create `GET /api/tasks` and `POST /api/tasks` endpoints {FIELDS}.",
+    "Create a `POST /api/tasks` endpoint to add a task.",
+])
+def test_backend_tasks_beyond_a_template_are_left_to_the_model(task):
+    assert classify("backend", task) is None
+
+
+def test_initialize_database():
+    match = classify("backend", "Initialize the database tables on startup.")
+    assert match.pattern == "init_db"
+    ast.parse(render_backend(match)["python_code"])
+
+
+@pytest.mark.parametrize("task, pattern, component", [
+    (f"Create a TaskList component that displays all tasks {FIELDS}.", "list", "TaskList"),
+    (f"Create a TaskList component that displays all tasks from `GET /api/tasks` {FIELDS}.", "list", "TaskList"),
+    (f"Create a form component to add a task via `POST /api/tasks` {FIELDS}.", "form", "AddTaskForm"),
+    (f"Create a checkbox component to mark a task as complete via `PATCH /api/tasks/{{id}}` {FIELDS}.",
+     "checkbox", "TaskItem"),
+])
+def test_frontend_patterns(task, pattern, component):
+    match = classify("frontend", task)
+    assert match is not None and (match.pattern, match.component, match.path) == (pattern, component, "/api/tasks")
+    code = render_frontend(match)
+    assert code["component_name"] == component
+    assert "'/api/tasks'" in code["tsx_code"]
+
+
+@pytest.mark.parametrize("task", [
+    # The checkbox template patches `/api/tasks/{id}`, not a sub-resource.
+    f"Create a checkbox component to mark a task as complete via `PATCH /api/tasks/{{id}}/complete` {FIELDS}.",
+    f"Create a checkbox component to mark a task as complete via `PUT /api/tasks/{{id}}` {FIELDS}.",
+    f"Create a TaskList component that displays all tasks from `POST /api/tasks/search` {FIELDS}.",
+    "Create a TaskList component that displays all tasks.",
+])
+def test_frontend_tasks_beyond_a_template_are_left_to_the_model(task):
+    assert classify("frontend", task) is None